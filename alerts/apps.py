@@ -4,3 +4,6 @@ class AlertsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'alerts'
     verbose_name = 'Alerts'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
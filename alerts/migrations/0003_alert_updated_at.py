@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='alertdispatch',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['updated_at', 'id'], name='alerts_aler_updated_13d9bc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertdispatch',
+            index=models.Index(fields=['updated_at', 'id'], name='alerts_aler_updated_34004a_idx'),
+        ),
+    ]
@@ -46,6 +46,7 @@ class Alert(models.Model):
     message = models.TextField()
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     acknowledged_at = models.DateTimeField(null=True, blank=True)
     acknowledged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='acknowledged_alerts')
@@ -55,6 +56,7 @@ class Alert(models.Model):
         indexes = [
             models.Index(fields=['status', 'severity']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
@@ -89,12 +91,14 @@ class AlertDispatch(models.Model):
     error_message = models.TextField(blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'status']),
             models.Index(fields=['channel']),
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
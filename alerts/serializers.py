@@ -4,8 +4,8 @@ from .models import Alert, AlertDispatch, AlertThreshold, NotificationPreference
 class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
-        fields = ['id', 'disaster_event', 'severity', 'status', 'title', 'message', 'created_at', 'sent_at', 'acknowledged_at', 'acknowledged_by']
-        read_only_fields = ['id', 'created_at', 'sent_at']
+        fields = ['id', 'disaster_event', 'severity', 'status', 'title', 'message', 'created_at', 'updated_at', 'sent_at', 'acknowledged_at', 'acknowledged_by']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'sent_at']
 
 
 class AlertDispatchSerializer(serializers.ModelSerializer):
@@ -13,8 +13,8 @@ class AlertDispatchSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = AlertDispatch
-        fields = ['id', 'alert', 'recipient', 'recipient_name', 'channel', 'status', 'recipient_address', 'sent_at', 'read_at', 'error_message', 'created_at']
-        read_only_fields = ['id', 'created_at', 'sent_at']
+        fields = ['id', 'alert', 'recipient', 'recipient_name', 'channel', 'status', 'recipient_address', 'sent_at', 'read_at', 'error_message', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'sent_at']
     
     def get_recipient_name(self, obj):
         if obj.recipient:
@@ -0,0 +1,36 @@
+"""
+Model signal handlers for the alerts app
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import push
+from core.change_feed import record_deletions
+from core.response_cache import bump_version
+from disasters.models import DisasterEvent
+
+from .models import Alert, AlertDispatch
+
+# Response cache namespace of the alert list actions
+ALERTS_CACHE = 'alerts:alerts'
+
+record_deletions(Alert)
+record_deletions(AlertDispatch, owner='recipient_id')
+
+
+def _disaster_type(alert):
+    if Alert.disaster_event.is_cached(alert):
+        return alert.disaster_event.disaster_type
+    return DisasterEvent.objects.filter(pk=alert.disaster_event_id).values_list('disaster_type', flat=True).first()
+
+
+@receiver(post_save, sender=Alert)
+def alert_saved(sender, instance, created, **kwargs):
+    bump_version(ALERTS_CACHE)
+    push.publish_on_commit(push.alert_message(instance, 'created' if created else 'updated', _disaster_type(instance)))
+
+
+@receiver(post_delete, sender=Alert)
+def alert_deleted(sender, instance, **kwargs):
+    bump_version(ALERTS_CACHE)
+    push.publish_on_commit(push.alert_message(instance, 'deleted', _disaster_type(instance)))
@@ -1,3 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from disasters.models import DisasterEvent
+from .models import Alert
 
-# Create your tests here.
+
+class AlertListCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username='responder', password='testpass123', role='responder')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.event = DisasterEvent.objects.create(
+            disaster_type='flood', location_name='River Town', latitude=10.0, longitude=20.0,
+            risk_score=90, confidence_level=80, predicted_time=timezone.now(),
+        )
+
+    def test_pending_is_paginated_and_invalidated_on_save(self):
+        alert = Alert.objects.create(disaster_event=self.event, severity='critical', title='Flood', message='Evacuate')
+        page = self.client.get('/api/alerts/pending/').json()
+        self.assertEqual(page['count'], 1)
+        self.assertEqual(page['results'][0]['title'], 'Flood')
+
+        alert.status = 'sent'
+        alert.save()
+        self.assertEqual(self.client.get('/api/alerts/pending/').json()['count'], 0)
+        self.assertEqual(self.client.get('/api/alerts/critical/').json()['count'], 1)
@@ -8,6 +8,12 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Alert, AlertDispatch, AlertThreshold, NotificationPreference
 from .serializers import AlertSerializer, AlertDispatchSerializer, AlertThresholdSerializer, NotificationPreferenceSerializer
 from core.models import AuditLog
+from core.lean import LeanListMixin
+from core.fieldsets import SparseFieldsMixin
+from core.change_feed import ChangeFeedMixin
+from core.conditional import ConditionalGetMixin
+from core.response_cache import cached_response
+from .signals import ALERTS_CACHE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +39,7 @@ def alert_details_view(request, alert_id):
         return render(request, 'errors/404.html', status=404)
 
 
-class AlertViewSet(viewsets.ModelViewSet):
+class AlertViewSet(SparseFieldsMixin, ChangeFeedMixin, ConditionalGetMixin, LeanListMixin, viewsets.ModelViewSet):
     queryset = Alert.objects.all()
     serializer_class = AlertSerializer
     permission_classes = [IsAuthenticated]
@@ -42,17 +48,22 @@ class AlertViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'severity']
     ordering = ['-created_at']
     
+    def _paginated(self, queryset):
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def pending(self, request):
-        alerts = Alert.objects.filter(status='pending')
-        serializer = self.get_serializer(alerts, many=True)
-        return Response(serializer.data)
+        return cached_response(request, ALERTS_CACHE, lambda: self._paginated(
+            Alert.objects.filter(status='pending')
+        ))
     
     @action(detail=False, methods=['get'])
     def critical(self, request):
-        alerts = Alert.objects.filter(severity='critical')
-        serializer = self.get_serializer(alerts, many=True)
-        return Response(serializer.data)
+        return cached_response(request, ALERTS_CACHE, lambda: self._paginated(
+            Alert.objects.filter(severity='critical')
+        ))
     
     @action(detail=True, methods=['post'])
     def acknowledge(self, request, pk=None):
@@ -88,7 +99,7 @@ class AlertViewSet(viewsets.ModelViewSet):
         return Response({'status': 'resolved'})
 
 
-class AlertDispatchViewSet(viewsets.ReadOnlyModelViewSet):
+class AlertDispatchViewSet(SparseFieldsMixin, ChangeFeedMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AlertDispatch.objects.all()
     serializer_class = AlertDispatchSerializer
     permission_classes = [IsAuthenticated]
@@ -100,9 +111,14 @@ class AlertDispatchViewSet(viewsets.ReadOnlyModelViewSet):
         if self.request.user.role == 'admin':
             return AlertDispatch.objects.all()
         return AlertDispatch.objects.filter(recipient=self.request.user)
+    
+    def scope_deletions(self, deletions):
+        if self.request.user.role == 'admin':
+            return deletions
+        return deletions.filter(owner_id=str(self.request.user.pk))
 
 
-class AlertThresholdViewSet(viewsets.ModelViewSet):
+class AlertThresholdViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = AlertThreshold.objects.all()
     serializer_class = AlertThresholdSerializer
     permission_classes = [IsAuthenticated]
@@ -133,7 +149,7 @@ class AlertThresholdViewSet(viewsets.ModelViewSet):
         )
 
 
-class NotificationPreferenceViewSet(viewsets.ModelViewSet):
+class NotificationPreferenceViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = NotificationPreference.objects.all()
     serializer_class = NotificationPreferenceSerializer
     permission_classes = [IsAuthenticated]
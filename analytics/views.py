@@ -5,6 +5,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import DisasterAnalytics, AlertAnalytics, UserActivityLog, SystemMetrics
+from core.fieldsets import SparseFieldsMixin
+from core.conditional import ConditionalGetMixin
 from .serializers import DisasterAnalyticsSerializer, AlertAnalyticsSerializer, UserActivityLogSerializer, SystemMetricsSerializer
 from django.db.models import Sum, Avg, Count
 from datetime import timedelta
@@ -18,7 +20,7 @@ def analytics_dashboard_view(request):
     return render(request, 'analytics/analytics_dashboard.html', context)
 
 
-class DisasterAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
+class DisasterAnalyticsViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = DisasterAnalytics.objects.all()
     serializer_class = DisasterAnalyticsSerializer
     permission_classes = [IsAuthenticated]
@@ -57,7 +59,7 @@ class DisasterAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(analytics)
 
 
-class AlertAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
+class AlertAnalyticsViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AlertAnalytics.objects.all()
     serializer_class = AlertAnalyticsSerializer
     permission_classes = [IsAuthenticated]
@@ -83,13 +85,15 @@ class AlertAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(summary)
 
 
-class UserActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class UserActivityLogViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = UserActivityLog.objects.all()
     serializer_class = UserActivityLogSerializer
     permission_classes = [IsAuthenticated]
     filterset_fields = ['user', 'activity_type']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    conditional_fields = ('timestamp',)
+    last_modified_field = None
     
     def get_queryset(self):
         if self.request.user.role == 'admin':
@@ -97,12 +101,14 @@ class UserActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         return UserActivityLog.objects.filter(user=self.request.user)
 
 
-class SystemMetricsViewSet(viewsets.ReadOnlyModelViewSet):
+class SystemMetricsViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SystemMetrics.objects.all()
     serializer_class = SystemMetricsSerializer
     permission_classes = [IsAuthenticated]
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    conditional_fields = ('timestamp',)
+    last_modified_field = None
     
     @action(detail=False, methods=['get'])
     def latest(self, request):
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark historical analogue search over a large HistoricalDisaster table
+
+Runs against a throwaway test database, so db.sqlite3 is not touched.
+
+Usage: python benchmark_analogues.py [rows] [queries]
+"""
+
+import os
+import random
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'disaster_dashboard.settings')
+django.setup()
+
+from datetime import date
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from disasters.analogues import DEFAULT_WEIGHTS, AnalogueIndex
+from disasters.models import HistoricalDisaster
+
+
+def populate(rows):
+    rng = random.Random(7)
+    HistoricalDisaster.objects.bulk_create(
+        (HistoricalDisaster(
+            disaster_type='earthquake',
+            location_name=f'Site {i}',
+            latitude=rng.uniform(-60, 60),
+            longitude=rng.uniform(-180, 180),
+            occurrence_date=date(1950 + i % 70, 1 + i % 12, 1 + i % 28),
+            magnitude=rng.uniform(3, 9) if i % 10 else None,
+            casualties=int(rng.expovariate(0.01)),
+            damage_usd=int(rng.expovariate(1e-7)),
+        ) for i in range(rows)),
+        batch_size=10000,
+    )
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<36} {elapsed * 1000:10.3f}ms")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    print("\n" + "=" * 70)
+    print(f"ANALOGUE SEARCH BENCHMARK ({rows} historical rows, {queries} queries)")
+    print("=" * 70)
+
+    timed('populate', lambda: populate(rows))
+    index = timed('build index', lambda: AnalogueIndex('earthquake'))
+
+    rng = random.Random(11)
+    queries_ = iter([
+        (rng.uniform(3, 9), rng.randrange(365), rng.uniform(-60, 60), rng.uniform(-180, 180))
+        for _ in range(queries)
+    ])
+    timed('k=10 analogues, per query', lambda: index.search(*next(queries_), 10, DEFAULT_WEIGHTS), repeat=queries)
+    for analogue in index.search(6.5, 180, 35.0, 139.0, 5, DEFAULT_WEIGHTS):
+        print(f"  {analogue['distance']:.4f}  casualties {analogue['casualties']}  damage {analogue['damage_usd']}")
+    print("\n" + "=" * 70)
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        main()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark RiskModel backtests over a large HistoricalDisaster table
+
+Runs against a throwaway test database, so db.sqlite3 is not touched.
+
+Usage: python benchmark_backtest.py [rows] [models]
+"""
+
+import os
+import random
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'disaster_dashboard.settings')
+django.setup()
+
+from datetime import date
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from disasters.backtest import backtest, load_history
+from disasters.models import HistoricalDisaster, RiskModel
+
+
+def populate(rows):
+    rng = random.Random(7)
+    HistoricalDisaster.objects.bulk_create(
+        (HistoricalDisaster(
+            disaster_type='earthquake',
+            location_name=f'Site {i}',
+            latitude=rng.uniform(-60, 60),
+            longitude=rng.uniform(-180, 180),
+            occurrence_date=date(1950 + i % 70, 1 + i % 12, 1 + i % 28),
+            magnitude=(magnitude := rng.uniform(3, 9)),
+            # Stronger quakes are more often deadly
+            casualties=int(rng.expovariate(1.0) * 10 ** (magnitude - 6)),
+            damage_usd=int(rng.expovariate(1.0) * 10 ** (magnitude + 0.5)),
+        ) for i in range(rows)),
+        batch_size=10000,
+    )
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<36} {elapsed:8.3f}s")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    model_count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    print("\n" + "=" * 70)
+    print(f"BACKTEST BENCHMARK ({rows} historical rows, {model_count} models)")
+    print("=" * 70)
+
+    timed('populate', lambda: populate(rows))
+    models = [
+        RiskModel.objects.create(
+            name=f'Quake v{i}', disaster_type='earthquake', version=str(i), thresholds={},
+            weights={'magnitude': 1}, parameters={'ranges': {'magnitude': [i, 10]}},
+        ) for i in range(model_count)
+    ]
+
+    timed('values_list load', lambda: list(
+        HistoricalDisaster.objects.filter(disaster_type='earthquake')
+        .values_list('magnitude', 'casualties', 'damage_usd')
+    ))
+    timed('cursor load into NumPy', lambda: load_history('earthquake'))
+    timed('backtest, 1 worker', lambda: backtest(models, workers=1, save=False))
+    results = timed(f'backtest, {model_count} workers', lambda: backtest(models, workers=model_count))
+
+    for metrics in results:
+        print(f"  {metrics['risk_model'][:8]}  AUC {metrics['auc']}  severe {metrics['severe']}/{metrics['scored']}")
+    print("\n" + "=" * 70)
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        main()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
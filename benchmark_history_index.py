@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark nearest-historical-disaster queries against a brute-force scan
+
+Runs against a throwaway test database, so db.sqlite3 is not touched.
+
+Usage: python benchmark_history_index.py [rows] [queries]
+"""
+
+import os
+import random
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'disaster_dashboard.settings')
+django.setup()
+
+from datetime import date
+import numpy as np
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from disasters.history_index import HistoryIndex, unit_vectors
+from disasters.models import HistoricalDisaster
+
+
+def populate(rows):
+    rng = random.Random(7)
+    HistoricalDisaster.objects.bulk_create(
+        (HistoricalDisaster(
+            disaster_type='earthquake',
+            location_name=f'Site {i}',
+            latitude=rng.uniform(-90, 90),
+            longitude=rng.uniform(-180, 180),
+            occurrence_date=date(1950 + i % 70, 1 + i % 12, 1 + i % 28),
+            casualties=0,
+            damage_usd=0,
+        ) for i in range(rows)),
+        batch_size=10000,
+    )
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<36} {elapsed * 1000:10.3f}ms")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    print("\n" + "=" * 70)
+    print(f"HISTORY INDEX BENCHMARK ({rows} historical rows, {queries} queries)")
+    print("=" * 70)
+
+    timed('populate', lambda: populate(rows))
+    index = timed('build index', HistoryIndex)
+
+    rng = np.random.default_rng(11)
+    points = list(zip(rng.uniform(-90, 90, queries).tolist(), rng.uniform(-180, 180, queries).tolist()))
+    it = iter(points * 2)
+    timed('k=10 nearest, per query', lambda: index.nearest(*next(it), 10), repeat=queries)
+    it = iter(points * 2)
+    timed('k=10 within 500 km, per query', lambda: index.nearest(*next(it), 10, radius_km=500), repeat=queries)
+
+    vectors = index.tree.points
+    lat, lon = points[0]
+    x = unit_vectors(np.array([lat]), np.array([lon]))[0]
+    timed('brute force k=10, per query', lambda: np.argpartition(((vectors - x) ** 2).sum(axis=1), 10)[:10],
+          repeat=10)
+    print("\n" + "=" * 70)
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        main()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
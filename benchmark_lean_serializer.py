@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Benchmark list serialization: DRF ModelSerializer vs LeanSerializer
+
+Runs against a throwaway test database, so db.sqlite3 is not touched.
+
+Usage: python benchmark_lean_serializer.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'disaster_dashboard.settings')
+django.setup()
+
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.lean import get_lean_serializer
+from disasters.models import DisasterEvent
+from disasters.serializers import DisasterEventSerializer
+
+
+def populate(rows):
+    DisasterEvent.objects.all().delete()
+    now = timezone.now()
+    DisasterEvent.objects.bulk_create(
+        (DisasterEvent(
+            disaster_type='flood',
+            status='active',
+            latitude=(i % 180) - 90,
+            longitude=(i % 360) - 180,
+            location_name=f'Site {i}',
+            risk_score=i % 100,
+            confidence_level=50 + i % 50,
+            rainfall_mm=i % 300 or None,
+            predicted_time=now - timedelta(minutes=i),
+        ) for i in range(rows)),
+        batch_size=5000,
+    )
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.3f}s")
+    return result, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    renderer = JSONRenderer()
+    lean = get_lean_serializer(DisasterEventSerializer)
+    queryset = DisasterEvent.objects.order_by('-predicted_time', '-id')
+
+    print("\n" + "=" * 70)
+    print("LIST SERIALIZATION BENCHMARK (DisasterEvent)")
+    print("=" * 70)
+
+    for rows in sizes:
+        populate(rows)
+        print(f"\n{rows} rows")
+
+        drf_body, drf_time = timed(
+            'DRF ModelSerializer',
+            lambda: renderer.render(DisasterEventSerializer(list(queryset.all()), many=True).data),
+        )
+        lean_body, lean_time = timed(
+            'LeanSerializer (values())',
+            lambda: renderer.render(lean.encode(lean.rows(queryset))),
+        )
+
+        assert drf_body == lean_body, "lean path rendered different JSON"
+        print(f"  speedup: {drf_time / lean_time:.2f}x, output byte-identical")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        main()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
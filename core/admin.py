@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import CustomUser, AuditLog, SystemConfiguration, Geofence, DataSource
+from .models import CustomUser, AuditLog, SystemConfiguration, Geofence, DataSource, QuarantinedRecord
 
 @admin.register(CustomUser)
 class CustomUserAdmin(BaseUserAdmin):
@@ -119,3 +119,21 @@ class DataSourceAdmin(admin.ModelAdmin):
         if not change:
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(QuarantinedRecord)
+class QuarantinedRecordAdmin(admin.ModelAdmin):
+    list_display = ['data_source', 'row_number', 'error_class', 'status', 'attempts', 'created_at']
+    list_filter = ['error_class', 'status', 'data_source']
+    search_fields = ['error_message']
+    readonly_fields = ['id', 'data_source', 'row_number', 'raw_record', 'record_hash', 'error_class', 'error_message', 'status', 'attempts', 'created_at', 'reprocessed_at']
+    actions = ['reprocess_records']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Reprocess selected rows through the normalizer')
+    def reprocess_records(self, request, queryset):
+        from core.data_sync import DataSyncManager
+        results = DataSyncManager.reprocess_quarantined(queryset, request.user)
+        self.message_user(request, f"Reprocessed {results['reprocessed']} rows, {results['failed']} still failing")
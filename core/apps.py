@@ -4,3 +4,8 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Core'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import install_search_indexes
+        post_migrate.connect(install_search_indexes, sender=self)
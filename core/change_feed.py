@@ -0,0 +1,181 @@
+"""
+Incremental change feeds (``?updated_since=<cursor>``)
+
+A feed page holds the rows created or modified after the cursor, ordered by
+(updated_at, id), and the ids of rows deleted after it, taken from
+Tombstone records written by post_delete. The returned cursor marks the last
+change in the page; passing it back continues from there. Tombstones of
+per-user rows carry the owner's id, so a viewset can scope deletions the
+way its get_queryset() scopes rows (see ChangeFeedMixin.scope_deletions).
+
+Changes from the last CHANGE_FEED_SETTLE_SECONDS are held back, so a write
+whose transaction commits after a later-stamped one is not skipped. Cursors
+older than the tombstone retention get 410 Gone and must resync from
+``updated_since=0``.
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Tombstone
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def _resource_type(model) -> str:
+    return model._meta.label_lower
+
+
+# Model -> attribute holding the owning user's id, for per-user rows
+_owner_fields: Dict[type, str] = {}
+
+
+def _record_tombstone(sender, instance, **kwargs):
+    owner_field = _owner_fields.get(sender)
+    owner_id = getattr(instance, owner_field) if owner_field else None
+    Tombstone.objects.create(
+        resource_type=_resource_type(sender), object_id=str(instance.pk),
+        owner_id=str(owner_id) if owner_id is not None else '',
+    )
+
+
+def record_deletions(*models, owner: Optional[str] = None) -> None:
+    """
+    Write a Tombstone for every deleted row of ``models``
+
+    ``owner`` names the attribute holding the id of the user a row belongs
+    to (e.g. ``'recipient_id'``); it is stored on the tombstone.
+    """
+    for model in models:
+        if owner:
+            _owner_fields[model] = owner
+        post_delete.connect(_record_tombstone, sender=model, dispatch_uid=f'tombstone:{_resource_type(model)}')
+
+
+def prune_tombstones(batch_size: int = 10000) -> int:
+    """Delete tombstones older than CHANGE_FEED_TOMBSTONE_RETENTION_DAYS"""
+    cutoff = timezone.now() - timedelta(days=settings.CHANGE_FEED_TOMBSTONE_RETENTION_DAYS)
+    deleted = 0
+    while True:
+        ids = list(Tombstone.objects.filter(deleted_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Tombstone.objects.filter(id__in=ids).delete()[0]
+
+
+def encode_cursor(moment, object_id) -> str:
+    raw = json.dumps({'t': moment.isoformat(), 'id': str(object_id)})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(value: str) -> Optional[Tuple[object, str]]:
+    """(time, id) position of a cursor; None for ``0`` (from the beginning)"""
+    if value == '0':
+        return None
+    moment = parse_datetime(value)
+    if moment is not None:
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment, ''
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+        moment = parse_datetime(data['t'])
+        object_id = str(data['id'])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+    if moment is None:
+        raise ValueError('Invalid cursor')
+    return moment, object_id
+
+
+class ChangeFeedMixin:
+    """
+    Serve ``list`` as a change feed when ``?updated_since=`` is given
+
+    The viewset's filters still apply to changed rows (a row that stops
+    matching them is simply no longer reported); tombstones are only
+    narrowed by scope_deletions(), and ids a client never had can be
+    ignored.
+    """
+    change_feed_param = 'updated_since'
+
+    def scope_deletions(self, deletions):
+        """Tombstones the requesting user may see; override alongside a scoped get_queryset()"""
+        return deletions
+
+    def list(self, request, *args, **kwargs):
+        value = request.query_params.get(self.change_feed_param)
+        if value is None:
+            return super().list(request, *args, **kwargs)
+        try:
+            position = decode_cursor(value)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        retention = timedelta(days=settings.CHANGE_FEED_TOMBSTONE_RETENTION_DAYS)
+        if position is not None and position[0] < now - retention:
+            return Response(
+                {'error': 'Cursor is older than the tombstone retention; resync from updated_since=0'},
+                status=status.HTTP_410_GONE
+            )
+        try:
+            page_size = min(int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = max(page_size, 1)
+        horizon = now - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+
+        # defer(None): the cursor needs updated_at even under ?fields=
+        rows = self.filter_queryset(self.get_queryset()).defer(None).filter(updated_at__lte=horizon)
+        deletions = self.scope_deletions(Tombstone.objects.filter(
+            resource_type=_resource_type(self.get_queryset().model), deleted_at__lte=horizon
+        ))
+        if position is not None and not position[1]:
+            # A plain timestamp: everything changed at or after it
+            rows = rows.filter(updated_at__gte=position[0])
+            deletions = deletions.filter(deleted_at__gte=position[0])
+        elif position is not None:
+            moment, object_id = position
+            try:
+                self.get_queryset().model._meta.pk.to_python(object_id)
+            except DjangoValidationError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = rows.filter(Q(updated_at__gt=moment) | Q(updated_at=moment, pk__gt=object_id))
+            deletions = deletions.filter(Q(deleted_at__gt=moment) | Q(deleted_at=moment, object_id__gt=object_id))
+        else:
+            # A client starting from scratch has nothing to delete yet
+            deletions = deletions.none()
+
+        rows = list(rows.order_by('updated_at', 'id')[:page_size + 1])
+        deletions = list(deletions.order_by('deleted_at', 'object_id')[:page_size + 1])
+
+        # Merge both streams in (time, id) order and cut at page_size
+        changes = sorted(
+            [(row.updated_at, str(row.pk), row) for row in rows]
+            + [(tombstone.deleted_at, tombstone.object_id, None) for tombstone in deletions],
+            key=lambda change: change[:2],
+        )
+        has_more = len(changes) > page_size
+        changes = changes[:page_size]
+
+        cursor = encode_cursor(*changes[-1][:2]) if changes else value
+
+        return Response({
+            'results': self.get_serializer([row for _, _, row in changes if row is not None], many=True).data,
+            'deleted': [object_id for _, object_id, row in changes if row is None],
+            'cursor': cursor,
+            'has_more': has_more,
+        })
@@ -0,0 +1,152 @@
+"""
+Conditional GET (ETag / Last-Modified) for API viewsets
+
+Validators come from a per-table change counter bumped by post_save and
+post_delete, plus the latest value of each ``conditional_fields`` column
+over the whole table. That max() is read from an index leading with the
+column, so no request pays for a COUNT or a scan of the filtered rows; a
+change anywhere in the table invalidates every list of it. A matching
+``If-None-Match`` or ``If-Modified-Since`` gets a 304 before anything is
+serialized.
+
+The counters are ChangeStamp rows, so every worker and management command
+reads and bumps the same ones. A counter is bumped once per transaction,
+after it commits: a bulk delete of many rows costs one UPDATE, and no
+writer holds the counter row's lock while its transaction runs.
+"""
+import hashlib
+from typing import Optional
+
+from django.db import connections, router, transaction
+from django.db.models import F, Max
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .models import ChangeStamp
+
+
+def changes(model) -> int:
+    """``model``'s change counter"""
+    version = ChangeStamp.objects.filter(pk=model._meta.label_lower).values_list('version', flat=True).first()
+    return version or 0
+
+
+def _increment(resource_type: str, using: str) -> None:
+    stamps = ChangeStamp.objects.using(using)
+    if stamps.filter(pk=resource_type).update(version=F('version') + 1):
+        return
+    _, created = stamps.get_or_create(pk=resource_type, defaults={'version': 1})
+    if not created:
+        # Another process created it first
+        stamps.filter(pk=resource_type).update(version=F('version') + 1)
+
+
+def bump_changes(model) -> None:
+    """Bump ``model``'s change counter when the current transaction commits; for writes that bypass model signals"""
+    using = router.db_for_write(model)
+    connection = connections[using]
+    resource_type = model._meta.label_lower
+    queued = connection.__dict__.setdefault('_queued_change_stamps', {})
+    # A rolled-back transaction or savepoint drops its callbacks, so the
+    # bump is only skipped while the earlier one is still pending
+    if any(func is queued.get(resource_type) for _, func, _ in connection.run_on_commit):
+        return
+
+    def stamp():
+        queued.pop(resource_type, None)
+        _increment(resource_type, using)
+
+    queued[resource_type] = stamp
+    transaction.on_commit(stamp, using=using)
+
+
+def _bump_changes(sender, **kwargs):
+    bump_changes(sender)
+
+
+def track_changes(model) -> None:
+    """Bump ``model``'s change counter whenever one of its rows is saved or deleted"""
+    uid = f'conditional:{model._meta.label_lower}'
+    post_save.connect(_bump_changes, sender=model, dispatch_uid=uid)
+    post_delete.connect(_bump_changes, sender=model, dispatch_uid=uid)
+
+
+def _etag(request, *parts) -> str:
+    # The path and user are part of the tag, so pages, filters, sparse
+    # fieldsets and per-user querysets never share one
+    user = getattr(request.user, 'pk', None)
+    raw = '|'.join(str(part) for part in (request.get_full_path(), user) + parts)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def queryset_etag(request, queryset, fields=(), *parts) -> str:
+    """ETag from the change counter of ``queryset``'s model and the max() of ``fields`` over it"""
+    stats = queryset.order_by().aggregate(**{f'_{field}': Max(field) for field in fields}) if fields else {}
+    return _etag(request, changes(queryset.model), *parts, *(_plain(value) for value in stats.values()))
+
+
+def not_modified(request, etag: str, last_modified: Optional[int] = None) -> Optional[HttpResponse]:
+    """A 304 carrying ``etag`` when the request's validators still match, else None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified on ``list`` and ``retrieve``
+
+    ``conditional_fields`` are the timestamp columns whose latest value, with
+    the change counter, identifies the state of the table; they should lead
+    an index. ``last_modified_field`` (an auto_now column, or None) adds
+    Last-Modified to detail responses. Lists only carry an ETag: deleting a
+    row does not move any max(), so a date alone could wrongly validate a
+    list.
+    """
+    conditional_fields = ('updated_at',)
+    last_modified_field: Optional[str] = 'updated_at'
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        queryset = getattr(cls, 'queryset', None)
+        if queryset is not None:
+            track_changes(queryset.model)
+
+    def list(self, request, *args, **kwargs):
+        # The whole table, not the filtered rows: its max() is one index lookup
+        model = self.get_queryset().model
+        etag = queryset_etag(request, model._default_manager.all(), self.conditional_fields)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        values = [getattr(instance, field) for field in self.conditional_fields]
+        # An auto_now column identifies the row's state by itself
+        counter = None if self.last_modified_field else changes(type(instance))
+        etag = _etag(request, counter, instance.pk, *(_plain(value) for value in values))
+        modified = getattr(instance, self.last_modified_field) if self.last_modified_field else None
+        last_modified = int(modified.timestamp()) if modified else None
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+
+        response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
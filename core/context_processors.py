@@ -0,0 +1,7 @@
+"""Template context shared by every page"""
+from . import push
+
+
+def live_updates(request):
+    # Pages poll instead of opening /api/stream/ when served through WSGI
+    return {'push_streams': push.streams_available(request)}
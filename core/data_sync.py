@@ -5,15 +5,30 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.db import DatabaseError, transaction
 from django.utils import timezone
 from disasters.models import DisasterEvent, DisasterData
-from core.models import DataSource, AuditLog
+from disasters.packed import is_packed_mode, pack_readings
+from disasters.rollups import apply_readings
+from disasters.scoring import score_events
+from disasters.shadow import enqueue_on_commit as enqueue_shadow_scoring
+from core.models import DataSource, AuditLog, QuarantinedRecord
+from core.conditional import bump_changes
 from core.file_reader import FileReaderFactory
 import os
 
 logger = logging.getLogger(__name__)
 
 
+class RecordRejected(Exception):
+    """A record that cannot be imported, with its quarantine error class"""
+    
+    def __init__(self, error_class: str, message: str):
+        super().__init__(message)
+        self.error_class = error_class
+        self.message = message
+
+
 class DataSyncManager:
     """Manages syncing data from uploaded files to disaster models"""
     
@@ -98,55 +113,187 @@ class DataSyncManager:
         """
         Process records as disaster events
         
+        Rejected rows are quarantined so they can be reprocessed later
+        without re-reading the file.
+        
         Returns:
             Tuple of (records_processed, list of errors)
         """
         processed = 0
         errors = []
+        rejected = []
         
+        def reject(idx, record, error_class, message, error=None):
+            errors.append(f"Row {idx}: {error or message}")
+            rejected.append(QuarantinedRecord.for_record(data_source, idx, record, error_class, message))
+        
+        # Normalize every row first so the batch is scored in one pass
+        prepared = []
         for idx, record in enumerate(records):
             try:
-                # Extract and validate required fields
-                disaster_data = cls._extract_disaster_data(record)
-                
-                # Skip if critical fields missing
-                if not disaster_data.get('disaster_type') or not disaster_data.get('location_name'):
-                    errors.append(f"Row {idx}: Missing disaster_type or location_name")
-                    continue
-                
-                # Check for duplicates (same type, location, and time)
-                existing = DisasterEvent.objects.filter(
-                    disaster_type=disaster_data['disaster_type'],
-                    location_name=disaster_data['location_name'],
-                    predicted_time=disaster_data.get('predicted_time', timezone.now())
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    for field, value in disaster_data.items():
-                        if hasattr(existing, field) and value is not None:
-                            setattr(existing, field, value)
-                    existing.save()
-                    logger.debug(f"Updated existing disaster event: {existing.id}")
-                else:
-                    # Create new record
-                    disaster = DisasterEvent.objects.create(**disaster_data)
-                    logger.debug(f"Created new disaster event: {disaster.id}")
-                
-                # Add data points if available
-                if 'data_points' in record:
-                    cls._create_data_points(disaster, record['data_points'], data_source)
-                
+                prepared.append((idx, record, cls._prepare_record(record)))
+            except RecordRejected as e:
+                reject(idx, record, e.error_class, e.message)
+            except ValueError as e:
+                reject(idx, record, 'validation', str(e), f"Validation error - {str(e)}")
+            except Exception as e:
+                logger.error(f"Error processing record {idx}: {str(e)}")
+                reject(idx, record, 'processing', str(e))
+        score_events(disaster_data for _, _, disaster_data in prepared)
+        
+        saved = []
+        for idx, record, disaster_data in prepared:
+            try:
+                saved.append(cls._save_record(disaster_data, record, data_source).pk)
                 processed += 1
-                
             except ValueError as e:
-                errors.append(f"Row {idx}: Validation error - {str(e)}")
+                reject(idx, record, 'validation', str(e), f"Validation error - {str(e)}")
             except Exception as e:
-                errors.append(f"Row {idx}: {str(e)}")
                 logger.error(f"Error processing record {idx}: {str(e)}")
+                reject(idx, record, 'processing', str(e))
+        
+        enqueue_shadow_scoring(saved)
+        
+        if rejected:
+            # Rows rejected on an earlier sync are already quarantined
+            QuarantinedRecord.objects.bulk_create(rejected, ignore_conflicts=True)
         
         return processed, errors
     
+    @classmethod
+    def _process_record(cls, record: Dict[str, Any], data_source: DataSource) -> DisasterEvent:
+        """
+        Normalize, score and save one record
+        
+        Raises:
+            RecordRejected: if required fields are missing
+            ValueError: if a value cannot be converted
+        """
+        disaster_data = cls._prepare_record(record)
+        score_events([disaster_data])
+        disaster = cls._save_record(disaster_data, record, data_source)
+        enqueue_shadow_scoring([disaster.pk])
+        return disaster
+    
+    @classmethod
+    def _prepare_record(cls, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalized DisasterEvent fields of one record
+        
+        Raises:
+            RecordRejected: if required fields are missing
+            ValueError: if a value cannot be converted
+        """
+        # Extract and validate required fields
+        disaster_data = cls._extract_disaster_data(record)
+        
+        # Skip if critical fields missing
+        if not disaster_data.get('disaster_type') or not disaster_data.get('location_name'):
+            raise RecordRejected('missing_fields', 'Missing disaster_type or location_name')
+        return disaster_data
+    
+    @classmethod
+    def _save_record(
+        cls, disaster_data: Dict[str, Any], record: Dict[str, Any], data_source: DataSource
+    ) -> DisasterEvent:
+        """Create or update the disaster event of a prepared record"""
+        # Check for duplicates (same type, location, and time)
+        disaster = DisasterEvent.objects.filter(
+            disaster_type=disaster_data['disaster_type'],
+            location_name=disaster_data['location_name'],
+            predicted_time=disaster_data.get('predicted_time', timezone.now())
+        ).first()
+        
+        if disaster:
+            # Update existing record
+            for field, value in disaster_data.items():
+                if hasattr(disaster, field) and value is not None:
+                    setattr(disaster, field, value)
+            disaster.save()
+            logger.debug(f"Updated existing disaster event: {disaster.id}")
+        else:
+            # Create new record
+            disaster = DisasterEvent.objects.create(**disaster_data)
+            logger.debug(f"Created new disaster event: {disaster.id}")
+        
+        # Add data points if available
+        if 'data_points' in record:
+            cls._create_data_points(disaster, record['data_points'], data_source)
+        
+        return disaster
+    
+    @classmethod
+    def reprocess_quarantined(cls, records, user=None) -> Dict[str, int]:
+        """
+        Run quarantined rows through the normalizer again
+        
+        Rows that now succeed are marked reprocessed; rows that still fail
+        keep their quarantine entry with the new error.
+        
+        Returns:
+            Dictionary with reprocessed and failed counts
+        """
+        now = timezone.now()
+        reprocessed = []
+        failed = []
+        
+        for quarantined in records.filter(status='pending').select_related('data_source').iterator():
+            try:
+                # A row that fails half-way leaves nothing behind
+                with transaction.atomic():
+                    cls._process_record(quarantined.raw_record, quarantined.data_source)
+                quarantined.status = 'reprocessed'
+                quarantined.reprocessed_at = now
+                reprocessed.append(quarantined)
+            except Exception as e:
+                if isinstance(e, RecordRejected):
+                    quarantined.error_class, quarantined.error_message = e.error_class, e.message
+                elif isinstance(e, ValueError):
+                    quarantined.error_class, quarantined.error_message = 'validation', str(e)
+                else:
+                    quarantined.error_class, quarantined.error_message = 'processing', str(e)
+                failed.append(quarantined)
+            quarantined.attempts += 1
+        
+        QuarantinedRecord.objects.bulk_update(
+            reprocessed + failed,
+            ['status', 'reprocessed_at', 'error_class', 'error_message', 'attempts'],
+            batch_size=500,
+        )
+        
+        if user:
+            AuditLog.objects.create(
+                user=user,
+                action='update',
+                resource_type='QuarantinedRecord',
+                resource_id='bulk',
+                description=f"Reprocessed quarantined rows: {len(reprocessed)} succeeded, {len(failed)} failed",
+                new_values={'reprocessed': len(reprocessed), 'failed': len(failed)}
+            )
+        
+        logger.info(f"Reprocessed quarantine: {len(reprocessed)} succeeded, {len(failed)} failed")
+        return {'reprocessed': len(reprocessed), 'failed': len(failed)}
+    
+    # Source column aliases per target field, tried in order
+    FIELD_MAPPINGS = {
+        'disaster_type': ['disaster_type', 'type', 'event_type', 'disaster'],
+        'status': ['status', 'state'],
+        'latitude': ['latitude', 'lat', 'y'],
+        'longitude': ['longitude', 'lon', 'long', 'x'],
+        'location_name': ['location_name', 'location', 'place', 'area'],
+        'risk_score': ['risk_score', 'risk', 'severity'],
+        'confidence_level': ['confidence_level', 'confidence'],
+        'magnitude': ['magnitude', 'mag'],
+        'wind_speed_kmh': ['wind_speed_kmh', 'wind_speed', 'windspeed'],
+        'rainfall_mm': ['rainfall_mm', 'rainfall', 'rain'],
+        'affected_area_sqkm': ['affected_area_sqkm', 'area', 'affected_area'],
+        'predicted_time': ['predicted_time', 'time', 'timestamp', 'datetime'],
+        'start_time': ['start_time', 'start'],
+        'end_time': ['end_time', 'end'],
+        'estimated_affected_population': ['estimated_affected_population', 'population', 'people'],
+        'estimated_damage_usd': ['estimated_damage_usd', 'damage', 'cost'],
+    }
+    
     # Mapping for string severity/risk values
     SEVERITY_MAPPING = {
         'critical': 90.0,
@@ -174,26 +321,7 @@ class DataSyncManager:
         disaster_data = {}
         
         # Map fields
-        field_mappings = {
-            'disaster_type': ['disaster_type', 'type', 'event_type', 'disaster'],
-            'status': ['status', 'state'],
-            'latitude': ['latitude', 'lat', 'y'],
-            'longitude': ['longitude', 'lon', 'long', 'x'],
-            'location_name': ['location_name', 'location', 'place', 'area'],
-            'risk_score': ['risk_score', 'risk', 'severity'],
-            'confidence_level': ['confidence_level', 'confidence'],
-            'magnitude': ['magnitude', 'mag'],
-            'wind_speed_kmh': ['wind_speed_kmh', 'wind_speed', 'windspeed'],
-            'rainfall_mm': ['rainfall_mm', 'rainfall', 'rain'],
-            'affected_area_sqkm': ['affected_area_sqkm', 'area', 'affected_area'],
-            'predicted_time': ['predicted_time', 'time', 'timestamp', 'datetime'],
-            'start_time': ['start_time', 'start'],
-            'end_time': ['end_time', 'end'],
-            'estimated_affected_population': ['estimated_affected_population', 'population', 'people'],
-            'estimated_damage_usd': ['estimated_damage_usd', 'damage', 'cost'],
-        }
-        
-        for target_field, source_fields in field_mappings.items():
+        for target_field, source_fields in cls.FIELD_MAPPINGS.items():
             for source_field in source_fields:
                 if source_field in normalized and normalized[source_field]:
                     try:
@@ -280,18 +408,44 @@ class DataSyncManager:
         if isinstance(data_points, dict):
             data_points = [data_points]
         
+        readings = []
         for point in data_points:
             try:
-                DisasterData.objects.create(
+                readings.append(DisasterData(
                     event=event,
                     data_type=point.get('data_type', 'measurement'),
                     value=float(point.get('value', 0)),
                     unit=point.get('unit', ''),
                     source=data_source.name,
                     timestamp=cls._parse_datetime(point.get('timestamp', timezone.now()))
-                )
+                ))
             except Exception as e:
                 logger.warning(f"Could not create data point: {e}")
+        
+        try:
+            with transaction.atomic():
+                stored = cls._store_readings(readings)
+        except DatabaseError as e:
+            # One bad reading must not cost the rest of the batch
+            logger.warning(f"Could not insert {len(readings)} data points at once, retrying one by one: {e}")
+            stored = []
+            for reading in readings:
+                try:
+                    with transaction.atomic():
+                        stored.extend(cls._store_readings([reading]))
+                except DatabaseError as e:
+                    logger.warning(f"Could not create data point: {e}")
+        apply_readings(stored)
+        # bulk_create and packing skip the signals that count changes
+        bump_changes(DisasterData)
+    
+    @classmethod
+    def _store_readings(cls, readings: List[DisasterData]) -> List[DisasterData]:
+        """Insert readings as rows or into chunks; returns those newly stored"""
+        if is_packed_mode():
+            return pack_readings(readings)
+        DisasterData.objects.bulk_create(readings)
+        return readings
     
     @classmethod
     def sync_all_active_sources(cls, user=None) -> Dict[str, Any]:
@@ -0,0 +1,111 @@
+"""
+Sparse fieldsets for API viewsets (``?fields=`` / ``?exclude=``)
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import relations, serializers
+from rest_framework.exceptions import ValidationError
+
+
+@lru_cache(maxsize=None)
+def serializer_columns(serializer_class) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    (field name, model column) pairs of a serializer's readable fields
+
+    The column is None when the field is not a plain concrete model field
+    (method fields, dotted sources, nested serializers), in which case its
+    inputs are unknown and no SQL projection is attempted.
+    """
+    serializer = serializer_class()
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        column = None
+        plain = not isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer,
+                                       relations.ManyRelatedField))
+        if model is not None and plain and '.' not in field.source and field.source != '*':
+            try:
+                model_field = model._meta.get_field(field.source)
+                if model_field.concrete and not model_field.many_to_many:
+                    column = model_field.name
+            except FieldDoesNotExist:
+                pass
+        columns.append((name, column))
+    return tuple(columns)
+
+
+class SparseFieldsMixin:
+    """
+    Limit GET responses to ``?fields=a,b`` or drop ``?exclude=c,d``
+
+    Unrequested fields are removed from the serializer and, when every
+    requested field maps to a model column, from the SQL via ``only()``.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+
+    def get_sparse_fields(self) -> Optional[List[str]]:
+        """Requested field names in serializer order, or None for all fields"""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+
+        self._sparse_fields = None
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        requested = _split(request.query_params.get(self.fields_query_param))
+        excluded = _split(request.query_params.get(self.exclude_query_param))
+        if not requested and not excluded:
+            return None
+
+        available = [name for name, _ in serializer_columns(self.get_serializer_class())]
+        unknown = sorted((set(requested) | set(excluded)) - set(available))
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}"})
+
+        self._sparse_fields = [
+            name for name in available
+            if (not requested or name in requested) and name not in excluded
+        ]
+        return self._sparse_fields
+
+    def get_sparse_columns(self) -> Optional[List[str]]:
+        """Model columns needed for the requested fields, or None if unknown"""
+        names = self.get_sparse_fields()
+        if names is None:
+            return None
+        columns: Dict[str, Optional[str]] = dict(serializer_columns(self.get_serializer_class()))
+        if any(columns[name] is None for name in names):
+            return None
+
+        needed = ['pk']
+        for field in list(getattr(self, 'ordering', None) or []) + [columns[name] for name in names]:
+            field = field.lstrip('-')
+            if field not in needed:
+                needed.append(field)
+        return needed
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        columns = self.get_sparse_columns()
+        if columns is not None:
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in names:
+                    target.fields.pop(name)
+        return serializer
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
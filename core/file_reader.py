@@ -4,9 +4,11 @@ Supports CSV, JSON, XML, and TXT formats
 """
 import csv
 import json
+import mmap
+import re
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 import logging
 from datetime import datetime
 
@@ -29,20 +31,129 @@ class FileReader:
 class CSVReader(FileReader):
     """CSV file reader"""
     
+    # One record: unquoted runs and quoted sections (which may span lines)
+    RECORD_PATTERN = re.compile(rb'(?:[^"\n]*"[^"]*(?:"|\Z))*[^"\n]*\n?')
+    
+    def __init__(self, file_path: str, use_mmap: bool = False):
+        super().__init__(file_path)
+        self.use_mmap = use_mmap
+    
     def read(self) -> List[Dict[str, Any]]:
         """Read CSV file and return list of dictionaries"""
         try:
-            records = []
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row:  # Skip empty rows
-                        records.append(row)
+            if self.use_mmap:
+                records = [record for _, record in self.iter_records()]
+            else:
+                records = []
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        if row:  # Skip empty rows
+                            records.append(row)
             logger.info(f"Read {len(records)} records from CSV: {self.file_path}")
             return records
         except Exception as e:
             logger.error(f"Error reading CSV file {self.file_path}: {str(e)}")
             raise
+    
+    def iter_records(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Memory-map the file and yield (byte_offset, record) pairs
+        
+        Record boundaries are found by scanning the mapped buffer, so only the
+        bytes of each record are decoded. ``start``/``end`` restrict reading to
+        records beginning in that byte range; ``start`` must be a record
+        boundary (0 or an offset previously yielded or returned by
+        split_ranges). The header is always taken from the first record.
+        """
+        if self.file_path.stat().st_size == 0:
+            return
+        
+        with open(self.file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            view = memoryview(buffer)
+            try:
+                boundaries = self._scan_boundaries(buffer, 0)
+                header_start, header_end = next(boundaries, (0, 0))
+                boundaries.close()
+                header = next(csv.reader([self._decode(view, header_start, header_end)]), [])
+                
+                if start <= header_start:
+                    start = header_end
+                limit = len(buffer) if end is None else end
+                
+                offsets = []
+                
+                def lines():
+                    for record_start, record_end in self._scan_boundaries(buffer, start):
+                        if record_start >= limit:
+                            return
+                        offsets.append(record_start)
+                        yield self._decode(view, record_start, record_end)
+                
+                for index, row in enumerate(csv.reader(lines())):
+                    if not row:  # Skip empty rows, as csv.DictReader does
+                        continue
+                    yield offsets[index], self._to_dict(header, row)
+            finally:
+                view.release()
+    
+    def split_ranges(self, parts: int) -> List[Tuple[int, int]]:
+        """
+        Split the data records into up to ``parts`` byte ranges of similar size
+        
+        Each range starts on a record boundary and can be passed to
+        iter_records(start, end), e.g. by parallel workers.
+        """
+        size = self.file_path.stat().st_size
+        if size == 0:
+            return []
+        
+        with open(self.file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            boundaries = self._scan_boundaries(buffer, 0)
+            _, first = next(boundaries, (0, size))
+            target = max((size - first) // max(parts, 1), 1)
+            
+            ranges = []
+            range_start = first
+            for record_start, _ in boundaries:
+                if record_start - range_start >= target and len(ranges) < parts - 1:
+                    ranges.append((range_start, record_start))
+                    range_start = record_start
+            if range_start < size:
+                ranges.append((range_start, size))
+            return ranges
+    
+    @classmethod
+    def _scan_boundaries(cls, buffer, pos: int) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) of each record, honouring newlines inside quotes"""
+        size = len(buffer)
+        for match in cls.RECORD_PATTERN.finditer(buffer, pos):
+            start, end = match.span()
+            if start == end:
+                if start < size:
+                    # Unterminated quote: the rest of the file is one record
+                    yield start, size
+                return
+            yield start, end
+    
+    @staticmethod
+    def _decode(view: memoryview, start: int, end: int) -> str:
+        text = str(view[start:end], 'utf-8')
+        if '\r' in text:
+            # Match the universal-newline translation of the open()-based path
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+    
+    @staticmethod
+    def _to_dict(header: List[str], row: List[str]) -> Dict[str, Any]:
+        """Mirror csv.DictReader: missing values become None, extras go under None"""
+        record = dict(zip(header, row))
+        if len(row) > len(header):
+            record[None] = row[len(header):]
+        elif len(row) < len(header):
+            for key in header[len(row):]:
+                record[key] = None
+        return record
 
 
 class JSONReader(FileReader):
@@ -136,8 +247,8 @@ class FileReaderFactory:
     }
     
     @classmethod
-    def create_reader(cls, file_path: str) -> FileReader:
-        """Create appropriate reader based on file extension"""
+    def create_reader(cls, file_path: str, **options) -> FileReader:
+        """Create appropriate reader based on file extension (options go to the reader)"""
         path = Path(file_path)
         ext = path.suffix.lower()
         
@@ -145,10 +256,10 @@ class FileReaderFactory:
             raise ValueError(f"Unsupported file format: {ext}")
         
         reader_class = cls.READERS[ext]
-        return reader_class(file_path)
+        return reader_class(file_path, **options)
     
     @classmethod
-    def read_file(cls, file_path: str) -> List[Dict[str, Any]]:
+    def read_file(cls, file_path: str, **options) -> List[Dict[str, Any]]:
         """Convenience method to read a file"""
-        reader = cls.create_reader(file_path)
+        reader = cls.create_reader(file_path, **options)
         return reader.read()
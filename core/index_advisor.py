@@ -0,0 +1,172 @@
+"""
+Index advice from the slow-query log (see core.query_log)
+
+For every slow statement the columns it filters on are read from its WHERE
+clause, per table: equality filters (=, IN, IS) and range filters (<, >,
+BETWEEN), plus ORDER BY columns. The query plan says how each table was
+read. A full scan, or an index search constrained on fewer columns than the
+statement filters on, makes the table a candidate for a composite index:
+the equality columns, then one range (or, failing that, ORDER BY) column.
+Candidates already served by an existing index prefix are dropped.
+"""
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.apps import apps
+
+COLUMN_OP = re.compile(
+    r'"(?P<table>\w+)"\."(?P<column>\w+)"\s*(?P<op>>=|<=|=|>|<|IN\b|IS\b|BETWEEN\b)\s*(?P<rhs>\S+)',
+    re.IGNORECASE,
+)
+# Boolean filters are rendered as a bare (or NOT-ed) column on SQLite
+BARE_COLUMN = re.compile(
+    r'(?:^|\bAND\b|\bOR\b|\bNOT\b|\()\s*"(\w+)"\."(\w+)"\s*(?=$|\bAND\b|\bOR\b|\))',
+    re.IGNORECASE,
+)
+ORDER_COLUMN = re.compile(r'"(\w+)"\."(\w+)"')
+EQUALITY_OPS = {'=', 'IN', 'IS'}
+
+# SQLite: "SCAN t", "SEARCH t USING INDEX i (a=? AND b>?)"; PostgreSQL: "Seq Scan on t"
+SQLITE_ACCESS = re.compile(
+    r'^(?P<kind>SCAN|SEARCH) (?:TABLE )?(?P<table>\w+)(?: AS \w+)?'
+    r'(?: USING (?:COVERING )?INDEX \w+(?: \((?P<constraint>[^)]*)\))?)?'
+)
+POSTGRES_SEQ_SCAN = re.compile(r'Seq Scan on (?P<table>\w+)')
+
+
+@dataclass
+class Candidate:
+    table: str
+    columns: Tuple[str, ...]
+    calls: int = 0
+    total_ms: float = 0.0
+    views: Set[str] = field(default_factory=set)
+    plan: str = ''
+    model_label: Optional[str] = None
+    fields: Tuple[str, ...] = ()
+
+
+def read_log(path) -> List[dict]:
+    records = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def _clauses(sql: str) -> Tuple[str, str]:
+    """(WHERE clause, ORDER BY clause) of the outermost statement"""
+    upper = sql.upper()
+    where_at = upper.find(' WHERE ')
+    order_at = upper.rfind(' ORDER BY ')
+    where_end = len(sql)
+    for keyword in (' GROUP BY ', ' ORDER BY ', ' LIMIT ', ' HAVING '):
+        at = upper.find(keyword, where_at + 1 if where_at >= 0 else 0)
+        if at >= 0:
+            where_end = min(where_end, at)
+    where = sql[where_at + 7:where_end] if where_at >= 0 else ''
+    order = sql[order_at + 10:] if order_at >= 0 else ''
+    limit_at = order.upper().find(' LIMIT ')
+    return where, order[:limit_at] if limit_at >= 0 else order
+
+
+def filter_columns(sql: str) -> Dict[str, Dict[str, List[str]]]:
+    """{table: {'eq': [...], 'range': [...], 'order': [...]}} from a statement"""
+    where, order = _clauses(sql)
+    tables: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: {'eq': [], 'range': [], 'order': []})
+    for match in COLUMN_OP.finditer(where):
+        # Column-to-column comparisons are joins, not filters
+        if match.group('rhs').startswith('"'):
+            continue
+        kind = 'eq' if match.group('op').upper() in EQUALITY_OPS else 'range'
+        columns = tables[match.group('table')][kind]
+        if match.group('column') not in columns:
+            columns.append(match.group('column'))
+    for table, column in BARE_COLUMN.findall(where.strip()):
+        columns = tables[table]['eq']
+        if column not in columns:
+            columns.append(column)
+    for table, column in ORDER_COLUMN.findall(order):
+        columns = tables[table]['order']
+        if column not in columns:
+            columns.append(column)
+    return tables
+
+
+def table_access(plan: Iterable[str]) -> Dict[str, int]:
+    """{table: columns the index search is constrained on (0 = full scan)}"""
+    access: Dict[str, int] = {}
+    for line in plan or []:
+        line = line.strip()
+        match = SQLITE_ACCESS.match(line)
+        if match:
+            constraint = match.group('constraint') or ''
+            used = 0 if match.group('kind') == 'SCAN' else len(re.findall(r'[=<>]', constraint))
+            access[match.group('table')] = min(used, access.get(match.group('table'), used))
+            continue
+        match = POSTGRES_SEQ_SCAN.search(line)
+        if match:
+            access[match.group('table')] = 0
+    return access
+
+
+def analyze(records: Iterable[dict]) -> List[Candidate]:
+    """Index candidates from slow-query records, costliest first"""
+    candidates: Dict[Tuple[str, Tuple[str, ...]], Candidate] = {}
+    for record in records:
+        access = table_access(record.get('plan'))
+        for table, columns in filter_columns(record.get('sql', '')).items():
+            if table not in access:
+                continue
+            wanted = tuple(columns['eq'] + (columns['range'][:1] or columns['order'][:1]))
+            if not columns['eq'] and not columns['range']:
+                continue
+            if access[table] >= len(wanted):
+                continue
+            candidate = candidates.setdefault((table, wanted), Candidate(table, wanted))
+            candidate.calls += 1
+            candidate.total_ms += record.get('ms', 0)
+            candidate.views.add(record.get('view') or '?')
+            candidate.plan = candidate.plan or '; '.join(record.get('plan') or [])
+    return sorted(
+        (c for c in candidates.values() if _resolve(c)),
+        key=lambda c: c.total_ms, reverse=True,
+    )
+
+
+def _existing_prefixes(model) -> List[Tuple[str, ...]]:
+    def columns(names):
+        return tuple(model._meta.get_field(name).column for name in names)
+
+    indexes = [(model._meta.pk.column,)]
+    for model_field in model._meta.concrete_fields:
+        if model_field.db_index or model_field.unique:
+            indexes.append((model_field.column,))
+    for index in model._meta.indexes:
+        indexes.append(columns(name.lstrip('-') for name in index.fields))
+    for group in list(model._meta.unique_together) + list(getattr(model._meta, 'index_together', ())):
+        indexes.append(columns(group))
+    return indexes
+
+
+def _resolve(candidate: Candidate) -> bool:
+    """Attach the model and field names; False if unknown or already indexed"""
+    model = next((m for m in apps.get_models() if m._meta.db_table == candidate.table), None)
+    if model is None:
+        return False
+    by_column = {f.column: f.name for f in model._meta.concrete_fields}
+    if any(column not in by_column for column in candidate.columns):
+        return False
+    if any(index[:len(candidate.columns)] == candidate.columns for index in _existing_prefixes(model)):
+        return False
+    candidate.model_label = f'{model._meta.app_label}.{model.__name__}'
+    candidate.fields = tuple(by_column[column] for column in candidate.columns)
+    return True
@@ -0,0 +1,169 @@
+"""
+Lean read-only serialization for high-volume list endpoints
+
+A LeanSerializer is compiled once from a plain ModelSerializer: each declared
+field gets a small encoder function that reproduces the DRF field's
+``to_representation``. Rows are fetched with ``values()`` so no model
+instances or per-object field machinery are created, and the encoded output
+renders to the same JSON as the DRF serializer.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+from rest_framework import relations, serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+
+class UnsupportedField(Exception):
+    """Raised when a serializer field cannot be fetched through values()"""
+
+
+def _identity(value):
+    return value
+
+
+# Placeholder for ISO 8601 datetime fields, bound to the active timezone per call
+ISO_DATETIME = object()
+
+
+def _datetime_encoder(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return _identity
+    if output_format.lower() != ISO_8601 or getattr(field, 'timezone', None) is not None:
+        return field.to_representation
+    return ISO_DATETIME
+
+
+def _iso_datetime(tz) -> Callable[[Any], Any]:
+    """Same output as DateTimeField.to_representation in timezone ``tz``"""
+    def encode(value):
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return encode
+
+
+def _encoder_for(field) -> Callable[[Any], Any]:
+    """Encoder matching ``field.to_representation`` for non-null values"""
+    if isinstance(field, serializers.UUIDField):
+        return str if field.uuid_format == 'hex_verbose' else field.to_representation
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            return field.pk_field.to_representation
+        # values() already yields the related pk
+        return _identity
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_encoder(field)
+    if isinstance(field, serializers.ChoiceField):
+        choices = field.choice_strings_to_values
+        return lambda value: choices.get(str(value), value) if value != '' else value
+    if isinstance(field, serializers.BooleanField):
+        return bool
+    if isinstance(field, serializers.FloatField):
+        return float
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.JSONField) and not field.binary:
+        return _identity
+    return field.to_representation
+
+
+class LeanSerializer:
+    """Encoder for ``values()`` rows, compiled from a ModelSerializer class"""
+
+    def __init__(self, serializer_class, names: Optional[Tuple[str, ...]] = None):
+        self.serializer_class = serializer_class
+        self.fields: List[Tuple[str, str, Any, bool]] = []
+
+        for name, field in serializer_class().fields.items():
+            if field.write_only or (names is not None and name not in names):
+                continue
+            if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer,
+                                  relations.ManyRelatedField)) or '.' in field.source or field.source == '*':
+                raise UnsupportedField(f"{serializer_class.__name__}.{name} cannot be read from values()")
+            self.fields.append((name, field.source, _encoder_for(field), field.allow_null))
+
+        self.value_fields = [source for _, source, _, _ in self.fields]
+        self._encode_row = self._compile()
+
+    def _compile(self):
+        """
+        Build one function that turns a values() row into the output dict
+
+        Identity encoders are inlined and the None check is only emitted for
+        nullable fields, so each row costs a single dict display.
+        """
+        items = []
+        for index, (name, source, encode, nullable) in enumerate(self.fields):
+            value = f'row[{source!r}]'
+            if encode is not _identity:
+                if nullable:
+                    value = f'None if (v{index} := {value}) is None else e{index}(v{index})'
+                else:
+                    value = f'e{index}({value})'
+            items.append(f'{name!r}: {value}')
+        arguments = ''.join(f', e{index}' for index in range(len(self.fields)))
+        source = f'def encode_row(row{arguments}):\n    return {{{", ".join(items)}}}\n'
+        namespace = {}
+        exec(compile(source, f'<lean {self.serializer_class.__name__}>', 'exec'), namespace)
+        return namespace['encode_row']
+
+    def rows(self, queryset, extra: Iterable[str] = ()):
+        """
+        The queryset as ``values()`` rows carrying every source field, plus
+        ``extra`` columns (e.g. for cursor pagination) left out of the output
+        """
+        columns = list(self.value_fields)
+        columns.extend(column for column in extra if column not in columns)
+        return queryset.values(*columns)
+
+    def encode(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        iso_datetime = _iso_datetime(timezone.get_current_timezone())
+        encoders = [iso_datetime if encode is ISO_DATETIME else encode for _, _, encode, _ in self.fields]
+        encode_row = self._encode_row
+        return [encode_row(row, *encoders) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_lean_serializer(serializer_class, names: Optional[Tuple[str, ...]] = None):
+    """Compiled LeanSerializer for a serializer class, or None if unsupported"""
+    try:
+        return LeanSerializer(serializer_class, names)
+    except UnsupportedField:
+        return None
+
+
+class LeanListMixin:
+    """
+    Serve ``list`` from ``values()`` rows through a LeanSerializer
+
+    Falls back to the regular serializer when the serializer has fields the
+    lean path cannot reproduce. Set ``lean_list = False`` to disable. Honours
+    SparseFieldsMixin's ``?fields=``/``?exclude=`` when combined with it.
+    """
+    lean_list = True
+
+    def list(self, request, *args, **kwargs):
+        lean = None
+        if self.lean_list:
+            names = self.get_sparse_fields() if hasattr(self, 'get_sparse_fields') else None
+            lean = get_lean_serializer(self.get_serializer_class(), tuple(names) if names is not None else None)
+        if lean is None:
+            return super().list(request, *args, **kwargs)
+
+        # Ordering columns stay available to the paginator even if not requested
+        ordering = list(getattr(self, 'ordering', None) or []) + list(getattr(self, 'ordering_fields', None) or [])
+        extra = [field.lstrip('-') for field in ordering if isinstance(field, str)] + ['id']
+        queryset = self.filter_queryset(self.get_queryset())
+        # Annotations added by the filters (e.g. search rank) may be ordered on too
+        rows = lean.rows(queryset, extra + list(queryset.query.annotations))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(lean.encode(page))
+        return Response(lean.encode(rows))
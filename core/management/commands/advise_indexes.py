@@ -0,0 +1,45 @@
+"""
+Management command to propose composite indexes from the slow-query log
+"""
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.index_advisor import analyze, read_log
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the slow-query log and propose indexes for full scans on hot filters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log',
+            default=None,
+            help='Slow-query log file (default: SLOW_QUERY_LOG["FILE"])'
+        )
+        parser.add_argument(
+            '--min-calls',
+            type=int,
+            default=1,
+            help='Ignore candidates seen fewer times than this (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.SLOW_QUERY_LOG['FILE']
+        if not os.path.exists(path):
+            raise CommandError(f'No slow-query log at {path}; enable SLOW_QUERY_LOG to collect one')
+
+        records = read_log(path)
+        candidates = [c for c in analyze(records) if c.calls >= options['min_calls']]
+        self.stdout.write(f'{len(records)} slow queries read from {path}')
+        if not candidates:
+            self.stdout.write(self.style.SUCCESS('No missing indexes found'))
+            return
+
+        for candidate in candidates:
+            fields = ', '.join(f"'{name}'" for name in candidate.fields)
+            self.stdout.write(
+                f'\n{candidate.model_label}: {candidate.calls} queries, '
+                f'{candidate.total_ms:.1f} ms total ({", ".join(sorted(candidate.views))})'
+            )
+            self.stdout.write(f'  plan: {candidate.plan}')
+            self.stdout.write(self.style.SUCCESS(f'  models.Index(fields=[{fields}])'))
@@ -0,0 +1,21 @@
+"""
+Management command to delete expired change-feed tombstones
+"""
+from django.core.management.base import BaseCommand
+from core.change_feed import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones older than CHANGE_FEED_TOMBSTONE_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Rows deleted per transaction (default: 10000)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} tombstones deleted'))
@@ -0,0 +1,27 @@
+"""
+Management command to rebuild the FTS5 full-text search indexes
+"""
+from django.core.management.base import BaseCommand
+from core.search import ensure_search_indexes
+
+
+class Command(BaseCommand):
+    help = 'Create missing full-text search tables and triggers and reindex every indexed model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias (default: default)'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only reindex tables that are missing or out of sync (e.g. after VACUUM)'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = ensure_search_indexes(options['database'], rebuild=not options['check'])
+        for table in rebuilt:
+            self.stdout.write(f"  {table} rebuilt")
+        self.stdout.write(self.style.SUCCESS('Full-text search indexes ready'))
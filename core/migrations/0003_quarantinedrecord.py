@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:57
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_datasource_file_path_alter_datasource_endpoint_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedRecord',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('row_number', models.IntegerField()),
+                ('raw_record', models.JSONField()),
+                ('record_hash', models.CharField(max_length=64)),
+                ('error_class', models.CharField(choices=[('missing_fields', 'Missing Fields'), ('validation', 'Validation Error'), ('processing', 'Processing Error')], max_length=50)),
+                ('error_message', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('reprocessed', 'Reprocessed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reprocessed_at', models.DateTimeField(blank=True, null=True)),
+                ('data_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quarantined_records', to='core.datasource')),
+            ],
+            options={
+                'ordering': ['data_source', 'row_number'],
+                'indexes': [models.Index(fields=['data_source', 'status'], name='core_quaran_data_so_b05aaa_idx'), models.Index(fields=['error_class', 'status'], name='core_quaran_error_c_6955b9_idx')],
+                'unique_together': {('data_source', 'record_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:25
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_auditlog_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('resource_type', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=255)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'object_id'],
+                'indexes': [models.Index(fields=['resource_type', 'deleted_at', 'object_id'], name='core_tombst_resourc_5dfd02_idx')],
+            },
+        ),
+    ]
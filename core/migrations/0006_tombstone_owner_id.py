@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='owner_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:30
+
+import json
+
+from django.db import migrations
+
+
+def rehash_records(apps, schema_editor):
+    from core.models import QuarantinedRecord as CurrentQuarantinedRecord
+
+    QuarantinedRecord = apps.get_model('core', 'QuarantinedRecord')
+    records = QuarantinedRecord.objects.only('id', 'row_number', 'raw_record')
+    batch = []
+    for record in records.iterator(chunk_size=2000):
+        raw = json.dumps(record.raw_record, sort_keys=True, default=str)
+        record.record_hash = CurrentQuarantinedRecord.hash_record(record.row_number, raw)
+        batch.append(record)
+        if len(batch) >= 2000:
+            QuarantinedRecord.objects.bulk_update(batch, ['record_hash'])
+            batch = []
+    QuarantinedRecord.objects.bulk_update(batch, ['record_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tombstone_owner_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(rehash_records, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+import hashlib
+import json
 import uuid
 
 class CustomUser(AbstractUser):
@@ -58,6 +61,7 @@ class AuditLog(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['user', 'timestamp']),
+            models.Index(fields=['timestamp', 'id']),
             models.Index(fields=['action']),
             models.Index(fields=['resource_type']),
         ]
@@ -130,3 +134,85 @@ class DataSource(models.Model):
     
     def __str__(self):
         return self.name
+
+
+class QuarantinedRecord(models.Model):
+    ERROR_CLASSES = (
+        ('missing_fields', 'Missing Fields'),
+        ('validation', 'Validation Error'),
+        ('processing', 'Processing Error'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('reprocessed', 'Reprocessed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    data_source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name='quarantined_records')
+    row_number = models.IntegerField()
+    raw_record = models.JSONField()
+    record_hash = models.CharField(max_length=64)
+    error_class = models.CharField(max_length=50, choices=ERROR_CLASSES)
+    error_message = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    reprocessed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['data_source', 'row_number']
+        unique_together = ('data_source', 'record_hash')
+        indexes = [
+            models.Index(fields=['data_source', 'status']),
+            models.Index(fields=['error_class', 'status']),
+        ]
+    
+    @classmethod
+    def for_record(cls, data_source, row_number, record, error_class, error_message):
+        """Build an unsaved quarantine entry, keyed by a hash of the row number and raw record"""
+        raw = json.dumps(record, sort_keys=True, default=str)
+        return cls(
+            data_source=data_source,
+            row_number=row_number,
+            raw_record=json.loads(raw),
+            record_hash=cls.hash_record(row_number, raw),
+            error_class=error_class,
+            error_message=error_message,
+        )
+    
+    @staticmethod
+    def hash_record(row_number, raw: str) -> str:
+        # Identical rows at different positions are separate rejections
+        return hashlib.sha256(f'{row_number}:{raw}'.encode('utf-8')).hexdigest()
+    
+    def __str__(self):
+        return f"{self.data_source} row {self.row_number} ({self.error_class})"
+
+
+class Tombstone(models.Model):
+    """A deleted row, reported by the change feeds until pruned"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    resource_type = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=255)
+    # Id of the user a per-user row belonged to; blank for shared rows
+    owner_id = models.CharField(max_length=255, blank=True, default='')
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['deleted_at', 'object_id']
+        indexes = [
+            models.Index(fields=['resource_type', 'deleted_at', 'object_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.resource_type} {self.object_id} deleted"
+
+
+class ChangeStamp(models.Model):
+    """Per-table change counter behind the conditional GET validators"""
+    resource_type = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.resource_type} v{self.version}"
@@ -0,0 +1,196 @@
+"""
+Keyset (cursor) pagination for large list endpoints
+"""
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+from functools import reduce
+import operator
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the view's ordering plus the primary key
+
+    Each page is fetched with a WHERE clause on the last row of the previous
+    page instead of an OFFSET, and no COUNT(*) is run unless asked for with
+    ``?count=exact`` or ``?count=estimate`` (a cached count, refreshed at most
+    every ESTIMATE_TTL seconds).
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ESTIMATE_TTL = 300
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.annotations = set(queryset.query.annotations)
+        self.total = self.get_total(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor['r'] if cursor else False
+
+        order_by = [self._invert(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*order_by)
+        if cursor:
+            queryset = queryset.filter(self._after(order_by, self._to_python(queryset.model, cursor['v'])))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Moving backwards, "more" lies before this page; the page we came
+        # from always lies after it (and vice versa when moving forwards).
+        self.has_next = has_more if not reverse else True
+        self.has_previous = (cursor is not None) if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.total is not None:
+            response['count'] = self.total
+            response['count_is_estimate'] = self.request.query_params.get(self.count_query_param) == 'estimate'
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        """The view's effective ordering with the primary key appended as tiebreaker"""
+        ordering = None
+        # An ordering on an annotation, such as search relevance, comes from the filters
+        leading = queryset.query.order_by[0] if queryset.query.order_by else None
+        if isinstance(leading, str) and leading.lstrip('-') in queryset.query.annotations:
+            ordering = list(queryset.query.order_by)
+        else:
+            for backend in getattr(view, 'filter_backends', None) or []:
+                if issubclass(backend, OrderingFilter):
+                    ordering = backend().get_ordering(request, queryset, view)
+                    break
+        if not ordering:
+            ordering = getattr(view, 'ordering', None) or queryset.model._meta.ordering or []
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        ordering = [field for field in ordering if field.lstrip('-') not in ('id', 'pk')]
+        descending = ordering[0].startswith('-') if ordering else False
+        return tuple(ordering) + ('-id' if descending else 'id',)
+
+    def get_total(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode != 'estimate':
+            return None
+
+        query = queryset.order_by().query
+        if not query.where and connections[queryset.db].vendor == 'sqlite':
+            # Unfiltered table: the largest rowid is an O(log n) upper bound
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(f'SELECT MAX(rowid) FROM "{queryset.model._meta.db_table}"')
+                return cursor.fetchone()[0] or 0
+
+        sql, params = query.sql_with_params()
+        # hash() is salted per process; the key must match across workers
+        digest = hashlib.sha1(json.dumps([sql, [str(param) for param in params]]).encode('utf-8')).hexdigest()
+        key = f'keyset-count:{digest}'
+        return cache.get_or_set(key, queryset.count, self.ESTIMATE_TTL)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if len(cursor['v']) != len(self.ordering):
+                raise ValueError('cursor does not match ordering')
+            cursor['r'] = bool(cursor.get('r'))
+            return cursor
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            # Lean list views paginate values() dicts
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value if isinstance(value, (int, float)) or value is None else str(value))
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[0], True))
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def _to_python(self, model, values):
+        try:
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                if value is not None and field.lstrip('-') not in self.annotations else value
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _after(order_by, values):
+        """Lexicographic "comes after" condition for a row tuple"""
+        clauses = []
+        for index, field in enumerate(order_by):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {f.lstrip('-'): v for f, v in zip(order_by[:index], values[:index])}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': values[index]}))
+        return reduce(operator.or_, clauses)
@@ -0,0 +1,147 @@
+"""
+In-process push of disaster and alert changes to dashboards (server-sent events)
+
+Each worker process runs one Broker. Model signals publish a small change
+notification after the transaction commits; the broker hands it to every
+subscribed stream whose role and disaster-type filter accept it. An idle
+stream just waits on its queue, sending a keepalive comment every
+HEARTBEAT_SECONDS, so its cost does not grow between changes.
+
+Streams are async and need the ASGI server (``disaster_dashboard.asgi``):
+under WSGI, Django buffers a streaming async body to the end before sending
+it, so an endless stream would hold a sync worker forever. The stream view
+refuses WSGI requests, and pages served through WSGI do not refresh on
+their own unless they pass a poll interval.
+Workers do not share brokers: a change made through one worker reaches the
+streams of that worker only, and scheduled jobs or other workers should be
+followed by the REST endpoints or the change feeds.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+
+from .permissions import PUBLIC
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 20
+QUEUE_SIZE = 100
+
+# Alert severities pushed to the public role; other roles get every alert
+PUBLIC_ALERT_SEVERITIES = {'high', 'critical'}
+
+
+class Subscription:
+    """One stream's queue and filter; created and read on the stream's event loop"""
+
+    def __init__(self, role: str, types: Optional[Set[str]] = None):
+        self.role = role
+        self.types = types or None
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def accepts(self, message: Dict[str, Any]) -> bool:
+        if self.types is not None and message.get('disaster_type') not in self.types:
+            return False
+        if self.role == PUBLIC and message['kind'] == 'alert':
+            return message.get('severity') in PUBLIC_ALERT_SEVERITIES
+        return True
+
+    def offer(self, message: Dict[str, Any]) -> None:
+        if self.queue.full():
+            # A stream that stopped reading: keep one resync marker instead of a backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = {'kind': 'resync'}
+        self.queue.put_nowait(message)
+
+
+class Broker:
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, role: str, types: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(role, set(types) if types else None)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Deliver ``message`` to matching subscriptions; safe to call from any thread"""
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.accepts(message)]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The stream's loop has closed; its finally block will unsubscribe
+                pass
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+broker = Broker()
+
+
+def streams_available(request) -> bool:
+    """Whether ``request`` came through the ASGI handler, which can serve streams"""
+    return isinstance(request, ASGIRequest)
+
+
+def publish_on_commit(message: Dict[str, Any]) -> None:
+    transaction.on_commit(lambda: broker.publish(message))
+
+
+def disaster_message(event, action: str) -> Dict[str, Any]:
+    return {
+        'kind': 'disaster',
+        'action': action,
+        'id': str(event.pk),
+        'disaster_type': event.disaster_type,
+        'status': event.status,
+        'risk_score': event.risk_score,
+    }
+
+
+def alert_message(alert, action: str, disaster_type: Optional[str]) -> Dict[str, Any]:
+    return {
+        'kind': 'alert',
+        'action': action,
+        'id': str(alert.pk),
+        'disaster_event': str(alert.disaster_event_id),
+        'disaster_type': disaster_type,
+        'severity': alert.severity,
+        'status': alert.status,
+    }
+
+
+def format_event(message: Dict[str, Any]) -> str:
+    return f"event: {message['kind']}\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+
+async def stream(role: str, types: Optional[Iterable[str]] = None):
+    """SSE body for one client; subscribed while it is being read"""
+    subscription = broker.subscribe(role, types)
+    logger.debug(f"Push stream opened for {role} ({len(broker)} open)")
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(message)
+    finally:
+        broker.unsubscribe(subscription)
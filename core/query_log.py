@@ -0,0 +1,131 @@
+"""
+Opt-in slow-query capture
+
+Statements slower than SLOW_QUERY_LOG['THRESHOLD_MS'] are appended to a JSON
+lines file with the view (or job label) that ran them, their SQL with the
+values left as placeholders, the shape of their parameters and the
+database's query plan. ``manage.py advise_indexes`` reads the file.
+
+Enable with SLOW_QUERY_LOG=True for requests (SlowQueryMiddleware), or wrap
+any block in ``capture_slow_queries('label')``. Capture costs one timer per
+statement; the plan is only fetched for statements over the threshold.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+_state = threading.local()
+
+# IN lists of any length share one entry
+IN_LIST = re.compile(r'\(%s(?:, %s)+\)')
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def normalize_sql(sql: str) -> str:
+    return IN_LIST.sub('(%s, ...)', ' '.join(sql.split()))
+
+
+def params_shape(params, many: bool) -> Any:
+    """Parameter types (and batch size for executemany) without the values"""
+    if params is None:
+        return None
+    if many:
+        params = list(params)
+        return {'rows': len(params), 'row': params_shape(params[0], False) if params else []}
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def explain(alias: str, sql: str, params) -> Optional[List[str]]:
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    connection = connections[alias]
+    _state.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as exc:
+        logger.warning(f"Could not explain slow query: {exc}")
+        return None
+    finally:
+        _state.explaining = False
+
+
+def write_record(record: Dict[str, Any]) -> None:
+    path = settings.SLOW_QUERY_LOG['FILE']
+    line = json.dumps(record, default=str) + '\n'
+    with _write_lock:
+        with open(path, 'a', encoding='utf-8') as handle:
+            handle.write(line)
+
+
+class SlowQueryRecorder:
+    """Database execute wrapper that records statements over the threshold"""
+
+    def __init__(self, alias: str, label: Union[str, Callable[[], str]], threshold_ms: Optional[float] = None):
+        self.alias = alias
+        # A callable label is resolved when a query is recorded (the view is
+        # not known until URL resolution)
+        self.label = label
+        self.threshold_ms = settings.SLOW_QUERY_LOG['THRESHOLD_MS'] if threshold_ms is None else threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, 'explaining', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self.record(sql, params, many, elapsed_ms)
+
+    def record(self, sql, params, many, elapsed_ms):
+        label = self.label() if callable(self.label) else self.label
+        write_record({
+            'time': timezone.now().isoformat(),
+            'view': label,
+            'ms': round(elapsed_ms, 3),
+            'sql': normalize_sql(sql),
+            'params': params_shape(params, many),
+            'plan': None if many else explain(self.alias, sql, params),
+        })
+
+
+@contextmanager
+def capture_slow_queries(label: Union[str, Callable[[], str]], alias: str = 'default', threshold_ms: Optional[float] = None):
+    """Record slow statements run inside the block under ``label``"""
+    with connections[alias].execute_wrapper(SlowQueryRecorder(alias, label, threshold_ms)):
+        yield
+
+
+class SlowQueryMiddleware:
+    """Record slow statements per request; removed at startup unless SLOW_QUERY_LOG is enabled"""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def label():
+            match = getattr(request, 'resolver_match', None)
+            view = (match.view_name or match._func_path) if match else request.path
+            return f'{request.method} {view}'
+
+        with capture_slow_queries(label):
+            return self.get_response(request)
@@ -0,0 +1,59 @@
+"""
+Versioned response caching
+
+Cached entries are keyed under a namespace version. Bumping the version
+(from model signals) makes every entry of the namespace unreachable at once,
+without tracking or deleting individual keys; the stale entries age out.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+def _version_key(namespace: str) -> str:
+    return f'cache-version:{namespace}'
+
+
+def get_version(namespace: str) -> int:
+    # Seeded from the clock so a version evicted from the cache never comes
+    # back as a value that older entries were stored under
+    return cache.get_or_set(_version_key(namespace), time.time_ns(), None)
+
+
+def bump_version(*namespaces: str) -> None:
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            # Never read, so nothing is cached under it yet
+            pass
+
+
+def cached_response(request, namespace: str, build, timeout=None) -> Response:
+    """
+    Serve ``build()``'s Response data from the cache
+
+    The key covers the namespace version, the user's role and the full path
+    with query string, so different pages, filters and roles never share an
+    entry.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'DASHBOARD_CACHE_TTL', 15)
+    role = getattr(request.user, 'role', None) or 'anonymous'
+    digest = hashlib.sha1(request.get_full_path().encode('utf-8')).hexdigest()
+    key = f'response:{namespace}:v{get_version(namespace)}:{role}:{digest}'
+
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+    response = build()
+    if response.status_code == 200:
+        # Rendered and parsed back so the entry holds plain JSON types only
+        data = json.loads(JSONRenderer().render(response.data))
+        cache.set(key, data, timeout)
+    return response
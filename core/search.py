@@ -0,0 +1,153 @@
+"""
+SQLite FTS5 full-text search for API ``?search=``
+
+Each indexed model gets an external-content FTS5 table over its text
+columns, kept in sync by INSERT/UPDATE/DELETE triggers on the model table
+(so bulk_create and queryset.update() are covered too). FullTextSearchFilter
+turns ``?search=`` into a prefix MATCH on the model table's rowid, annotates
+each row with its bm25 rank and, unless the client picked an ordering,
+orders by it; KeysetPagination then pages by rank as well.
+
+The index is keyed on the model table's implicit rowid, which Django's
+table rebuilds (some schema changes) and VACUUM both renumber. The tables
+and triggers are (re)created after every migrate, and each index is checked
+against its table (FTS5 'integrity-check'): a missing trigger or a failed
+check triggers a full reindex. VACUUM runs outside migrate, so follow it
+with ``manage.py rebuild_search_index --check``.
+On other databases, or for models without an index, the filter falls back
+to DRF's LIKE-based SearchFilter.
+"""
+import logging
+import re
+from typing import Dict, List, Tuple
+
+from django.apps import apps
+from django.db import DatabaseError, connections, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+logger = logging.getLogger(__name__)
+
+# Model label -> indexed text columns
+FTS_INDEXES: Dict[str, Tuple[str, ...]] = {
+    'disasters.disasterevent': ('location_name',),
+    'alerts.alert': ('title', 'message'),
+    'core.auditlog': ('description', 'resource_id'),
+}
+
+MAX_TERMS = 16
+# Annotation holding a row's bm25 rank; lower is more relevant
+RANK = 'search_rank'
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_table(model) -> str:
+    return f'{model._meta.db_table}_fts'
+
+
+def _index_sql(model, columns) -> Tuple[str, List[Tuple[str, str]]]:
+    """CREATE VIRTUAL TABLE statement and (name, CREATE TRIGGER statement) pairs"""
+    table, fts = model._meta.db_table, fts_table(model)
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    create = (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content="{table}", '
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old});"
+    insert_new = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new});'
+    triggers = [
+        (f'{fts}_ai', f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{table}" BEGIN {insert_new} END'),
+        (f'{fts}_ad', f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{table}" BEGIN {delete_old} END'),
+        (f'{fts}_au', f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON "{table}" '
+                      f'BEGIN {delete_old} {insert_new} END'),
+    ]
+    return create, triggers
+
+
+def ensure_search_indexes(using: str = 'default', rebuild: bool = False) -> List[str]:
+    """
+    Create missing FTS tables and triggers; returns the tables reindexed
+
+    A table is reindexed when it or any of its triggers was missing, when
+    its rows no longer match the model table's rowids, or when ``rebuild``
+    is set.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return []
+    rebuilt = []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for label, columns in FTS_INDEXES.items():
+            model = apps.get_model(label)
+            if model._meta.db_table not in existing:
+                continue
+            create, triggers = _index_sql(model, columns)
+            fts = fts_table(model)
+            missing = fts not in existing or any(name not in existing for name, _ in triggers)
+            cursor.execute(create)
+            for _, statement in triggers:
+                cursor.execute(statement)
+            if missing or rebuild or not _in_sync(connection, fts):
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                rebuilt.append(fts)
+    for fts in rebuilt:
+        logger.info(f"Rebuilt full-text index {fts}")
+    return rebuilt
+
+
+def _in_sync(connection, fts: str) -> bool:
+    """Whether the index matches its content table row for row (reads all of both)"""
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('integrity-check', 1)")
+    except DatabaseError:
+        logger.warning(f"Full-text index {fts} is out of sync with its table")
+        return False
+    return True
+
+
+def install_search_indexes(sender, using='default', **kwargs):
+    """post_migrate handler"""
+    ensure_search_indexes(using)
+
+
+def match_expression(query: str) -> str:
+    """FTS5 query matching rows that contain every term, each as a prefix"""
+    terms = TOKEN.findall(query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``?search=`` through the model's FTS5 index
+
+    Results are ordered by relevance unless ``?ordering=`` was given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        columns = FTS_INDEXES.get(queryset.model._meta.label_lower)
+        if columns is None or connections[queryset.db].vendor != 'sqlite':
+            return super().filter_queryset(request, queryset, view)
+
+        expression = match_expression(request.query_params.get(self.search_param, ''))
+        if not expression:
+            return queryset
+        table, fts = queryset.model._meta.db_table, fts_table(queryset.model)
+        # bm25 only reads index-wide statistics, so ranking one row at a time
+        # gives the same scores as ranking the whole match
+        queryset = queryset.filter(RawSQL(
+            f'"{table}".rowid IN (SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s)',
+            [expression], output_field=BooleanField(),
+        )).annotate(**{RANK: RawSQL(
+            f'SELECT rank FROM "{fts}" WHERE "{fts}" MATCH %s AND rowid = "{table}".rowid',
+            [expression], output_field=FloatField(),
+        )})
+
+        if 'ordering' not in request.query_params:
+            queryset = queryset.order_by(RANK)
+        return queryset
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CustomUser, AuditLog, Geofence, DataSource
+from .models import CustomUser, AuditLog, Geofence, DataSource, QuarantinedRecord
 
 class CustomUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
@@ -87,3 +87,12 @@ class DataSourceSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Endpoint/URL is required for this source type")
         
         return data
+
+
+class QuarantinedRecordSerializer(serializers.ModelSerializer):
+    data_source_name = serializers.CharField(source='data_source.name', read_only=True)
+    
+    class Meta:
+        model = QuarantinedRecord
+        fields = ['id', 'data_source', 'data_source_name', 'row_number', 'raw_record', 'error_class', 'error_message', 'status', 'attempts', 'created_at', 'reprocessed_at']
+        read_only_fields = fields
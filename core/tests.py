@@ -1,6 +1,23 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
-from .models import AuditLog, Geofence, DataSource
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from alerts.models import Alert
+from alerts.serializers import AlertSerializer
+from disasters.models import DisasterEvent, DisasterData
+from disasters.serializers import DisasterEventSerializer, DisasterDataSerializer
+from .data_sync import DataSyncManager
+from .file_reader import CSVReader
+from . import push
+from .lean import get_lean_serializer
+from .serializers import AuditLogSerializer
+from .models import AuditLog, Geofence, DataSource, QuarantinedRecord
 
 User = get_user_model()
 
@@ -38,3 +55,567 @@ class AuditLogTestCase(TestCase):
         )
         self.assertEqual(log.action, 'create')
         self.assertEqual(log.resource_type, 'TestResource')
+
+
+class QuarantineTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='testpass123', role='admin')
+        self.data_source = DataSource.objects.create(name='Gauges', source_type='csv', file_path='gauges.csv')
+        self.records = [
+            {'type': 'flood', 'location': 'Riverside', 'risk': '70'},
+            {'hazard': 'wildfire', 'location': 'Ridge', 'risk': '80'},
+        ]
+
+    def test_rejected_rows_are_quarantined_and_reprocessed(self):
+        processed, errors = DataSyncManager._process_disaster_records(self.records, self.data_source)
+        self.assertEqual((processed, len(errors)), (1, 1))
+
+        # Syncing the same file again does not duplicate quarantine entries
+        DataSyncManager._process_disaster_records(self.records, self.data_source)
+        quarantined = QuarantinedRecord.objects.get(data_source=self.data_source)
+        self.assertEqual((quarantined.row_number, quarantined.error_class), (1, 'missing_fields'))
+
+        mappings = dict(DataSyncManager.FIELD_MAPPINGS, disaster_type=['disaster_type', 'type', 'hazard'])
+        with mock.patch.object(DataSyncManager, 'FIELD_MAPPINGS', mappings):
+            results = DataSyncManager.reprocess_quarantined(QuarantinedRecord.objects.all(), self.user)
+
+        self.assertEqual(results, {'reprocessed': 1, 'failed': 0})
+        quarantined.refresh_from_db()
+        self.assertEqual(quarantined.status, 'reprocessed')
+        self.assertTrue(DisasterEvent.objects.filter(location_name='Ridge', disaster_type='wildfire').exists())
+
+    def test_identical_rows_are_quarantined_separately(self):
+        DataSyncManager._process_disaster_records([self.records[1]] * 2, self.data_source)
+        self.assertEqual(list(QuarantinedRecord.objects.values_list('row_number', flat=True)), [0, 1])
+
+    def test_reprocess_action_validates_ids(self):
+        DataSyncManager._process_disaster_records(self.records, self.data_source)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        post = lambda ids: client.post('/api/quarantined-records/reprocess/', {'ids': ids}, format='json')
+        self.assertEqual(post(['not-a-uuid']).status_code, 400)
+        self.assertEqual(post('abc').status_code, 400)
+        response = post([str(QuarantinedRecord.objects.get().id)])
+        self.assertEqual(response.json()['failed'], 1)
+
+    def test_bad_reading_does_not_drop_the_batch(self):
+        points = [{'data_type': 'rain', 'value': v, 'timestamp': f'2024-01-0{i + 1}'} for i, v in enumerate(['5', 'nan', '7'])]
+        record = {'type': 'flood', 'location': 'Riverside', 'risk': '70', 'data_points': points}
+        processed, errors = DataSyncManager._process_disaster_records([record], self.data_source)
+        self.assertEqual((processed, errors), (1, []))
+        # NaN is stored as NULL, which the value column rejects
+        self.assertEqual(sorted(DisasterData.objects.values_list('value', flat=True)), [5.0, 7.0])
+
+
+class CSVReaderTestCase(TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', newline='') as f:
+            f.write('type,location,notes\r\nflood,"Delta, South","two\r\nlines"\r\n\r\nwildfire,Ridge\r\n')
+        self.addCleanup(os.remove, self.path)
+
+    def test_mmap_mode_matches_dict_reader(self):
+        self.assertEqual(
+            CSVReader(self.path, use_mmap=True).read(),
+            CSVReader(self.path, use_mmap=False).read(),
+        )
+
+    def test_offsets_and_ranges(self):
+        reader = CSVReader(self.path)
+        offsets = [offset for offset, _ in reader.iter_records()]
+        self.assertEqual(offsets, [21, 58])
+
+        resumed = list(reader.iter_records(start=58))
+        self.assertEqual(resumed, [(58, {'type': 'wildfire', 'location': 'Ridge', 'notes': None})])
+        self.assertEqual(reader.split_ranges(2), [(21, 56), (56, 74)])
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', password='testpass123', role='analyst')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        # Pairs of events share a predicted_time so the id tiebreaker matters
+        for i in range(7):
+            DisasterEvent.objects.create(
+                disaster_type='flood',
+                location_name=f'Site {i}',
+                risk_score=50,
+                confidence_level=50,
+                predicted_time=now - timedelta(hours=i // 2),
+            )
+
+    def _walk(self, url):
+        seen, pages = [], []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        return seen, pages
+
+    def test_pages_cover_every_row_once(self):
+        expected = [str(pk) for pk in DisasterEvent.objects.order_by('-predicted_time', '-id').values_list('id', flat=True)]
+        seen, pages = self._walk('/api/disasters/?page_size=3')
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[2]['previous']).json()
+        self.assertEqual([item['id'] for item in previous['results']], expected[3:6])
+
+    def test_counts_are_opt_in(self):
+        self.assertEqual(self.client.get('/api/disasters/?count=exact').json()['count'], 7)
+        data = self.client.get('/api/disasters/?count=estimate').json()
+        self.assertGreaterEqual(data['count'], 7)
+        self.assertTrue(data['count_is_estimate'])
+
+    def test_filtered_estimate_key_is_stable_across_processes(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        with mock.patch.object(cache, 'get_or_set', wraps=cache.get_or_set) as get_or_set:
+            self.assertEqual(self.client.get('/api/disasters/?count=estimate&disaster_type=flood').json()['count'], 7)
+        # A content digest, not hash(), which is salted per process
+        self.assertRegex(get_or_set.call_args[0][0], r'^keyset-count:[0-9a-f]{40}$')
+        DisasterEvent.objects.filter(location_name='Site 0').delete()
+        self.assertEqual(self.client.get('/api/disasters/?count=estimate&disaster_type=flood').json()['count'], 7)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/disasters/?cursor=bogus').status_code, 404)
+
+
+class LeanSerializerTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123', role='analyst')
+        self.event = DisasterEvent.objects.create(
+            disaster_type='cyclone',
+            location_name='Test Bay',
+            latitude=12.5,
+            risk_score=81,
+            confidence_level=64.25,
+            predicted_time=timezone.now(),
+            estimated_damage_usd=10 ** 12,
+        )
+        DisasterData.objects.create(event=self.event, data_type='wind', value=140, unit='kmh',
+                                    source='radar', timestamp=timezone.now(), metadata={'station': [1, 2]})
+        Alert.objects.create(disaster_event=self.event, severity='high', title='Cyclone', message='Evacuate',
+                             acknowledged_by=self.user)
+        Alert.objects.create(disaster_event=self.event, severity='low', title='Rain', message='Watch')
+
+    def assertSameJSON(self, serializer_class, queryset):
+        lean = get_lean_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        self.assertEqual(JSONRenderer().render(lean.encode(lean.rows(queryset))), expected)
+
+    def test_output_matches_drf(self):
+        self.assertSameJSON(DisasterEventSerializer, DisasterEvent.objects.all())
+        self.assertSameJSON(DisasterDataSerializer, DisasterData.objects.all())
+        self.assertSameJSON(AlertSerializer, Alert.objects.all())
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameJSON(DisasterEventSerializer, DisasterEvent.objects.all())
+
+    def test_unsupported_serializer_falls_back(self):
+        self.assertIsNone(get_lean_serializer(AuditLogSerializer))
+
+
+class SparseFieldsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mapper', password='testpass123', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.event = DisasterEvent.objects.create(
+            disaster_type='wildfire',
+            location_name='Test Ridge',
+            latitude=34.1,
+            longitude=-118.2,
+            risk_score=72,
+            confidence_level=55,
+            predicted_time=timezone.now(),
+        )
+        DisasterData.objects.create(event=self.event, data_type='smoke', value=3, unit='aqi',
+                                    source='sensor', timestamp=timezone.now(), metadata={'raw': 'x' * 100})
+
+    def test_fields_limit_payload_and_columns(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/disasters/?fields=id,latitude,risk_score').json()
+        self.assertEqual(list(data['results'][0]), ['id', 'latitude', 'risk_score'])
+        select = next(q['sql'] for q in queries.captured_queries if 'FROM "disasters_disasterevent"' in q['sql'])
+        self.assertNotIn('location_name', select)
+
+        detail = self.client.get(f'/api/disasters/{self.event.id}/?exclude=created_at,updated_at').json()
+        self.assertNotIn('created_at', detail)
+        self.assertEqual(detail['location_name'], 'Test Ridge')
+
+    def test_exclude_defers_json_column(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/disaster-data/?exclude=metadata').json()
+        self.assertNotIn('metadata', data['results'][0])
+        self.assertFalse(any('"metadata"' in q['sql'] for q in queries.captured_queries))
+
+    def test_unknown_field_and_non_model_fields(self):
+        self.assertEqual(self.client.get('/api/disasters/?fields=id,nope').status_code, 400)
+        AuditLog.objects.create(user=self.user, action='view', resource_type='Test', resource_id='1', description='x')
+        data = self.client.get('/api/audit-logs/?fields=user_name,action').json()
+        self.assertEqual(data['results'][0], {'user_name': self.user.get_full_name(), 'action': 'view'})
+
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='poller', password='testpass123', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.event = DisasterEvent.objects.create(
+            disaster_type='flood', location_name='Delta', latitude=22.0, longitude=90.0,
+            risk_score=65, confidence_level=70, predicted_time=timezone.now(),
+        )
+
+    def test_list_etag(self):
+        response = self.client.get('/api/disasters/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/disasters/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Other filters get their own tag
+        self.assertEqual(self.client.get('/api/disasters/?status=active', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.event.risk_score = 80
+        self.event.save()
+        self.assertEqual(self.client.get('/api/disasters/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_skips_count(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/disasters/', HTTP_IF_NONE_MATCH='W/"stale"')
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+
+    def test_event_analytics_etag(self):
+        url = f'/api/disasters/{self.event.id}/analytics/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        DisasterData.objects.create(event=self.event, data_type='water_level', value=3.2, unit='m',
+                                    source='gauge', timestamp=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_last_modified_and_change_counter(self):
+        url = f'/api/disasters/{self.event.id}/'
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+        # Alerts have no updated_at: a status change is caught by the counter
+        alert = Alert.objects.create(disaster_event=self.event, severity='high', title='Rising', message='Watch')
+        etag = self.client.get('/api/alerts/')['ETag']
+        self.assertEqual(self.client.get('/api/alerts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        alert.status = 'resolved'
+        alert.save()
+        self.assertEqual(self.client.get('/api/alerts/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ChangeCounterTestCase(TransactionTestCase):
+    """Commits for real, so the counters' on_commit bumps run as in production"""
+
+    def test_shared_and_bumped_once_per_transaction(self):
+        from django.core.cache import cache
+        from django.db import transaction
+        from .conditional import bump_changes, changes
+
+        user = User.objects.create_user(username='poller', password='testpass123', role='admin')
+        client = APIClient()
+        client.force_authenticate(user)
+        etag = client.get('/api/disasters/')['ETag']
+        before = changes(DisasterEvent)
+        # What another worker's per-process cache would still hold
+        other_worker = cache._cache.copy(), cache._expire_info.copy()
+        with transaction.atomic():
+            for name in ['Upstream', 'Downstream']:
+                DisasterEvent.objects.create(
+                    disaster_type='flood', location_name=name, latitude=22.5, longitude=90.2,
+                    risk_score=40, confidence_level=70, predicted_time=timezone.now(),
+                )
+            DisasterEvent.objects.filter(location_name='Upstream').delete()
+        self.assertEqual(changes(DisasterEvent), before + 1)
+        cache.clear()
+        cache._cache.update(other_worker[0])
+        cache._expire_info.update(other_worker[1])
+        self.assertEqual(client.get('/api/disasters/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # A rolled-back bump does not hold back the next one
+        before = changes(Alert)
+        with transaction.atomic():
+            with transaction.atomic():
+                bump_changes(Alert)
+                transaction.set_rollback(True)
+            bump_changes(Alert)
+        self.assertEqual(changes(Alert), before + 1)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='syncer', password='testpass123', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.events = [
+            DisasterEvent.objects.create(
+                disaster_type='earthquake', location_name=f'Fault {i}', latitude=35.0, longitude=139.0,
+                risk_score=40 + i, confidence_level=60, predicted_time=timezone.now(),
+            ) for i in range(3)
+        ]
+
+    def _feed(self, cursor, **params):
+        response = self.client.get('/api/disasters/', {'updated_since': cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_incremental_sync_with_tombstones(self):
+        first = self._feed('0', page_size=2)
+        self.assertEqual(len(first['results']), 2)
+        self.assertTrue(first['has_more'])
+        second = self._feed(first['cursor'], page_size=2)
+        self.assertEqual([e['location_name'] for e in second['results']], ['Fault 2'])
+        self.assertFalse(second['has_more'])
+
+        self.events[0].risk_score = 99
+        self.events[0].save()
+        deleted_id = str(self.events[1].id)
+        self.events[1].delete()
+
+        delta = self._feed(second['cursor'])
+        self.assertEqual([e['risk_score'] for e in delta['results']], [99])
+        self.assertEqual(delta['deleted'], [deleted_id])
+        self.assertEqual(self._feed(delta['cursor'])['results'], [])
+
+    def test_cascaded_deletes_and_bad_cursors(self):
+        Alert.objects.create(disaster_event=self.events[0], severity='low', title='Tremor', message='Minor')
+        cursor = self._feed('0', page_size=1)['cursor']
+        alert_feed = self.client.get('/api/alerts/', {'updated_since': '0'}).json()
+        self.events[0].delete()
+        self.assertEqual(len(self.client.get('/api/alerts/', {'updated_since': alert_feed['cursor']}).json()['deleted']), 1)
+
+        self.assertEqual(self.client.get('/api/disasters/', {'updated_since': 'garbage'}).status_code, 400)
+        with override_settings(CHANGE_FEED_TOMBSTONE_RETENTION_DAYS=0):
+            self.assertEqual(self.client.get('/api/disasters/', {'updated_since': cursor}).status_code, 410)
+
+    def test_deletions_are_scoped_like_rows(self):
+        from alerts.models import AlertDispatch
+
+        alert = Alert.objects.create(disaster_event=self.events[0], severity='low', title='Tremor', message='Minor')
+        users = [User.objects.create_user(username=f'user{i}', password='testpass123', role='public') for i in range(2)]
+        dispatches = [
+            AlertDispatch.objects.create(alert=alert, recipient=user, channel='email', recipient_address=f'{user}@x.org')
+            for user in users
+        ]
+        client = APIClient()
+        client.force_authenticate(users[0])
+        cursor = client.get('/api/alert-dispatches/', {'updated_since': '0'}).json()['cursor']
+        ids = [str(dispatch.id) for dispatch in dispatches]
+        AlertDispatch.objects.all().delete()
+
+        deleted = client.get('/api/alert-dispatches/', {'updated_since': cursor}).json()['deleted']
+        self.assertEqual(deleted, ids[:1])
+        # Admins see every deletion
+        deleted = self.client.get('/api/alert-dispatches/', {'updated_since': cursor}).json()['deleted']
+        self.assertEqual(sorted(deleted), sorted(ids))
+
+
+class PushTestCase(TestCase):
+    def test_broker_filters_by_role_and_type(self):
+        import asyncio
+        import threading
+
+        messages = [
+            {'kind': 'disaster', 'disaster_type': 'flood'},
+            {'kind': 'disaster', 'disaster_type': 'earthquake'},
+            {'kind': 'alert', 'disaster_type': 'flood', 'severity': 'medium'},
+            {'kind': 'alert', 'disaster_type': 'flood', 'severity': 'critical'},
+        ]
+
+        async def scenario():
+            public = push.broker.subscribe('public', ['flood'])
+            responder = push.broker.subscribe('responder')
+            # Published from another thread, as sync views and signals do
+            thread = threading.Thread(target=lambda: [push.broker.publish(m) for m in messages])
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+            received = public.queue.qsize(), responder.queue.qsize()
+            push.broker.unsubscribe(public)
+            push.broker.unsubscribe(responder)
+            return received
+
+        self.assertEqual(asyncio.run(scenario()), (2, 4))
+
+    def test_changes_published_after_commit(self):
+        with mock.patch.object(push.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                event = DisasterEvent.objects.create(
+                    disaster_type='cyclone', location_name='Bay', latitude=15.0, longitude=88.0,
+                    risk_score=75, confidence_level=60, predicted_time=timezone.now(),
+                )
+                Alert.objects.create(disaster_event=event, severity='high', title='Cyclone', message='Landfall')
+        kinds = [(call.args[0]['kind'], call.args[0]['action'], call.args[0]['disaster_type'])
+                 for call in publish.call_args_list]
+        self.assertEqual(kinds, [('disaster', 'created', 'cyclone'), ('alert', 'created', 'cyclone')])
+
+    async def test_event_stream(self):
+        import asyncio
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory, RequestFactory
+        from .views import event_stream_view
+
+        def request_as(user):
+            request = AsyncRequestFactory().get('/api/stream/?types=flood')
+
+            async def auser():
+                return user
+            request.auser = auser
+            return request
+
+        self.assertEqual((await event_stream_view(request_as(AnonymousUser()))).status_code, 401)
+        # Under WSGI the endless body would be buffered, holding the worker
+        wsgi_request = RequestFactory().get('/api/stream/')
+        self.assertEqual((await event_stream_view(wsgi_request)).status_code, 503)
+
+        response = await event_stream_view(request_as(User(username='viewer', role='public')))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.streaming_content
+        self.assertTrue((await anext(body)).startswith(b'retry:'))
+        push.broker.publish({'kind': 'disaster', 'action': 'updated', 'disaster_type': 'flood'})
+        self.assertTrue((await anext(body)).startswith(b'event: disaster\n'))
+
+        # A client disconnect cancels the pending read, which unsubscribes
+        open_streams = len(push.broker)
+        pending = asyncio.ensure_future(anext(body))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(len(push.broker), open_streams - 1)
+
+
+class FullTextSearchTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='searcher', password='testpass123', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.event = DisasterEvent.objects.create(
+            disaster_type='flood', location_name='São Paulo Riverside', latitude=-23.5, longitude=-46.6,
+            risk_score=70, confidence_level=60, predicted_time=timezone.now(),
+        )
+        Alert.objects.create(disaster_event=self.event, severity='high', title='Evacuation notice',
+                             message='Move to higher ground before the flooding peaks')
+        Alert.objects.create(disaster_event=self.event, severity='high', title='Flood flood warning',
+                             message='Flooding expected')
+        Alert.objects.create(disaster_event=self.event, severity='low', title='Heat advisory', message='Stay cool')
+
+    def _titles(self, query):
+        return [alert['title'] for alert in self.client.get('/api/alerts/', {'search': query}).json()['results']]
+
+    def test_prefix_search_ranked(self):
+        self.assertEqual(self._titles('flood'), ['Flood flood warning', 'Evacuation notice'])
+        self.assertEqual(self._titles('evac ground'), ['Evacuation notice'])
+        self.assertEqual(self._titles('"); DROP'), [])
+
+        # Diacritics are folded and the lean list path keeps working
+        events = self.client.get('/api/disasters/', {'search': 'sao river'}).json()['results']
+        self.assertEqual([event['location_name'] for event in events], ['São Paulo Riverside'])
+
+    def test_keyset_lists_page_by_rank(self):
+        for name in ['River River Bend', 'Riverside Camp', 'Lake Shore']:
+            DisasterEvent.objects.create(
+                disaster_type='flood', location_name=name, latitude=0, longitude=0,
+                risk_score=50, confidence_level=60, predicted_time=timezone.now(),
+            )
+        names, url = [], '/api/disasters/?search=river&page_size=1'
+        while url:
+            page = self.client.get(url).json()
+            names.extend(event['location_name'] for event in page['results'])
+            url = page['next']
+        self.assertEqual(names[0], 'River River Bend')
+        self.assertEqual(sorted(names), ['River River Bend', 'Riverside Camp', 'São Paulo Riverside'])
+
+        # An explicit ordering still wins over relevance
+        AuditLog.objects.all().delete()
+        for description in ['River river crossing closed', 'River report']:
+            AuditLog.objects.create(action='update', resource_type='DisasterEvent', resource_id='1',
+                                    description=description)
+
+        def descriptions(**params):
+            logs = self.client.get('/api/audit-logs/', {'search': 'river', **params}).json()['results']
+            return [log['description'] for log in logs]
+        self.assertEqual(descriptions(), ['River river crossing closed', 'River report'])
+        self.assertEqual(descriptions(ordering='-timestamp'), ['River report', 'River river crossing closed'])
+
+    def test_index_follows_queryset_writes(self):
+        Alert.objects.filter(title='Heat advisory').update(title='Wildfire smoke advisory')
+        self.assertEqual(self._titles('wildfire'), ['Wildfire smoke advisory'])
+        self.assertEqual(self._titles('heat'), [])
+        Alert.objects.filter(title__startswith='Wildfire').delete()
+        self.assertEqual(self._titles('smoke'), [])
+
+    def test_dropped_triggers_are_rebuilt(self):
+        from django.db import connection
+        from .search import ensure_search_indexes
+
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER alerts_alert_fts_ai')
+        self.assertEqual(ensure_search_indexes(), ['alerts_alert_fts'])
+        Alert.objects.create(disaster_event=self.event, severity='low', title='Tsunami drill', message='Test')
+        self.assertEqual(self._titles('tsunami'), ['Tsunami drill'])
+
+    def test_renumbered_rowids_are_reindexed(self):
+        from django.db import connection
+        from .search import ensure_search_indexes
+
+        self.assertEqual(ensure_search_indexes(), [])
+        # What VACUUM may do to a table without an INTEGER PRIMARY KEY
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE alerts_alert SET rowid = rowid + 1000')
+        self.assertEqual(self._titles('heat'), [])
+        self.assertEqual(ensure_search_indexes(), ['alerts_alert_fts'])
+        self.assertEqual(self._titles('heat'), ['Heat advisory'])
+
+
+class IndexAdvisorTestCase(TestCase):
+    def setUp(self):
+        self.event = DisasterEvent.objects.create(
+            disaster_type='flood', location_name='Test Location', latitude=0, longitude=0,
+            risk_score=70, confidence_level=60, predicted_time=timezone.now(),
+        )
+        handle, self.log = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, self.log)
+
+    def test_full_scans_on_hot_filters_are_flagged(self):
+        from .index_advisor import analyze, read_log
+        from .query_log import capture_slow_queries
+
+        with override_settings(SLOW_QUERY_LOG={'ENABLED': False, 'THRESHOLD_MS': 0, 'FILE': self.log}):
+            with capture_slow_queries('GET alerts-list'):
+                for _ in range(3):
+                    list(Alert.objects.filter(disaster_event=self.event, status='active'))
+                list(DataSource.objects.filter(is_active=True).order_by('last_sync'))
+                # Served by the (updated_at, id) index: nothing to propose
+                list(Alert.objects.filter(updated_at__gt=timezone.now()).order_by('updated_at', 'id'))
+
+        records = read_log(self.log)
+        self.assertTrue(all(record['plan'] for record in records))
+        self.assertNotIn(str(self.event.pk), open(self.log).read())
+
+        # Alert's default ordering (-created_at) completes its index
+        proposals = {(c.model_label, c.fields): c.calls for c in analyze(records)}
+        self.assertEqual(proposals, {
+            ('alerts.Alert', ('disaster_event', 'status', 'created_at')): 3,
+            ('core.DataSource', ('is_active', 'last_sync')): 1,
+        })
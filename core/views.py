@@ -2,16 +2,21 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db.models import Q
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import CustomUser, AuditLog, SystemConfiguration, Geofence, DataSource
-from .serializers import CustomUserSerializer, AuditLogSerializer, GeofenceSerializer, DataSourceSerializer
-from .permissions import require_role, require_permission, IsAdmin, ADMIN, ANALYST, RESPONDER, PUBLIC
+from .models import CustomUser, AuditLog, SystemConfiguration, Geofence, DataSource, QuarantinedRecord
+from .serializers import CustomUserSerializer, AuditLogSerializer, GeofenceSerializer, DataSourceSerializer, QuarantinedRecordSerializer
+from .pagination import KeysetPagination
+from .fieldsets import SparseFieldsMixin
+from .conditional import ConditionalGetMixin
+from . import push
+from .permissions import require_role, require_permission, IsAdmin, IsAdminOrAnalyst, ADMIN, ANALYST, RESPONDER, PUBLIC
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -99,8 +104,25 @@ def governance_view(request):
     return render(request, 'governance/admin_governance.html', context)
 
 
+async def event_stream_view(request):
+    """Server-sent events of disaster and alert changes, optionally ?types=flood,cyclone"""
+    if not push.streams_available(request):
+        return JsonResponse(
+            {'error': 'Live updates need the ASGI server; poll the REST endpoints instead'}, status=503
+        )
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    types = [name.strip() for name in request.GET.get('types', '').split(',') if name.strip()]
+    response = StreamingHttpResponse(push.stream(user.role, types), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # REST API ViewSets
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [IsAuthenticated]
@@ -180,11 +202,12 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         return ip
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
     filterset_fields = ['action', 'resource_type', 'user']
+    pagination_class = KeysetPagination
     search_fields = ['description', 'resource_id']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
@@ -195,7 +218,7 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         return AuditLog.objects.filter(user=self.request.user)
 
 
-class GeofenceViewSet(viewsets.ModelViewSet):
+class GeofenceViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Geofence.objects.all()
     serializer_class = GeofenceSerializer
     permission_classes = [IsAuthenticated]
@@ -219,7 +242,7 @@ class GeofenceViewSet(viewsets.ModelViewSet):
         )
 
 
-class DataSourceViewSet(viewsets.ModelViewSet):
+class DataSourceViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = DataSource.objects.all()
     serializer_class = DataSourceSerializer
     permission_classes = [IsAuthenticated]
@@ -383,3 +406,31 @@ class DataSourceViewSet(viewsets.ModelViewSet):
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
+
+
+class QuarantinedRecordViewSet(SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = QuarantinedRecord.objects.select_related('data_source')
+    serializer_class = QuarantinedRecordSerializer
+    permission_classes = [IsAdminOrAnalyst]
+    filterset_fields = ['data_source', 'error_class', 'status']
+    search_fields = ['error_message']
+    ordering_fields = ['created_at', 'row_number']
+    
+    @action(detail=False, methods=['post'])
+    def reprocess(self, request):
+        """Reprocess the filtered set of quarantined rows (optionally narrowed by ids)"""
+        from core.data_sync import DataSyncManager
+        
+        records = self.filter_queryset(self.get_queryset())
+        ids = request.data.get('ids')
+        if ids:
+            if not isinstance(ids, list):
+                return Response({'error': 'ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [uuid.UUID(str(record_id)) for record_id in ids]
+            except ValueError:
+                return Response({'error': 'ids must be UUIDs'}, status=status.HTTP_400_BAD_REQUEST)
+            records = records.filter(id__in=ids)
+        
+        results = DataSyncManager.reprocess_quarantined(records, request.user)
+        return Response({'status': 'completed', **results}, status=status.HTTP_200_OK)
@@ -61,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.query_log.SlowQueryMiddleware',
 ]
 
 ROOT_URLCONF = 'disaster_dashboard.urls'
@@ -75,6 +76,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.live_updates',
             ],
         },
     },
@@ -151,14 +153,62 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
+        # After OrderingFilter so relevance ordering can apply
+        'core.search.FullTextSearchFilter',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler',
 }
 
+# DisasterData write-behind spool
+DISASTER_DATA_SPOOL = {
+    'DIR': config('DISASTER_DATA_SPOOL_DIR', default=str(BASE_DIR / 'spool' / 'disaster_data')),
+    'SEGMENT_MAX_BYTES': 16 * 1024 * 1024,
+    'SEGMENT_MAX_AGE_SECONDS': 10,
+    'GROUP_COMMIT_MS': 5,
+    'FLUSH_BATCH_SIZE': 5000,
+}
+
+# DisasterData storage layout: 'rows' (one row per reading) or 'packed' (binary chunks)
+DISASTER_DATA_STORAGE = config('DISASTER_DATA_STORAGE', default='rows')
+DISASTER_DATA_CHUNK_SIZE = 1024
+
+# DisasterData retention in days per tier (None keeps forever)
+DISASTER_DATA_RETENTION_DAYS = {
+    'raw': config('DISASTER_DATA_RAW_RETENTION_DAYS', default=30, cast=int),
+    '1m': 7,
+    '1h': 365,
+    '1d': None,
+}
+
+# Cache (per-process by default; point at a shared backend when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='disaster-dashboard'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Short-lived response cache for dashboard list actions, in seconds
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=15, cast=int)
+
+# Change feeds: tombstones of deleted rows are kept this long, older cursors must resync
+CHANGE_FEED_TOMBSTONE_RETENTION_DAYS = config('CHANGE_FEED_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+# Changes younger than this are held back so slower concurrent commits are not skipped
+CHANGE_FEED_SETTLE_SECONDS = config('CHANGE_FEED_SETTLE_SECONDS', default=2, cast=int)
+
+# Events re-scored per transaction after a risk model is activated
+RISK_RESCORE_CHUNK_SIZE = config('RISK_RESCORE_CHUNK_SIZE', default=500, cast=int)
+
+# Shadow scoring of candidate risk models; ids beyond QUEUE_SIZE are dropped, not waited on
+SHADOW_SCORING = {
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+}
+
 # CORS
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
@@ -219,3 +269,10 @@ LOGGING = {
         'level': 'INFO',
     },
 }
+
+# Slow-query capture for `manage.py advise_indexes` (opt-in)
+SLOW_QUERY_LOG = {
+    'ENABLED': config('SLOW_QUERY_LOG', default=False, cast=bool),
+    'THRESHOLD_MS': config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float),
+    'FILE': LOGS_DIR / 'slow_queries.jsonl',
+}
@@ -3,7 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
-from core.views import CustomUserViewSet, AuditLogViewSet, GeofenceViewSet, DataSourceViewSet, login_view, register_view, logout_view, dashboard_view, governance_view
+from core.views import CustomUserViewSet, AuditLogViewSet, GeofenceViewSet, DataSourceViewSet, QuarantinedRecordViewSet, login_view, register_view, logout_view, dashboard_view, governance_view, event_stream_view
 from disasters.views import DisasterEventViewSet, DisasterDataViewSet, RiskModelViewSet, HistoricalDisasterViewSet, disasters_map_view, disaster_details_view
 from alerts.views import AlertViewSet, AlertDispatchViewSet, AlertThresholdViewSet, NotificationPreferenceViewSet, alerts_view, alert_details_view
 from analytics.views import DisasterAnalyticsViewSet, AlertAnalyticsViewSet, UserActivityLogViewSet, SystemMetricsViewSet, analytics_dashboard_view
@@ -16,6 +16,7 @@ router.register(r'users', CustomUserViewSet, basename='user')
 router.register(r'audit-logs', AuditLogViewSet, basename='audit-log')
 router.register(r'geofences', GeofenceViewSet, basename='geofence')
 router.register(r'data-sources', DataSourceViewSet, basename='data-source')
+router.register(r'quarantined-records', QuarantinedRecordViewSet, basename='quarantined-record')
 router.register(r'disasters', DisasterEventViewSet, basename='disaster')
 router.register(r'disaster-data', DisasterDataViewSet, basename='disaster-data')
 router.register(r'risk-models', RiskModelViewSet, basename='risk-model')
@@ -35,6 +36,7 @@ router.register(r'retention-policies', DataRetentionPolicyViewSet, basename='ret
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/stream/', event_stream_view, name='event_stream'),
     path('api/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls')),
     
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DisasterEvent, DisasterData, RiskModel, HistoricalDisaster
+from .models import DisasterEvent, DisasterData, DisasterDataRollup, DisasterDataChunk, RiskModel, RescoreJob, HistoricalDisaster
 
 @admin.register(DisasterEvent)
 class DisasterEventAdmin(admin.ModelAdmin):
@@ -47,10 +47,26 @@ class DisasterDataAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(DisasterDataRollup)
+class DisasterDataRollupAdmin(admin.ModelAdmin):
+    list_display = ['event', 'data_type', 'resolution', 'bucket_start', 'count', 'min_value', 'max_value', 'last_value']
+    list_filter = ['resolution', 'data_type']
+    search_fields = ['event__location_name', 'data_type']
+    readonly_fields = ['id']
+    date_hierarchy = 'bucket_start'
+
+@admin.register(DisasterDataChunk)
+class DisasterDataChunkAdmin(admin.ModelAdmin):
+    list_display = ['event', 'data_type', 'count', 'start_time', 'end_time']
+    list_filter = ['data_type', 'source']
+    search_fields = ['event__location_name', 'data_type']
+    exclude = ['timestamps', 'values']
+    readonly_fields = ['id', 'event', 'data_type', 'unit', 'source', 'start_time', 'end_time', 'count']
+
 @admin.register(RiskModel)
 class RiskModelAdmin(admin.ModelAdmin):
-    list_display = ['name', 'disaster_type', 'version', 'is_active', 'accuracy_score']
-    list_filter = ['disaster_type', 'is_active', 'created_at']
+    list_display = ['name', 'disaster_type', 'version', 'is_active', 'is_shadow', 'accuracy_score']
+    list_filter = ['disaster_type', 'is_active', 'is_shadow', 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['id', 'created_at', 'updated_at']
     fieldsets = (
@@ -61,7 +77,7 @@ class RiskModelAdmin(admin.ModelAdmin):
             'fields': ('parameters', 'weights', 'thresholds')
         }),
         ('Performance', {
-            'fields': ('accuracy_score', 'is_active')
+            'fields': ('accuracy_score', 'is_active', 'is_shadow')
         }),
         ('Metadata', {
             'fields': ('id', 'created_at', 'updated_at'),
@@ -69,6 +85,13 @@ class RiskModelAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(RescoreJob)
+class RescoreJobAdmin(admin.ModelAdmin):
+    list_display = ['disaster_type', 'risk_model', 'status', 'processed', 'total', 'created_at', 'finished_at']
+    list_filter = ['status', 'disaster_type']
+    readonly_fields = ['id', 'risk_model', 'disaster_type', 'status', 'total', 'processed', 'last_id', 'error',
+                       'created_at', 'updated_at', 'finished_at']
+
 @admin.register(HistoricalDisaster)
 class HistoricalDisasterAdmin(admin.ModelAdmin):
     list_display = ['location_name', 'disaster_type', 'occurrence_date', 'casualties', 'damage_usd']
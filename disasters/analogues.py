@@ -0,0 +1,152 @@
+"""
+Historical analogues of an event: the most similar HistoricalDisasters
+
+Similarity combines magnitude, season and location. Each disaster type
+keeps one matrix of normalized features per process:
+
+    magnitude  z-score within the type (unknown magnitudes count as average)
+    season     day of year as a point on the unit circle, so December and
+               January are neighbours
+    location   point on the unit sphere (see disasters.history_index)
+
+The weighted squared distance to every record is one matrix-vector product
+over that matrix, which keeps a search over a million records within a few
+tens of milliseconds. Weights are per query, so no tree is precomputed: a
+KD-tree would fix the metric at build time. Like the location index, the
+matrices are rebuilt in the background once history_stamp() moves, which
+every worker re-reads from the database at most every STAMP_TTL seconds.
+"""
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from django.db import connection
+
+from .history_index import VersionedIndexes, history_stamp, unit_vectors
+from .models import HistoricalDisaster
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {'magnitude': 1.0, 'season': 0.5, 'location': 1.0}
+
+DAYS_PER_YEAR = 365.25
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """'magnitude:2,location:0.5' over DEFAULT_WEIGHTS; ValueError when malformed"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in filter(None, value.split(',')):
+        name, _, weight = part.partition(':')
+        if name.strip() not in DEFAULT_WEIGHTS:
+            raise ValueError(f'Unknown weight {name.strip()!r}')
+        weights[name.strip()] = float(weight)
+        if not weights[name.strip()] >= 0:
+            raise ValueError('Weights must be non-negative')
+    return weights
+
+
+def season_vectors(day_of_year: np.ndarray) -> np.ndarray:
+    angle = 2 * np.pi * day_of_year / DAYS_PER_YEAR
+    return np.column_stack((np.cos(angle), np.sin(angle)))
+
+
+class AnalogueIndex:
+    """Normalized feature matrix of one disaster type's history"""
+
+    def __init__(self, disaster_type: str):
+        meta = HistoricalDisaster._meta
+        quote = connection.ops.quote_name
+        names = ['id', 'magnitude', 'occurrence_date', 'latitude', 'longitude', 'casualties', 'damage_usd']
+        # Straight from the cursor, as in disasters.backtest; ids stay raw until returned
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(quote(meta.get_field(n).column) for n in names)} FROM {quote(meta.db_table)} "
+                f"WHERE {quote(meta.get_field('disaster_type').column)} = %s",
+                [disaster_type],
+            )
+            rows = cursor.fetchall()
+        ids, magnitude, occurred, lat, lon, casualties, damage = (list(c) for c in zip(*rows)) if rows else [[]] * 7
+
+        self.ids = ids
+        self.casualties = np.array(casualties, dtype=float)
+        self.damage_usd = np.array(damage, dtype=float)
+
+        magnitude = np.array(magnitude, dtype=float)
+        known = ~np.isnan(magnitude)
+        self.magnitude_mean = float(magnitude[known].mean()) if known.any() else 0.0
+        self.magnitude_std = float(magnitude[known].std()) if known.any() else 0.0
+        self.magnitude_std = self.magnitude_std or 1.0
+        z = np.where(known, (magnitude - self.magnitude_mean) / self.magnitude_std, 0.0)
+
+        days = np.array(occurred, dtype='datetime64[D]')
+        day_of_year = (days - days.astype('datetime64[Y]')).astype(float)
+        self.matrix = np.column_stack((
+            z,
+            season_vectors(day_of_year),
+            unit_vectors(np.array(lat, dtype=float), np.array(lon, dtype=float)),
+        )).reshape(-1, 6)
+        self.z_squared = z * z
+        logger.info(f"Built analogue index for {disaster_type}: {len(ids)} records")
+
+    def search(self, magnitude: Optional[float], day_of_year: Optional[float], latitude: Optional[float],
+               longitude: Optional[float], k: int, weights: Dict[str, float]) -> List[Dict[str, Any]]:
+        """The ``k`` nearest records, closest first; unknown query features are left out"""
+        if not self.ids or k <= 0:
+            return []
+        w_magnitude = weights['magnitude'] if magnitude is not None else 0.0
+        w_season = weights['season'] if day_of_year is not None else 0.0
+        w_location = weights['location'] if latitude is not None and longitude is not None else 0.0
+
+        zq = (magnitude - self.magnitude_mean) / self.magnitude_std if w_magnitude else 0.0
+        sq = season_vectors(np.array([day_of_year]))[0] if w_season else np.zeros(2)
+        uq = unit_vectors(np.array([latitude]), np.array([longitude]))[0] if w_location else np.zeros(3)
+
+        # sum_g w_g |x_g - q_g|^2, expanded; season and location vectors have unit norm
+        q = np.concatenate(([w_magnitude * zq], w_season * sq, w_location * uq))
+        squared = self.matrix @ q
+        squared *= -2
+        if w_magnitude:
+            squared += w_magnitude * self.z_squared
+        squared += w_magnitude * zq * zq + 2 * w_season + 2 * w_location
+
+        k = min(k, len(self.ids))
+        top = np.argpartition(squared, k - 1)[:k]
+        top = top[np.argsort(squared[top], kind='stable')]
+        distances = np.sqrt(np.clip(squared[top], 0.0, None))
+        to_python = HistoricalDisaster._meta.pk.to_python
+        return [
+            {'id': to_python(self.ids[i]), 'distance': d,
+             'casualties': int(self.casualties[i]), 'damage_usd': int(self.damage_usd[i])}
+            for i, d in zip(top.tolist(), distances.tolist())
+        ]
+
+
+analogue_indexes: VersionedIndexes[AnalogueIndex] = VersionedIndexes('analogues', AnalogueIndex, history_stamp)
+
+
+def find_analogues(disaster_type: str, magnitude: Optional[float] = None,
+                   when: Optional[Union[date, datetime]] = None, latitude: Optional[float] = None,
+                   longitude: Optional[float] = None, k: int = 10,
+                   weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Top-``k`` historical analogues of the given features within ``disaster_type``"""
+    day_of_year = when.timetuple().tm_yday - 1 if when is not None else None
+    return analogue_indexes.get(disaster_type).search(
+        magnitude, day_of_year, latitude, longitude, k, {**DEFAULT_WEIGHTS, **(weights or {})}
+    )
+
+
+def impact_estimate(analogues: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median and inverse-distance weighted mean of the analogues' casualties and damage"""
+    if not analogues:
+        return {}
+    distances = np.array([a['distance'] for a in analogues])
+    weights = 1 / (distances + 1e-3)
+    estimate = {}
+    for name in ('casualties', 'damage_usd'):
+        values = np.array([a[name] for a in analogues], dtype=float)
+        estimate[name] = {
+            'median': float(np.median(values)),
+            'weighted_mean': round(float(values @ weights / weights.sum()), 2),
+        }
+    return estimate
@@ -4,3 +4,6 @@ class DisastersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'disasters'
     verbose_name = 'Disasters'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
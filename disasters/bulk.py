@@ -0,0 +1,67 @@
+"""
+Bulk status transitions for disaster events
+
+The selected events are changed with one UPDATE and audited with one
+bulk_create. UPDATE skips the model signals, so the caches, change counters
+and push notifications they maintain are refreshed here instead.
+"""
+from typing import Dict, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from core import push
+from core.conditional import bump_changes
+from core.models import AuditLog
+from core.response_cache import bump_version
+
+from . import tiles
+from .models import DisasterEvent
+from .signals import EVENTS_CACHE
+
+MAX_EVENTS = 5000
+
+
+def apply_status(queryset, new_status: str, user) -> Dict[str, str]:
+    """
+    Move every event in ``queryset`` to ``new_status``
+
+    Returns {event id: 'updated' | 'unchanged'} for the selected events.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(queryset.order_by().values_list(
+            'id', 'status', 'disaster_type', 'risk_score', 'latitude', 'longitude'
+        ))
+        changed = [row for row in rows if row[1] != new_status]
+        if changed:
+            DisasterEvent.objects.filter(id__in=[row[0] for row in changed]).update(
+                status=new_status, updated_at=now
+            )
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    user=user,
+                    action='update',
+                    resource_type='DisasterEvent',
+                    resource_id=str(event_id),
+                    description=f"Updated status from {old_status} to {new_status}",
+                    old_values={'status': old_status},
+                    new_values={'status': new_status},
+                ) for event_id, old_status, *_ in changed
+            ])
+            transaction.on_commit(lambda: _after_update(changed, new_status))
+
+    outcomes = {str(row[0]): 'unchanged' for row in rows}
+    outcomes.update((str(row[0]), 'updated') for row in changed)
+    return outcomes
+
+
+def _after_update(changed: List[tuple], new_status: str) -> None:
+    bump_version(EVENTS_CACHE)
+    bump_changes(DisasterEvent)
+    tiles.invalidate_points({(lat, lon) for *_, lat, lon in changed})
+    for event_id, _, disaster_type, risk_score, _, _ in changed:
+        push.broker.publish(push.disaster_message(
+            DisasterEvent(id=event_id, disaster_type=disaster_type, status=new_status, risk_score=risk_score),
+            'updated',
+        ))
@@ -0,0 +1,180 @@
+"""
+Geohash helpers for spatial filtering without a spatial database extension
+
+Events carry a geohash of their coordinates in an indexed column. A bounding
+box is covered by a handful of geohash cells, each cell becomes an index
+range scan on that column (``prefix <= geohash < prefix + '{'``), and the
+candidates are then refined with an exact coordinate or haversine check.
+"""
+import math
+from functools import reduce
+import operator
+from typing import List, Optional, Tuple
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE = {char: index for index, char in enumerate(BASE32)}
+PRECISION = 9  # ~5 m cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Sorts after every base32 character, closing a prefix range
+PREFIX_END = '{'
+
+
+def encode(lat: float, lon: float, precision: int = PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (lon, lon_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def decode_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = DECODE[char]
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if bits >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of cells at ``precision``"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def cover(south: float, west: float, north: float, east: float, max_cells: int = 32) -> List[str]:
+    """
+    Geohash cells covering a box, at the finest precision using at most
+    ``max_cells`` cells. ``west > east`` means the box crosses the antimeridian.
+    """
+    if west > east:
+        return cover(south, west, north, 180.0, max_cells // 2) + cover(south, -180.0, north, east, max_cells // 2)
+
+    precision = 1
+    for candidate in range(PRECISION, 0, -1):
+        height, width = cell_size(candidate)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * columns <= max_cells:
+            precision = candidate
+            break
+    if precision == 1 and (north - south >= 90 or east - west >= 180):
+        # Whole-world boxes: a prefix scan would only add work
+        return []
+
+    height, width = cell_size(precision)
+    cells = []
+    lat = south
+    while True:
+        lon = west
+        while True:
+            cell = encode(min(lat, 90.0 - 1e-9), min(lon, 180.0 - 1e-9), precision)
+            if cell not in cells:
+                cells.append(cell)
+            if lon >= east:
+                break
+            lon = min(lon + width, east)
+        if lat >= north:
+            break
+        lat = min(lat + height, north)
+    return cells
+
+
+def prefix_q(cells: List[str], field: str = 'geohash') -> Optional[Q]:
+    """OR of index range scans for the given cell prefixes"""
+    if not cells:
+        return None
+    return reduce(operator.or_, (
+        Q(**{f'{field}__gte': cell, f'{field}__lt': cell + PREFIX_END}) for cell in cells
+    ))
+
+
+def bbox_q(south: float, west: float, north: float, east: float) -> Q:
+    """Exact coordinate check for a box, including antimeridian-crossing boxes"""
+    q = Q(latitude__gte=south, latitude__lte=north)
+    if west > east:
+        return q & (Q(longitude__gte=west) | Q(longitude__lte=east))
+    return q & Q(longitude__gte=west, longitude__lte=east)
+
+
+def radius_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Smallest (south, west, north, east) box containing a circle"""
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    south, north = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+    if south <= -90.0 or north >= 90.0:
+        return south, -180.0, north, 180.0
+    lon_delta = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(max(abs(south), abs(north)))))
+    if lon_delta >= 180.0:
+        return south, -180.0, north, 180.0
+    west = lon - lon_delta
+    east = lon + lon_delta
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def haversine_expression(lat: float, lon: float):
+    """
+    Database expression for the great-circle distance (km) from a point
+
+    Built from Django's math functions, which Django also provides on SQLite.
+    """
+    phi = math.radians(lat)
+    a = (Power(Sin((Radians(F('latitude')) - Value(phi)) / 2), 2)
+         + Value(math.cos(phi)) * Cos(Radians(F('latitude')))
+         * Power(Sin((Radians(F('longitude')) - Value(math.radians(lon))) / 2), 2))
+    # Least() guards asin against rounding just above 1 for antipodal points
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def within_bbox(queryset, south: float, west: float, north: float, east: float):
+    prune = prefix_q(cover(south, west, north, east))
+    if prune is not None:
+        queryset = queryset.filter(prune)
+    return queryset.filter(bbox_q(south, west, north, east))
+
+
+def within_radius(queryset, lat: float, lon: float, radius_km: float):
+    queryset = within_bbox(queryset, *radius_box(lat, lon, radius_km))
+    return queryset.alias(distance_km=haversine_expression(lat, lon)).filter(distance_km__lte=radius_km)
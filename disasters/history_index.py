@@ -0,0 +1,248 @@
+"""
+In-memory nearest-neighbour index over HistoricalDisaster locations
+
+Coordinates are mapped to points on the unit sphere, where straight-line
+(chord) distance orders points exactly like great-circle distance, without
+special cases at the poles or the antimeridian. The points go into a static
+KD-tree built with NumPy; a k-nearest query visits a few leaves (tens of
+points each) instead of the whole table.
+
+Each process builds its index lazily on first use, one per disaster type
+asked for (None = all types). Changes are noticed through history_stamp(),
+the newest HistoricalDisaster.updated_at and the newest deletion Tombstone:
+a query re-reads it once STAMP_TTL seconds have passed, or right away after
+this process's own model signals (disasters.signals), so other workers'
+changes arrive within STAMP_TTL and most queries touch no database. The
+next query after a change keeps answering from the old index while one
+background thread rebuilds it. update() does not touch updated_at by
+itself; set it along with the fields it changes.
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+from django.db import connection
+from django.db.models import Max
+
+from core.models import Tombstone
+
+from .geo import EARTH_RADIUS_KM
+from .models import HistoricalDisaster
+
+logger = logging.getLogger(__name__)
+
+LEAF_SIZE = 32
+# Seconds a stamp read from the database is trusted for
+STAMP_TTL = 5
+
+T = TypeVar('T')
+
+
+def history_stamp() -> Tuple[object, object]:
+    """Changes whenever a HistoricalDisaster is saved or deleted (see disasters.signals)"""
+    changed = HistoricalDisaster.objects.order_by().aggregate(changed=Max('updated_at'))['changed']
+    deleted = Tombstone.objects.filter(
+        resource_type=HistoricalDisaster._meta.label_lower
+    ).order_by().aggregate(deleted=Max('deleted_at'))['deleted']
+    return changed, deleted
+
+
+def unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    phi, lam = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+
+
+def chord_for_km(km: float) -> float:
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def km_for_chord(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+class KDTree:
+    """Static KD-tree; leaves are contiguous runs of ``points`` after reordering"""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        order = np.arange(len(points))
+        start, end, left, right, low, high = [], [], [], [], [], []
+        stack = [(0, len(points), -1, 0)]
+        while stack:
+            s, e, parent, side = stack.pop()
+            node = len(start)
+            if parent >= 0:
+                (left if side == 0 else right)[parent] = node
+            box = points[order[s:e]]
+            start.append(s)
+            end.append(e)
+            left.append(-1)
+            right.append(-1)
+            low.append(box.min(axis=0) if e > s else np.zeros(points.shape[1]))
+            high.append(box.max(axis=0) if e > s else np.zeros(points.shape[1]))
+            if e - s <= leaf_size:
+                continue
+            axis = int(np.argmax(high[-1] - low[-1]))
+            middle = (s + e) // 2
+            segment = order[s:e]
+            order[s:e] = segment[np.argpartition(points[segment, axis], middle - s)]
+            stack.append((middle, e, node, 1))
+            stack.append((s, middle, node, 0))
+
+        self.order = order
+        self.points = points[order]
+        self.start, self.end = start, end
+        self.left, self.right = left, right
+        self.low, self.high = np.array(low), np.array(high)
+
+    def _box_distance(self, node: int, x: np.ndarray) -> float:
+        gap = np.maximum(np.maximum(self.low[node] - x, x - self.high[node]), 0.0)
+        return float(gap @ gap)
+
+    def query(self, x: np.ndarray, k: int, max_distance: float = math.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """(distances, original indices) of the ``k`` nearest points within ``max_distance``"""
+        bound = max_distance ** 2
+        best_d = np.empty(0)
+        best_i = np.empty(0, dtype=int)
+        heap = [(0.0, 0)]
+        while heap:
+            box_d, node = heapq.heappop(heap)
+            if box_d > bound:
+                break
+            if self.left[node] < 0:
+                s, e = self.start[node], self.end[node]
+                diff = self.points[s:e] - x
+                d = np.einsum('ij,ij->i', diff, diff)
+                keep = d <= bound
+                best_d = np.concatenate((best_d, d[keep]))
+                best_i = np.concatenate((best_i, np.arange(s, e)[keep]))
+                if len(best_d) > k:
+                    top = np.argpartition(best_d, k - 1)[:k]
+                    best_d, best_i = best_d[top], best_i[top]
+                if len(best_d) == k:
+                    bound = min(bound, float(best_d.max()))
+                continue
+            for child in (self.left[node], self.right[node]):
+                child_d = self._box_distance(child, x)
+                if child_d <= bound:
+                    heapq.heappush(heap, (child_d, child))
+        ranked = np.argsort(best_d, kind='stable')
+        return np.sqrt(best_d[ranked]), self.order[best_i[ranked]]
+
+
+class VersionedIndexes(Generic[T]):
+    """
+    Lazily built per-key indexes, rebuilt after the ``stamp()`` they were
+    built at changes
+
+    A key's first query builds its index inline. After the stamp moves,
+    queries keep getting the previous index while a single background thread
+    rebuilds every key built so far. The stamp is read at most once every
+    ``stamp_ttl`` seconds, or on the next query after invalidate().
+    """
+
+    def __init__(self, name: str, build: Callable[[Hashable], T], stamp: Callable[[], Hashable],
+                 stamp_ttl: float = STAMP_TTL):
+        self.name = name
+        self.build = build
+        self.stamp = stamp
+        self.stamp_ttl = stamp_ttl
+        self._indexes: Dict[Hashable, T] = {}
+        self._version: Optional[Hashable] = None
+        self._stamp: Optional[Hashable] = None
+        self._stamp_read: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _current_stamp(self) -> Hashable:
+        read, now = self._stamp_read, time.monotonic()
+        if read is None or now - read >= self.stamp_ttl:
+            stamp = self._stamp = self.stamp()
+            # An invalidate() during the read leaves the next query to read again
+            if self._stamp_read is read:
+                self._stamp_read = now
+            return stamp
+        return self._stamp
+
+    def invalidate(self) -> None:
+        """Re-read the stamp on the next query; for changes made by this process"""
+        self._stamp_read = None
+
+    def get(self, key: Hashable) -> T:
+        version = self._current_stamp()
+        index = self._indexes.get(key)
+        if index is not None and version != self._version:
+            self._refresh(version)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    if not self._indexes:
+                        self._version = version
+                    index = self._indexes[key] = self.build(key)
+        return index
+
+    def _refresh(self, version: Hashable) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._rebuild_in_thread, args=(version,), name=f'rebuild-{self.name}', daemon=True
+        ).start()
+
+    def _rebuild_in_thread(self, version: Hashable) -> None:
+        try:
+            self._rebuild(version)
+        finally:
+            connection.close()
+
+    def _rebuild(self, version: Hashable) -> None:
+        try:
+            rebuilt = {key: self.build(key) for key in list(self._indexes)}
+            with self._lock:
+                self._indexes.update(rebuilt)
+                self._version = version
+        except Exception as e:
+            logger.error(f"Rebuilding {self.name} indexes failed: {e}", exc_info=True)
+        finally:
+            self._refreshing = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._version = None
+            self._stamp_read = None
+
+
+class HistoryIndex:
+    """KD-tree over one disaster type's (or all) historical locations"""
+
+    def __init__(self, disaster_type: Optional[str] = None):
+        rows = HistoricalDisaster.objects.all()
+        if disaster_type:
+            rows = rows.filter(disaster_type=disaster_type)
+        rows = list(rows.values_list('id', 'latitude', 'longitude'))
+        self.ids = [row[0] for row in rows]
+        coordinates = np.array([row[1:] for row in rows], dtype=float).reshape(-1, 2)
+        self.tree = KDTree(unit_vectors(coordinates[:, 0], coordinates[:, 1]))
+        logger.info(f"Built history index for {disaster_type or 'all types'}: {len(self.ids)} locations")
+
+    def nearest(self, lat: float, lon: float, k: int, radius_km: Optional[float] = None) -> List[Tuple[object, float]]:
+        """[(HistoricalDisaster id, distance in km)] of the ``k`` nearest, closest first"""
+        if not self.ids or k <= 0:
+            return []
+        limit = chord_for_km(radius_km) if radius_km is not None else math.inf
+        chords, positions = self.tree.query(unit_vectors(np.array([lat]), np.array([lon]))[0], k, limit)
+        return [(self.ids[i], d) for i, d in zip(positions.tolist(), km_for_chord(chords).tolist())]
+
+
+history_indexes: VersionedIndexes[HistoryIndex] = VersionedIndexes('history', HistoryIndex, history_stamp)
+
+
+def nearest_history(lat: float, lon: float, k: int = 10, radius_km: Optional[float] = None,
+                    disaster_type: Optional[str] = None) -> List[Tuple[object, float]]:
+    return history_indexes.get(disaster_type or None).nearest(lat, lon, k, radius_km)
@@ -0,0 +1,13 @@
+"""
+Management command to build rollups for readings written without them
+"""
+from django.core.management.base import BaseCommand
+from disasters.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DisasterData rollups for days that do not count every stored reading'
+
+    def handle(self, *args, **options):
+        rebuilt = backfill_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {rebuilt} series-days"))
@@ -0,0 +1,74 @@
+"""
+Management command to backtest risk models against historical disasters
+"""
+from django.core.management.base import BaseCommand, CommandError
+from disasters.backtest import DEFAULT_CASUALTIES, DEFAULT_DAMAGE_USD, backtest
+from disasters.models import RiskModel
+
+
+class Command(BaseCommand):
+    help = 'Score HistoricalDisaster records with risk models and store each ROC AUC as accuracy_score'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            dest='disaster_type',
+            help='Only models of this disaster type'
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            help='Only this model id (repeatable)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Models backtested in parallel processes; worth it for large histories (default: 1)'
+        )
+        parser.add_argument(
+            '--casualties',
+            type=float,
+            default=DEFAULT_CASUALTIES,
+            help=f'Casualties from which a record is severe (default: {DEFAULT_CASUALTIES})'
+        )
+        parser.add_argument(
+            '--damage',
+            type=float,
+            default=DEFAULT_DAMAGE_USD,
+            help=f'Damage in USD from which a record is severe (default: {DEFAULT_DAMAGE_USD})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report metrics without updating accuracy_score'
+        )
+
+    def handle(self, *args, **options):
+        models = RiskModel.objects.all()
+        if options['disaster_type']:
+            models = models.filter(disaster_type=options['disaster_type'])
+        if options['models']:
+            models = models.filter(id__in=options['models'])
+        if not models.exists():
+            raise CommandError('No risk models match')
+
+        results = backtest(
+            models,
+            workers=options['workers'],
+            save=not options['dry_run'],
+            min_casualties=options['casualties'],
+            min_damage=options['damage'],
+        )
+        names = {str(model.pk): str(model) for model in models}
+        for metrics in results:
+            auc = 'n/a' if metrics['auc'] is None else f"{metrics['auc']:.4f}"
+            self.stdout.write(
+                f"{names[metrics['risk_model']]} ({metrics['disaster_type']}): AUC {auc}, "
+                f"{metrics['scored']}/{metrics['records']} records scored, {metrics['severe']} severe"
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: accuracy_score not updated'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Backtested {len(results)} models'))
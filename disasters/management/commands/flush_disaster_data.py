@@ -0,0 +1,45 @@
+"""
+Management command to drain the DisasterData write-behind spool
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from disasters.write_buffer import SpoolFlusher
+
+
+class Command(BaseCommand):
+    help = 'Flush spooled DisasterData readings into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between flushes in --loop mode (default: 2)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Readings per transaction (default: DISASTER_DATA_SPOOL["FLUSH_BATCH_SIZE"])'
+        )
+
+    def handle(self, *args, **options):
+        flusher = SpoolFlusher(batch_size=options['batch_size'])
+
+        while True:
+            segments, readings = flusher.flush()
+            if segments:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Flushed {readings} readings from {segments} segments")
+                )
+            if flusher.rejected:
+                self.stdout.write(self.style.WARNING(f"Rejected {flusher.rejected} readings (see the log)"))
+                flusher.rejected = 0
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+"""
+Management command to fold DisasterData rows into packed chunks
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from disasters.models import DisasterData
+from disasters.packed import compact_rows, storage_stats
+
+
+class Command(BaseCommand):
+    help = 'Pack DisasterData rows into binary chunks (see DISASTER_DATA_STORAGE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-minutes',
+            type=int,
+            default=60,
+            help='Only pack readings older than this (default: 60)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Rows packed per transaction (default: 50000)'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than_minutes'])
+        packed = compact_rows(
+            DisasterData.objects.filter(timestamp__lt=cutoff),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Packed {packed} readings"))
+
+        stats = storage_stats()
+        self.stdout.write(
+            f"  rows: {stats['rows']}  chunks: {stats['chunks']}  "
+            f"packed readings: {stats['packed_readings']} (~{stats['packed_bytes']} bytes)"
+        )
@@ -0,0 +1,23 @@
+"""
+Management command to apply the DisasterData retention policy
+"""
+from django.core.management.base import BaseCommand
+from disasters.rollups import prune_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete raw readings and rollups older than DISASTER_DATA_RETENTION_DAYS (backfilling rollups first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Rows deleted per transaction (default: 10000)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_expired(batch_size=options['batch_size'])
+        for tier, count in deleted.items():
+            self.stdout.write(f"  {tier:<4} {count} rows deleted")
+        self.stdout.write(self.style.SUCCESS('Retention policy applied'))
@@ -0,0 +1,41 @@
+"""
+Management command to run or resume risk re-score jobs
+"""
+from django.core.management.base import BaseCommand, CommandError
+from disasters.models import RiskModel
+from disasters.rescore import resumable_jobs, run_job, start_rescore
+
+
+class Command(BaseCommand):
+    help = 'Resume interrupted re-score jobs, or re-score a disaster type with its active risk model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            dest='disaster_type',
+            help='Queue and run a new job for this disaster type first'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Events per transaction (default: RISK_RESCORE_CHUNK_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        if options['disaster_type']:
+            model = RiskModel.objects.filter(disaster_type=options['disaster_type'], is_active=True).first()
+            if model is None:
+                raise CommandError(f"No active risk model for {options['disaster_type']}")
+            start_rescore(model, background=False)
+
+        jobs = list(resumable_jobs())
+        if not jobs:
+            self.stdout.write('No re-score jobs to run')
+        for job in jobs:
+            job = run_job(job.pk, chunk_size=options['chunk_size'])
+            if job is None:
+                continue
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.WARNING
+            self.stdout.write(style(
+                f"{job.disaster_type} with {job.risk_model}: {job.status}, {job.processed}/{job.total} events"
+            ))
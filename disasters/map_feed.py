@@ -0,0 +1,74 @@
+"""
+Columnar map feed for the disasters map
+
+All matching events are returned as parallel arrays instead of objects, with
+disaster type and status sent as small integer codes into lookup lists.
+Coordinates are rounded to 5 decimals (about 1 m) and risk to 1 decimal.
+The encoded body is gzip-compressed once and cached under its ETag.
+"""
+import gzip
+import hashlib
+import json
+from typing import Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import DisasterEvent
+
+TYPES = [code for code, _ in DisasterEvent.DISASTER_TYPES]
+STATUSES = [code for code, _ in DisasterEvent.STATUS_CHOICES]
+CACHE_TTL = 300
+
+
+def feed_etag(queryset, query_string: str) -> str:
+    """
+    Weak ETag from the filtered set's size and latest change
+
+    One aggregate query; any insert, update (via updated_at) or delete within
+    the filtered set changes it.
+    """
+    stats = queryset.order_by().aggregate(count=Count('id'), changed=Max('updated_at'))
+    changed = stats['changed'].isoformat() if stats['changed'] else ''
+    digest = hashlib.sha1(f"{query_string}|{stats['count']}|{changed}".encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def build_feed(queryset) -> dict:
+    type_codes = {code: index for index, code in enumerate(TYPES)}
+    status_codes = {code: index for index, code in enumerate(STATUSES)}
+    ids, lats, lons, risk, types, statuses = [], [], [], [], [], []
+
+    rows = queryset.order_by('-risk_score', 'id').values_list(
+        'id', 'latitude', 'longitude', 'risk_score', 'disaster_type', 'status'
+    )
+    for event_id, lat, lon, score, disaster_type, event_status in rows.iterator(chunk_size=10000):
+        ids.append(str(event_id))
+        lats.append(round(lat, 5) if lat is not None else None)
+        lons.append(round(lon, 5) if lon is not None else None)
+        risk.append(round(score, 1))
+        types.append(type_codes.get(disaster_type, -1))
+        statuses.append(status_codes.get(event_status, -1))
+
+    return {
+        'count': len(ids),
+        'types': TYPES,
+        'statuses': STATUSES,
+        'ids': ids,
+        'lats': lats,
+        'lons': lons,
+        'risk': risk,
+        'type': types,
+        'status': statuses,
+    }
+
+
+def get_feed(queryset, etag: str) -> Tuple[bytes, bytes]:
+    """(json, gzipped json) bodies for the feed identified by ``etag``"""
+    key = f'disasters:map-feed:{etag}'
+    bodies = cache.get(key)
+    if bodies is None:
+        raw = json.dumps(build_feed(queryset), separators=(',', ':')).encode('utf-8')
+        bodies = (raw, gzip.compress(raw, compresslevel=6))
+        cache.set(key, bodies, CACHE_TTL)
+    return bodies
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:54
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0002_alter_disasterevent_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisasterDataRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('data_type', models.CharField(max_length=100)),
+                ('resolution', models.CharField(choices=[('1m', '1 Minute'), ('1h', '1 Hour'), ('1d', '1 Day')], max_length=2)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('sum', models.FloatField(default=0)),
+                ('sum_sq', models.FloatField(default=0)),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('last_value', models.FloatField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='data_rollups', to='disasters.disasterevent')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'indexes': [models.Index(fields=['resolution', 'bucket_start'], name='disasters_d_resolut_c329f6_idx')],
+                'unique_together': {('event', 'data_type', 'resolution', 'bucket_start')},
+            },
+        ),
+    ]
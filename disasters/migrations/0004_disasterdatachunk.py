@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:56
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0003_disasterdatarollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisasterDataChunk',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('data_type', models.CharField(max_length=100)),
+                ('unit', models.CharField(max_length=50)),
+                ('source', models.CharField(max_length=255)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('timestamps', models.BinaryField()),
+                ('values', models.BinaryField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='data_chunks', to='disasters.disasterevent')),
+            ],
+            options={
+                'ordering': ['-end_time'],
+                'indexes': [models.Index(fields=['event', 'data_type', 'end_time'], name='disasters_d_event_i_cf2530_idx'), models.Index(fields=['end_time'], name='disasters_d_end_tim_92df98_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0004_disasterdatachunk'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='disasterevent',
+            name='disasters_d_predict_fb4fa1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='disasterdata',
+            index=models.Index(fields=['timestamp', 'id'], name='disasters_d_timesta_8598f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disasterevent',
+            index=models.Index(fields=['predicted_time', 'id'], name='disasters_d_predict_228bbe_idx'),
+        ),
+    ]
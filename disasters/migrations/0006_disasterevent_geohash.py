@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:13
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from disasters.geo import encode
+
+    DisasterEvent = apps.get_model('disasters', 'DisasterEvent')
+    events = DisasterEvent.objects.exclude(latitude=None).exclude(longitude=None).only('id', 'latitude', 'longitude')
+    batch = []
+    for event in events.iterator(chunk_size=2000):
+        event.geohash = encode(event.latitude, event.longitude)
+        batch.append(event)
+        if len(batch) >= 2000:
+            DisasterEvent.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    DisasterEvent.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disasterevent',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='disasterevent',
+            index=models.Index(fields=['geohash'], name='disasters_d_geohash_7ecdbb_idx'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
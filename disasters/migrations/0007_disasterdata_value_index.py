@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0006_disasterevent_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disasterdata',
+            index=models.Index(fields=['event', 'data_type', 'value'], name='disasters_d_event_i_a51c04_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0007_disasterdata_value_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disasterevent',
+            index=models.Index(fields=['updated_at', 'id'], name='disasters_d_updated_02d9eb_idx'),
+        ),
+    ]
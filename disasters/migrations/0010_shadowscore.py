@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0009_rescorejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskmodel',
+            name='is_shadow',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ShadowScore',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('live_score', models.FloatField()),
+                ('shadow_score', models.FloatField()),
+                ('scored_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='disasters.disasterevent')),
+                ('risk_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shadow_scores', to='disasters.riskmodel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['risk_model', 'scored_at'], name='disasters_s_risk_mo_98220c_idx')],
+                'unique_together': {('risk_model', 'event')},
+            },
+        ),
+    ]
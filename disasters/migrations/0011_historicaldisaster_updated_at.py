@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disasters', '0010_shadowscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaldisaster',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
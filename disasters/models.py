@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
+from .geo import encode as encode_geohash
 
 class DisasterEvent(models.Model):
     DISASTER_TYPES = (
@@ -23,6 +24,8 @@ class DisasterEvent(models.Model):
     latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
     longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
     location_name = models.CharField(max_length=255)
+    # Maintained from latitude/longitude on save; see disasters.geo
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     
     # Risk scoring
     risk_score = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(100)])
@@ -50,11 +53,23 @@ class DisasterEvent(models.Model):
         indexes = [
             models.Index(fields=['disaster_type', 'status']),
             models.Index(fields=['risk_score']),
-            models.Index(fields=['predicted_time']),
+            models.Index(fields=['predicted_time', 'id']),
+            models.Index(fields=['geohash']),
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
         return f"{self.get_disaster_type_display()} - {self.location_name}"
+    
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
 
 
 class DisasterData(models.Model):
@@ -71,6 +86,8 @@ class DisasterData(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['event', 'timestamp']),
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['event', 'data_type', 'value']),
         ]
     
     def __str__(self):
@@ -90,6 +107,8 @@ class RiskModel(models.Model):
     thresholds = models.JSONField()
     
     is_active = models.BooleanField(default=False)
+    # Candidate scored off the request path against the active model (see disasters.shadow)
+    is_shadow = models.BooleanField(default=False)
     accuracy_score = models.FloatField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -102,6 +121,60 @@ class RiskModel(models.Model):
         return f"{self.name} v{self.version}"
 
 
+class RescoreJob(models.Model):
+    """Re-score of a disaster type's open events after a RiskModel activation"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('superseded', 'Superseded'),
+        ('failed', 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    risk_model = models.ForeignKey(RiskModel, on_delete=models.CASCADE, related_name='rescore_jobs')
+    disaster_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Progress; events are walked in id order and last_id is the resume point
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    last_id = models.UUIDField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"Rescore {self.disaster_type} with {self.risk_model_id} ({self.status})"
+
+
+class ShadowScore(models.Model):
+    """A candidate model's score for one ingested event next to the live score"""
+    id = models.BigAutoField(primary_key=True)
+    risk_model = models.ForeignKey(RiskModel, on_delete=models.CASCADE, related_name='shadow_scores')
+    event = models.ForeignKey(DisasterEvent, on_delete=models.CASCADE, related_name='+')
+    live_score = models.FloatField()
+    shadow_score = models.FloatField()
+    scored_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('risk_model', 'event')
+        indexes = [
+            models.Index(fields=['risk_model', 'scored_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.risk_model_id} on {self.event_id}: {self.shadow_score} vs {self.live_score}"
+
+
 class HistoricalDisaster(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     disaster_type = models.CharField(max_length=50)
@@ -116,6 +189,7 @@ class HistoricalDisaster(models.Model):
     description = models.TextField(blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         ordering = ['-occurrence_date']
@@ -123,3 +197,64 @@ class HistoricalDisaster(models.Model):
     
     def __str__(self):
         return f"{self.disaster_type} - {self.location_name} ({self.occurrence_date})"
+
+
+class DisasterDataRollup(models.Model):
+    RESOLUTION_CHOICES = (
+        ('1m', '1 Minute'),
+        ('1h', '1 Hour'),
+        ('1d', '1 Day'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey(DisasterEvent, on_delete=models.CASCADE, related_name='data_rollups')
+    data_type = models.CharField(max_length=100)
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    
+    count = models.IntegerField(default=0)
+    sum = models.FloatField(default=0)
+    sum_sq = models.FloatField(default=0)  # For variance
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    last_value = models.FloatField()
+    last_timestamp = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['bucket_start']
+        unique_together = ('event', 'data_type', 'resolution', 'bucket_start')
+        indexes = [
+            models.Index(fields=['resolution', 'bucket_start']),
+        ]
+    
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+    
+    def __str__(self):
+        return f"{self.data_type} {self.resolution} @ {self.bucket_start}"
+
+
+class DisasterDataChunk(models.Model):
+    """Packed readings of one (event, data_type) series, see disasters.packed"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey(DisasterEvent, on_delete=models.CASCADE, related_name='data_chunks')
+    data_type = models.CharField(max_length=100)
+    unit = models.CharField(max_length=50)
+    source = models.CharField(max_length=255)
+    
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    timestamps = models.BinaryField()  # int64 epoch microseconds, little-endian
+    values = models.BinaryField()  # float64, little-endian
+    
+    class Meta:
+        ordering = ['-end_time']
+        indexes = [
+            models.Index(fields=['event', 'data_type', 'end_time']),
+            models.Index(fields=['end_time']),
+        ]
+    
+    def __str__(self):
+        return f"{self.data_type} x{self.count} ({self.start_time} - {self.end_time})"
@@ -0,0 +1,288 @@
+"""
+Packed array storage for high-frequency DisasterData series
+
+In packed mode (``DISASTER_DATA_STORAGE = 'packed'``) consecutive readings of
+one (event, data_type) are stored in DisasterDataChunk rows holding binary
+int64 timestamp and float64 value arrays, about 16 bytes per reading instead
+of a full DisasterData row. Per-reading ids and metadata are not kept.
+Readings written through the regular API still land as rows and are folded
+into chunks by the ``pack_disaster_data`` command.
+"""
+import logging
+import sys
+import uuid
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import DisasterData, DisasterDataChunk
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+PackedReading = namedtuple('PackedReading', ['event_id', 'data_type', 'value', 'timestamp'])
+
+
+def is_packed_mode() -> bool:
+    return getattr(settings, 'DISASTER_DATA_STORAGE', 'rows') == 'packed'
+
+
+def chunk_size() -> int:
+    return getattr(settings, 'DISASTER_DATA_CHUNK_SIZE', 1024)
+
+
+def to_micros(timestamp: datetime) -> int:
+    delta = timestamp - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_micros(micros: int) -> datetime:
+    return datetime.fromtimestamp(micros // 1000000, tz=dt_timezone.utc).replace(microsecond=micros % 1000000)
+
+
+def _encode(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _decode(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(bytes(data))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def decode_chunk(chunk: DisasterDataChunk) -> Tuple[array, array]:
+    """Return the (timestamps, values) arrays of a chunk, sorted by timestamp"""
+    return _decode('q', chunk.timestamps), _decode('d', chunk.values)
+
+
+def _store(chunk: DisasterDataChunk, points: List[Tuple[int, float]]) -> None:
+    points.sort()
+    chunk.timestamps = _encode(array('q', (ts for ts, _ in points)))
+    chunk.values = _encode(array('d', (value for _, value in points)))
+    chunk.count = len(points)
+    chunk.start_time = from_micros(points[0][0])
+    chunk.end_time = from_micros(points[-1][0])
+
+
+def pack_readings(readings: Iterable[Any]) -> List[PackedReading]:
+    """
+    Append readings to their series' chunks
+
+    Readings already present in the series (same timestamp and value) are
+    skipped, which makes replaying a spool segment safe.
+
+    Returns:
+        The readings that were newly stored, for rollup maintenance
+    """
+    series = {}
+    for reading in readings:
+        key = (reading.event_id, reading.data_type, reading.unit, reading.source)
+        series.setdefault(key, []).append((to_micros(reading.timestamp), float(reading.value)))
+
+    stored = []
+    limit = chunk_size()
+    with transaction.atomic():
+        for (event_id, data_type, unit, source), points in series.items():
+            points.sort()
+            chunks = DisasterDataChunk.objects.select_for_update().filter(
+                event_id=event_id, data_type=data_type, unit=unit, source=source,
+                end_time__gte=from_micros(points[0][0]), start_time__lte=from_micros(points[-1][0]),
+            )
+            seen = set()
+            for chunk in chunks:
+                timestamps, values = decode_chunk(chunk)
+                seen.update(zip(timestamps, values))
+            points = [point for point in dict.fromkeys(points) if point not in seen]
+            if not points:
+                continue
+
+            open_chunk = DisasterDataChunk.objects.select_for_update().filter(
+                event_id=event_id, data_type=data_type, unit=unit, source=source, count__lt=limit,
+            ).order_by('-end_time').first()
+
+            to_create = []
+            remaining = points
+            if open_chunk is not None:
+                timestamps, values = decode_chunk(open_chunk)
+                room = limit - open_chunk.count
+                _store(open_chunk, list(zip(timestamps, values)) + remaining[:room])
+                open_chunk.save(update_fields=['timestamps', 'values', 'count', 'start_time', 'end_time'])
+                remaining = remaining[room:]
+
+            for start in range(0, len(remaining), limit):
+                chunk = DisasterDataChunk(event_id=event_id, data_type=data_type, unit=unit, source=source)
+                _store(chunk, remaining[start:start + limit])
+                to_create.append(chunk)
+            DisasterDataChunk.objects.bulk_create(to_create)
+
+            stored.extend(
+                PackedReading(event_id, data_type, value, from_micros(ts)) for ts, value in points
+            )
+
+    return stored
+
+
+def compact_rows(queryset=None, batch_size: int = 50000) -> int:
+    """
+    Move DisasterData rows into chunks and delete the rows
+
+    Rollups already reflect these rows, so they are not touched.
+
+    Returns:
+        Number of rows packed
+    """
+    if queryset is None:
+        queryset = DisasterData.objects.all()
+    queryset = queryset.order_by('event_id', 'data_type', 'timestamp')
+
+    packed = 0
+    while True:
+        batch = list(queryset.only('id', 'event_id', 'data_type', 'unit', 'source', 'value', 'timestamp')[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            pack_readings(batch)
+            DisasterData.objects.filter(id__in=[reading.id for reading in batch]).delete()
+        packed += len(batch)
+        logger.info(f"Packed {packed} DisasterData rows into chunks")
+    return packed
+
+
+def iter_series(event_id, data_type: str, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> Iterable[PackedReading]:
+    """Yield packed readings of one series within [start, end), in chunk order"""
+    chunks = DisasterDataChunk.objects.filter(event_id=event_id, data_type=data_type)
+    if start is not None:
+        chunks = chunks.filter(end_time__gte=start)
+    if end is not None:
+        chunks = chunks.filter(start_time__lt=end)
+
+    start_us = to_micros(start) if start is not None else None
+    end_us = to_micros(end) if end is not None else None
+    for chunk in chunks.order_by('start_time'):
+        timestamps, values = decode_chunk(chunk)
+        for ts, value in zip(timestamps, values):
+            if (start_us is None or ts >= start_us) and (end_us is None or ts < end_us):
+                yield PackedReading(chunk.event_id, data_type, value, from_micros(ts))
+
+
+def reading_id(chunk_id: uuid.UUID, micros: int) -> uuid.UUID:
+    """Stable synthetic id for a packed reading"""
+    return uuid.uuid5(chunk_id, str(micros))
+
+
+class PackedReadingSequence:
+    """
+    Sliceable view over un-packed rows followed by decoded chunk readings
+
+    Only the chunks overlapping a requested slice are fetched and decoded, so
+    it can back regular pagination of ``/api/disaster-data/``. The order is
+    stable but not one global time order: rows come first in their
+    queryset's order, then chunks by end time, newest-first within each.
+    Chunks of different series can overlap in time, so the caller must not
+    offer any other ordering.
+    """
+
+    def __init__(self, rows, chunks):
+        self.rows = rows
+        self.chunks = chunks.order_by('-end_time', '-id')
+        self._row_count = None
+        self._chunk_counts = None
+
+    def _counts(self) -> Tuple[int, List[Tuple[Any, int]]]:
+        if self._row_count is None:
+            self._row_count = self.rows.count()
+            self._chunk_counts = list(self.chunks.values_list('id', 'count'))
+        return self._row_count, self._chunk_counts
+
+    def count(self) -> int:
+        row_count, chunk_counts = self._counts()
+        return row_count + sum(count for _, count in chunk_counts)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = item.stop if item.stop is not None else self.count()
+        row_count, chunk_counts = self._counts()
+
+        results = []
+        if start < row_count:
+            results.extend(
+                DisasterDataRowView.from_row(row) for row in self.rows[start:min(stop, row_count)]
+            )
+
+        offset = row_count
+        wanted = []
+        for chunk_id, count in chunk_counts:
+            if offset >= stop:
+                break
+            if offset + count > start:
+                wanted.append((chunk_id, max(start - offset, 0), min(stop - offset, count)))
+            offset += count
+
+        chunks = DisasterDataChunk.objects.in_bulk([chunk_id for chunk_id, _, _ in wanted])
+        for chunk_id, first, last in wanted:
+            chunk = chunks[chunk_id]
+            timestamps, values = decode_chunk(chunk)
+            for index in range(chunk.count - 1 - first, chunk.count - 1 - last, -1):
+                results.append(DisasterDataRowView(
+                    id=reading_id(chunk.id, timestamps[index]),
+                    event_id=chunk.event_id,
+                    data_type=chunk.data_type,
+                    value=values[index],
+                    unit=chunk.unit,
+                    source=chunk.source,
+                    timestamp=from_micros(timestamps[index]),
+                    metadata={},
+                ))
+        return results
+
+
+class DisasterDataRowView:
+    """Read-only stand-in for a DisasterData instance, usable by its serializer"""
+
+    def __init__(self, id, event_id, data_type, value, unit, source, timestamp, metadata):
+        self.id = id
+        self.event_id = event_id
+        self.data_type = data_type
+        self.value = value
+        self.unit = unit
+        self.source = source
+        self.timestamp = timestamp
+        self.metadata = metadata
+
+    def serializable_value(self, field_name):
+        # Lets PrimaryKeyRelatedField render the event id without a lookup
+        if field_name == 'event':
+            return self.event_id
+        return getattr(self, field_name)
+
+    @classmethod
+    def from_row(cls, row: DisasterData) -> 'DisasterDataRowView':
+        return cls(row.id, row.event_id, row.data_type, row.value, row.unit, row.source, row.timestamp, row.metadata)
+
+
+def storage_stats() -> Dict[str, Any]:
+    """Reading counts and approximate payload bytes per storage layout"""
+    packed_readings = DisasterDataChunk.objects.aggregate(total=Sum('count'))['total'] or 0
+    return {
+        'rows': DisasterData.objects.count(),
+        'chunks': DisasterDataChunk.objects.count(),
+        'packed_readings': packed_readings,
+        'packed_bytes': packed_readings * 16,
+    }
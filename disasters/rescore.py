@@ -0,0 +1,179 @@
+"""
+Chunked re-score of open events after a RiskModel activation
+
+Activating a model queues a RescoreJob for its disaster type. The job walks
+the type's non-resolved events in primary-key order, a chunk at a time:
+each chunk is read, scored in one vectorized pass, written back with one
+executemany UPDATE and the job's cursor advanced, all in one short
+transaction. So writers are never blocked for longer than one chunk, and a
+job whose process died resumes from its last committed chunk. Nothing
+resumes it on its own: schedule ``manage.py rescore_events`` to run every
+few minutes (see the README's scheduled tasks).
+
+A job stops as superseded once another model is activated for its type; the
+newer activation queues its own job.
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import push
+from core.conditional import bump_changes
+from core.response_cache import bump_version
+
+from . import tiles
+from .models import DisasterEvent, RescoreJob, RiskModel
+from .scoring import FEATURES, CompiledModel
+from .signals import EVENTS_CACHE
+
+logger = logging.getLogger(__name__)
+
+# A running job not heard from for this long is presumed dead and may be resumed
+STALE_AFTER = timedelta(minutes=5)
+
+
+def start_rescore(risk_model: RiskModel, background: bool = True) -> RescoreJob:
+    """Queue a re-score with ``risk_model``, superseding older jobs of its type"""
+    RescoreJob.objects.filter(
+        disaster_type=risk_model.disaster_type, status__in=['pending', 'running']
+    ).update(status='superseded', finished_at=timezone.now())
+    job = RescoreJob.objects.create(
+        risk_model=risk_model,
+        disaster_type=risk_model.disaster_type,
+        total=_events(risk_model.disaster_type).count(),
+    )
+    if background:
+        transaction.on_commit(lambda: threading.Thread(
+            target=_run_in_thread, args=(job.pk,), name=f'rescore-{job.pk}', daemon=True
+        ).start())
+    return job
+
+
+def _run_in_thread(job_id) -> None:
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()
+
+
+def _events(disaster_type: str):
+    return DisasterEvent.objects.filter(disaster_type=disaster_type).exclude(status='resolved')
+
+
+def claim(job_id) -> bool:
+    """Mark a pending (or stale running) job as ours; False if another runner has it"""
+    stale = timezone.now() - STALE_AFTER
+    claimable = RescoreJob.objects.filter(pk=job_id, status='pending') | RescoreJob.objects.filter(
+        pk=job_id, status='running', updated_at__lt=stale
+    )
+    return claimable.update(status='running', updated_at=timezone.now()) == 1
+
+
+def run_job(job_id, chunk_size: Optional[int] = None) -> Optional[RescoreJob]:
+    """
+    Run (or resume) a job to completion; returns the job, or None if not claimed
+    """
+    if not claim(job_id):
+        return None
+    chunk_size = chunk_size or getattr(settings, 'RISK_RESCORE_CHUNK_SIZE', 500)
+    job = RescoreJob.objects.select_related('risk_model').get(pk=job_id)
+    logger.info(f"Rescoring {job.total} {job.disaster_type} events with {job.risk_model} (job {job.pk})")
+    try:
+        model = CompiledModel(job.risk_model)
+        while True:
+            status = _run_chunk(job, model, chunk_size)
+            if status != 'running':
+                break
+    except Exception as e:
+        logger.error(f"Rescore job {job.pk} failed: {e}", exc_info=True)
+        RescoreJob.objects.filter(pk=job.pk, status='running').update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+    job.refresh_from_db()
+    logger.info(f"Rescore job {job.pk} {job.status}: {job.processed}/{job.total} events")
+    return job
+
+
+def _run_chunk(job: RescoreJob, model: CompiledModel, chunk_size: int) -> str:
+    """Score and write one chunk; returns the job's status afterwards"""
+    with transaction.atomic():
+        current = RescoreJob.objects.select_for_update().get(pk=job.pk)
+        if current.status != 'running':
+            return current.status
+        if not RiskModel.objects.filter(pk=job.risk_model_id, is_active=True).exists():
+            _finish(current, 'superseded')
+            return current.status
+
+        events = _events(job.disaster_type).order_by('id')
+        if current.last_id is not None:
+            events = events.filter(id__gt=current.last_id)
+        chunk = list(events.only('id', 'latitude', 'longitude', 'status', 'disaster_type', *FEATURES)[:chunk_size])
+        if not chunk:
+            _finish(current, 'completed')
+            return current.status
+
+        risk, confidence = model.score(chunk)
+        _write_scores(chunk, risk.tolist(), confidence.tolist())
+
+        current.processed += len(chunk)
+        current.last_id = chunk[-1].pk
+        current.save(update_fields=['processed', 'last_id', 'updated_at'])
+        points = {(event.latitude, event.longitude) for event in chunk}
+        transaction.on_commit(lambda: _after_chunk(job.disaster_type, points))
+
+    job.processed, job.last_id = current.processed, current.last_id
+    logger.debug(f"Rescore job {job.pk}: {job.processed}/{job.total}")
+    return 'running'
+
+
+def _write_scores(events, risk, confidence) -> None:
+    """
+    One executemany UPDATE per chunk
+
+    bulk_update builds a CASE expression per row and field, which costs far
+    more than the scoring itself; the values go through the model fields' own
+    database preparation instead.
+    """
+    connection = transaction.get_connection()
+    meta = DisasterEvent._meta
+    fields = [meta.get_field(name) for name in ('risk_score', 'confidence_level', 'updated_at')]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    sql = f'UPDATE {quote(meta.db_table)} SET {assignments} WHERE {quote(meta.pk.column)} = %s'
+
+    prep = [field.get_db_prep_value for field in fields + [meta.pk]]
+    now = timezone.now()
+    rows = [
+        tuple(p(value, connection) for p, value in zip(prep, (event_risk, event_confidence, now, event.pk)))
+        for event, event_risk, event_confidence in zip(events, risk, confidence)
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _finish(job: RescoreJob, status: str) -> None:
+    job.status = status
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+
+
+def _after_chunk(disaster_type: str, points) -> None:
+    # The raw UPDATE in _write_scores skips the model signals
+    bump_version(EVENTS_CACHE)
+    bump_changes(DisasterEvent)
+    tiles.invalidate_points(points)
+    push.broker.publish({'kind': 'resync', 'disaster_type': disaster_type})
+
+
+def resumable_jobs():
+    """Pending jobs and running jobs whose runner stopped reporting progress"""
+    stale = timezone.now() - STALE_AFTER
+    return (
+        RescoreJob.objects.filter(status='pending')
+        | RescoreJob.objects.filter(status='running', updated_at__lt=stale)
+    ).order_by('created_at')
@@ -0,0 +1,503 @@
+"""
+Time-series rollups and tiered retention for DisasterData
+
+Readings are folded into 1-minute, 1-hour and 1-day buckets per
+(event, data_type) as they are written. Chart queries read the finest rollup
+that fits the requested point budget, and raw readings past their retention
+age can be dropped once the rollups reflect them.
+
+Readings written by paths that skip ``apply_readings`` (older rows, the
+admin, ad-hoc scripts) have no rollups. ``backfill_rollups`` rebuilds every
+day whose daily rollup counts fewer readings than are stored, and pruning
+runs it over the expiring days first, so no reading is dropped uncounted.
+"""
+import logging
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, Dict, Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from .models import DisasterData, DisasterDataChunk, DisasterDataRollup
+from .packed import decode_chunk, from_micros, iter_series, to_micros
+
+logger = logging.getLogger(__name__)
+
+# Finest to coarsest
+RESOLUTIONS = (
+    ('1m', timedelta(minutes=1)),
+    ('1h', timedelta(hours=1)),
+    ('1d', timedelta(days=1)),
+)
+RESOLUTION_SIZES = dict(RESOLUTIONS)
+
+DEFAULT_RETENTION_DAYS = {
+    'raw': 30,
+    '1m': 7,
+    '1h': 365,
+    '1d': None,  # Kept forever
+}
+
+
+def get_retention(tier: str) -> Optional[timedelta]:
+    """Retention period for 'raw' or a rollup resolution (None means forever)"""
+    days = getattr(settings, 'DISASTER_DATA_RETENTION_DAYS', {}).get(tier, DEFAULT_RETENTION_DAYS[tier])
+    return timedelta(days=days) if days is not None else None
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """Truncate a timestamp to the start of its (UTC) bucket"""
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    if resolution == '1m':
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == '1h':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _fold(readings: Iterable[Any]) -> Dict[Tuple, Dict[str, Any]]:
+    """Aggregate readings in memory per (resolution, event, data_type, bucket)"""
+    buckets = {}
+    for reading in readings:
+        timestamp = reading.timestamp
+        value = float(reading.value)
+        for resolution, _ in RESOLUTIONS:
+            key = (resolution, reading.event_id, reading.data_type, bucket_start(timestamp, resolution))
+            stats = buckets.get(key)
+            if stats is None:
+                buckets[key] = {
+                    'count': 1,
+                    'sum': value,
+                    'sum_sq': value * value,
+                    'min_value': value,
+                    'max_value': value,
+                    'last_value': value,
+                    'last_timestamp': timestamp,
+                }
+                continue
+            stats['count'] += 1
+            stats['sum'] += value
+            stats['sum_sq'] += value * value
+            stats['min_value'] = min(stats['min_value'], value)
+            stats['max_value'] = max(stats['max_value'], value)
+            if timestamp >= stats['last_timestamp']:
+                stats['last_value'] = value
+                stats['last_timestamp'] = timestamp
+    return buckets
+
+
+def apply_readings(readings: Iterable[Any]) -> int:
+    """
+    Merge newly written readings into the rollup tables
+
+    ``readings`` may be DisasterData instances or any objects exposing
+    event_id, data_type, value and timestamp. Call this only for readings that
+    were actually inserted, otherwise they are counted twice.
+
+    Returns:
+        Number of rollup buckets touched
+    """
+    buckets = _fold(readings)
+    if not buckets:
+        return 0
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _merge_buckets(buckets)
+            break
+        except IntegrityError:
+            # A concurrent writer created one of our buckets first; retry as an update
+            if attempt:
+                raise
+            logger.debug("Rollup bucket created concurrently, retrying merge")
+    return len(buckets)
+
+
+def _merge_buckets(buckets: Dict[Tuple, Dict[str, Any]]) -> None:
+    for resolution, _ in RESOLUTIONS:
+        keys = [key for key in buckets if key[0] == resolution]
+        if not keys:
+            continue
+
+        existing = {
+            (resolution, rollup.event_id, rollup.data_type, rollup.bucket_start): rollup
+            for rollup in DisasterDataRollup.objects.select_for_update().filter(
+                resolution=resolution,
+                event_id__in={key[1] for key in keys},
+                data_type__in={key[2] for key in keys},
+                bucket_start__in={key[3] for key in keys},
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for key in keys:
+            stats = buckets[key]
+            rollup = existing.get(key)
+            if rollup is None:
+                to_create.append(DisasterDataRollup(
+                    resolution=resolution,
+                    event_id=key[1],
+                    data_type=key[2],
+                    bucket_start=key[3],
+                    **stats
+                ))
+                continue
+            rollup.count += stats['count']
+            rollup.sum += stats['sum']
+            rollup.sum_sq += stats['sum_sq']
+            rollup.min_value = min(rollup.min_value, stats['min_value'])
+            rollup.max_value = max(rollup.max_value, stats['max_value'])
+            if stats['last_timestamp'] >= rollup.last_timestamp:
+                rollup.last_value = stats['last_value']
+                rollup.last_timestamp = stats['last_timestamp']
+            to_update.append(rollup)
+
+        DisasterDataRollup.objects.bulk_create(to_create)
+        DisasterDataRollup.objects.bulk_update(
+            to_update,
+            ['count', 'sum', 'sum_sq', 'min_value', 'max_value', 'last_value', 'last_timestamp'],
+        )
+
+
+def rebuild_buckets(event_id, data_type: str, timestamps: Iterable[datetime]) -> None:
+    """
+    Recompute the buckets containing ``timestamps`` from raw readings
+
+    Used after a reading is edited or deleted. Buckets that start before the
+    raw retention cutoff are left alone, since their raw readings are gone.
+    """
+    raw_retention = get_retention('raw')
+    cutoff = timezone.now() - raw_retention if raw_retention else None
+
+    with transaction.atomic():
+        for resolution, size in RESOLUTIONS:
+            for start in {bucket_start(ts, resolution) for ts in timestamps}:
+                if cutoff and start < cutoff:
+                    continue
+                DisasterDataRollup.objects.filter(
+                    event_id=event_id, data_type=data_type, resolution=resolution, bucket_start=start
+                ).delete()
+                raw = list(DisasterData.objects.filter(
+                    event_id=event_id, data_type=data_type,
+                    timestamp__gte=start, timestamp__lt=start + size,
+                ).only('event_id', 'data_type', 'value', 'timestamp'))
+                raw.extend(iter_series(event_id, data_type, start, start + size))
+                buckets = {key: stats for key, stats in _fold(raw).items() if key[0] == resolution}
+                _merge_buckets(buckets)
+
+
+MICROS_PER_DAY = 86400 * 1000000
+
+
+def raw_day_counts(end: Optional[datetime] = None) -> Counter:
+    """Stored readings (rows and packed) per (event_id, data_type, UTC day) before ``end``"""
+    rows = DisasterData.objects.order_by()
+    chunks = DisasterDataChunk.objects.order_by()
+    if end is not None:
+        rows = rows.filter(timestamp__lt=end)
+        chunks = chunks.filter(start_time__lt=end)
+
+    counts = Counter()
+    grouped = (
+        rows.annotate(day=TruncDay('timestamp', tzinfo=dt_timezone.utc))
+        .values('event_id', 'data_type', 'day').annotate(n=Count('id'))
+    )
+    for row in grouped:
+        counts[(row['event_id'], row['data_type'], row['day'])] += row['n']
+
+    end_us = to_micros(end) if end is not None else None
+    for chunk in chunks.only('event_id', 'data_type', 'timestamps').iterator():
+        timestamps, _ = decode_chunk(chunk)
+        for micros in timestamps:
+            if end_us is None or micros < end_us:
+                counts[(chunk.event_id, chunk.data_type, from_micros(micros - micros % MICROS_PER_DAY))] += 1
+    return counts
+
+
+def uncovered_days(end: Optional[datetime] = None) -> List[Tuple[Any, str, datetime]]:
+    """(event_id, data_type, day) whose daily rollup counts fewer readings than are stored"""
+    counts = raw_day_counts(end)
+    daily = DisasterDataRollup.objects.filter(resolution='1d')
+    if end is not None:
+        daily = daily.filter(bucket_start__lt=end)
+    rolled = {
+        (event_id, data_type, day): count
+        for event_id, data_type, day, count in daily.values_list('event_id', 'data_type', 'bucket_start', 'count')
+    }
+    return sorted(key for key, count in counts.items() if count > rolled.get(key, 0))
+
+
+def _rebuild_day(event_id, data_type: str, day: datetime) -> None:
+    """Replace one day's rollups of a series with ones folded from its stored readings"""
+    end = day + RESOLUTION_SIZES['1d']
+    raw = list(DisasterData.objects.filter(
+        event_id=event_id, data_type=data_type, timestamp__gte=day, timestamp__lt=end,
+    ).only('event_id', 'data_type', 'value', 'timestamp'))
+    raw.extend(iter_series(event_id, data_type, day, end))
+
+    # Finer buckets already past their own retention would only be pruned again
+    now = timezone.now()
+    buckets = {}
+    for key, stats in _fold(raw).items():
+        retention = get_retention(key[0])
+        if retention is None or key[3] >= now - retention:
+            buckets[key] = stats
+
+    with transaction.atomic():
+        DisasterDataRollup.objects.filter(
+            event_id=event_id, data_type=data_type, bucket_start__gte=day, bucket_start__lt=end,
+        ).delete()
+        _merge_buckets(buckets)
+
+
+def backfill_rollups(end: Optional[datetime] = None) -> int:
+    """
+    Rebuild the rollups of every day (before ``end``) they do not fully count
+
+    Days whose rollups count more readings than are stored are left alone:
+    their raw readings were pruned or deleted.
+
+    Returns:
+        Number of (event, data_type, day) series rebuilt
+    """
+    days = uncovered_days(end)
+    for event_id, data_type, day in days:
+        _rebuild_day(event_id, data_type, day)
+    if days:
+        logger.info(f"Backfilled rollups for {len(days)} series-days")
+    return len(days)
+
+
+def select_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """
+    Pick the finest resolution whose bucket count fits ``max_points`` and whose
+    retention still covers ``start``; falls back to the coarsest resolution
+    """
+    now = timezone.now()
+    span = max(end - start, timedelta(0))
+    for resolution, size in RESOLUTIONS:
+        retention = get_retention(resolution)
+        if retention and start < now - retention:
+            continue
+        if span / size <= max_points:
+            return resolution
+    return RESOLUTIONS[-1][0]
+
+
+def _stddev(count: int, total: float, total_sq: float) -> Optional[float]:
+    """Population standard deviation from count, sum and sum of squares"""
+    if not count:
+        return None
+    mean = total / count
+    return math.sqrt(max(total_sq / count - mean * mean, 0.0))
+
+
+def query_series(event_id, start: datetime, end: datetime, max_points: int = 500,
+                 data_type: Optional[str] = None, resolution: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return bucketed series per data_type for one event
+
+    The resolution is picked from ``max_points`` unless given explicitly.
+    """
+    resolution = resolution or select_resolution(start, end, max_points)
+    rollups = DisasterDataRollup.objects.filter(
+        event_id=event_id,
+        resolution=resolution,
+        bucket_start__gte=bucket_start(start, resolution),
+        bucket_start__lte=end,
+    ).order_by('data_type', 'bucket_start')
+    if data_type:
+        rollups = rollups.filter(data_type=data_type)
+
+    series = {}
+    for rollup in rollups.values_list('data_type', 'bucket_start', 'min_value', 'max_value',
+                                      'sum', 'sum_sq', 'count', 'last_value'):
+        data_type_name, bucket, min_value, max_value, total, total_sq, count, last_value = rollup
+        series.setdefault(data_type_name, []).append({
+            't': bucket,
+            'min': min_value,
+            'max': max_value,
+            'mean': total / count if count else None,
+            'stddev': _stddev(count, total, total_sq),
+            'count': count,
+            'last': last_value,
+        })
+
+    return {'resolution': resolution, 'start': start, 'end': end, 'series': series}
+
+
+def _day_runs(days: List[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Consecutive days merged into [start, end) ranges"""
+    size = RESOLUTION_SIZES['1d']
+    runs = []
+    for day in sorted(days):
+        if runs and runs[-1][1] == day:
+            runs[-1] = (runs[-1][0], day + size)
+        else:
+            runs.append((day, day + size))
+    return runs
+
+
+def summarize_event(event_id) -> Dict[str, Dict[str, Any]]:
+    """
+    Per data_type count, min, max, mean and stddev for one event
+
+    Read from the event's daily rollups, which count every reading written
+    through apply_readings (rows and packed) within the 1d retention. Raw
+    rows on days with no daily rollup of their type (written before the
+    rollups existed, or by a path that skips them) are added by one GROUP BY
+    that skips the rolled-up day ranges; ``backfill_rollups`` folds them in.
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+
+    def add(data_type, n, total, total_sq, low, high):
+        if not n:
+            return
+        row = totals.setdefault(data_type, {'n': 0, 'total': 0.0, 'total_sq': 0.0, 'low': low, 'high': high})
+        row['n'] += n
+        row['total'] += total or 0.0
+        row['total_sq'] += total_sq or 0.0
+        row['low'] = min(row['low'], low)
+        row['high'] = max(row['high'], high)
+
+    rolled_days: Dict[str, List[datetime]] = {}
+    daily = DisasterDataRollup.objects.filter(event_id=event_id, resolution='1d').values_list(
+        'data_type', 'bucket_start', 'count', 'sum', 'sum_sq', 'min_value', 'max_value'
+    )
+    for data_type, day, *stats in daily:
+        add(data_type, *stats)
+        rolled_days.setdefault(data_type, []).append(day)
+
+    uncovered = ~Q(data_type__in=list(rolled_days)) if rolled_days else Q()
+    for data_type, days in rolled_days.items():
+        covered = Q()
+        for start, end in _day_runs(days):
+            covered |= Q(timestamp__gte=start, timestamp__lt=end)
+        uncovered |= Q(data_type=data_type) & ~covered
+    raw = (
+        DisasterData.objects.filter(uncovered, event_id=event_id)
+        .order_by().values('data_type')
+        .annotate(n=Count('id'), total=Sum('value'), total_sq=Sum(F('value') * F('value')),
+                  low=Min('value'), high=Max('value'))
+    )
+    for row in raw:
+        add(row['data_type'], row['n'], row['total'], row['total_sq'], row['low'], row['high'])
+
+    summary = {}
+    for data_type in sorted(totals):
+        row = totals[data_type]
+        count = row['n']
+        summary[data_type] = {
+            'count': count,
+            'min': row['low'],
+            'max': row['high'],
+            'avg': row['total'] / count if count else None,
+            'stddev': _stddev(count, row['total'], row['total_sq']),
+            'sum': row['total'],
+        }
+    return summary
+
+
+def stored_count(event_id, data_type: str) -> int:
+    """Readings of one series still stored raw (rows and packed), which percentiles() covers"""
+    rows = DisasterData.objects.filter(event_id=event_id, data_type=data_type).count()
+    packed = DisasterDataChunk.objects.filter(event_id=event_id, data_type=data_type).aggregate(n=Sum('count'))['n']
+    return rows + (packed or 0)
+
+
+def percentiles(event_id, data_type: str, points: Iterable[float]) -> Dict[str, Optional[float]]:
+    """
+    Exact percentiles (linear interpolation) of one series
+
+    Computed over the readings still stored raw: once older readings are
+    pruned they only survive in the rollups, so percentiles can describe
+    fewer readings than summarize_event counts (see stored_count).
+
+    Row-stored readings are read with LIMIT/OFFSET along the
+    (event, data_type, value) index, two values per percentile, instead of
+    sorting the series in Python. Packed readings have to be decoded, so a
+    series with chunks is merged in memory.
+    """
+    rows = DisasterData.objects.filter(event_id=event_id, data_type=data_type)
+    chunks = DisasterDataChunk.objects.filter(event_id=event_id, data_type=data_type)
+    points = list(points)
+
+    if chunks.exists():
+        values = sorted(list(rows.values_list('value', flat=True))
+                        + [reading.value for reading in iter_series(event_id, data_type)])
+        count = len(values)
+
+        def fetch(index):
+            return values[index:index + 2]
+    else:
+        ordered = rows.order_by('value').values_list('value', flat=True)
+        count = rows.count()
+
+        def fetch(index):
+            return list(ordered[index:index + 2])
+
+    result = {}
+    for point in points:
+        key = f'p{point:g}'
+        if not count:
+            result[key] = None
+            continue
+        position = (count - 1) * point / 100
+        index = int(position)
+        pair = fetch(index)
+        lower = pair[0]
+        upper = pair[1] if len(pair) > 1 else lower
+        result[key] = lower + (upper - lower) * (position - index)
+    return result
+
+
+def prune_expired(batch_size: int = 10000) -> Dict[str, int]:
+    """
+    Delete raw readings and rollups older than their retention
+
+    Raw readings are pruned by whole UTC days, after backfilling the rollups
+    of expiring days that do not count them all. Deletes run in batches so
+    no single transaction holds the write lock long.
+
+    Returns:
+        Rows deleted per tier
+    """
+    now = timezone.now()
+    deleted = {}
+
+    raw_retention = get_retention('raw')
+    raw_cutoff = bucket_start(now - raw_retention, '1d') if raw_retention else None
+    if raw_cutoff is not None:
+        backfill_rollups(end=raw_cutoff)
+
+    tiers = [
+        ('raw', DisasterData.objects.all(), 'timestamp'),
+        ('raw', DisasterDataChunk.objects.all(), 'end_time'),
+    ]
+    for resolution, _ in RESOLUTIONS:
+        tiers.append((resolution, DisasterDataRollup.objects.filter(resolution=resolution), 'bucket_start'))
+
+    for tier, queryset, field in tiers:
+        retention = get_retention(tier)
+        deleted.setdefault(tier, 0)
+        if retention is None:
+            continue
+        cutoff = raw_cutoff if tier == 'raw' else now - retention
+        expired = queryset.filter(**{f'{field}__lt': cutoff}).order_by()
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                count, _ = queryset.model.objects.filter(id__in=ids).delete()
+            deleted[tier] += count
+
+    logger.info(f"Pruned expired disaster data: {deleted}")
+    return deleted
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import DisasterEvent, DisasterData, RiskModel, HistoricalDisaster
+from .models import DisasterEvent, DisasterData, RiskModel, RescoreJob, HistoricalDisaster
+from .scoring import validate_definition
 
 class DisasterEventSerializer(serializers.ModelSerializer):
     class Meta:
@@ -18,8 +19,33 @@ class DisasterDataSerializer(serializers.ModelSerializer):
 class RiskModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = RiskModel
-        fields = ['id', 'name', 'disaster_type', 'version', 'description', 'parameters', 'weights', 'thresholds', 'is_active', 'accuracy_score', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'disaster_type', 'version', 'description', 'parameters', 'weights', 'thresholds', 'is_active', 'is_shadow', 'accuracy_score', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate(self, data):
+        # Reject definitions the scoring engine could not compile
+        weights = data.get('weights', getattr(self.instance, 'weights', None))
+        parameters = data.get('parameters', getattr(self.instance, 'parameters', None))
+        try:
+            validate_definition(weights, parameters)
+        except ValueError as e:
+            raise serializers.ValidationError({'weights': str(e)})
+        return data
+
+
+class RescoreJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = RescoreJob
+        fields = ['id', 'risk_model', 'disaster_type', 'status', 'total', 'processed', 'progress', 'error', 'created_at', 'updated_at', 'finished_at']
+        read_only_fields = fields
+    
+    def get_progress(self, obj):
+        # Events created after the job was queued can push processed past total
+        if obj.status == 'completed' or not obj.total:
+            return 100.0 if obj.status == 'completed' else 0.0
+        return round(min(obj.processed / obj.total, 1.0) * 100, 1)
 
 
 class HistoricalDisasterSerializer(serializers.ModelSerializer):
@@ -27,3 +53,15 @@ class HistoricalDisasterSerializer(serializers.ModelSerializer):
         model = HistoricalDisaster
         fields = ['id', 'disaster_type', 'location_name', 'latitude', 'longitude', 'occurrence_date', 'magnitude', 'casualties', 'damage_usd', 'description', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+
+class DisasterDataIngestSerializer(serializers.Serializer):
+    """Validates readings accepted into the write-behind spool"""
+    id = serializers.UUIDField(required=False)
+    event = serializers.UUIDField()
+    data_type = serializers.CharField(max_length=100)
+    value = serializers.FloatField()
+    unit = serializers.CharField(max_length=50, allow_blank=True, required=False, default='')
+    source = serializers.CharField(max_length=255, allow_blank=True, required=False, default='')
+    timestamp = serializers.DateTimeField(required=False)
+    metadata = serializers.JSONField(required=False, default=dict)
@@ -0,0 +1,182 @@
+"""
+Shadow evaluation of candidate RiskModels on live ingest
+
+Inactive models marked ``is_shadow`` are scored on newly ingested events
+without touching the ingest path: ingest only hands the committed event ids
+to an in-process queue, and a daemon worker thread scores them in batches
+with every candidate of the event's type, storing each candidate score next
+to the live risk_score in ShadowScore.
+
+The queue is bounded (SHADOW_SCORING['QUEUE_SIZE']); when the worker falls
+behind, ids are dropped and counted rather than slowing ingest down. Shadow
+results are a sample of live traffic, so nothing is retried or persisted
+across restarts.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import DisasterEvent, ShadowScore
+from .scoring import FEATURES, shadow_models
+
+logger = logging.getLogger(__name__)
+
+# Risk bands for agreement when a model's thresholds do not define them
+DEFAULT_BANDS = {'low': 0, 'medium': 25, 'high': 50, 'critical': 75}
+HISTOGRAM_BINS = np.linspace(0, 100, 11)
+
+
+def _setting(name: str, default):
+    return getattr(settings, 'SHADOW_SCORING', {}).get(name, default)
+
+
+class ShadowQueue:
+    """Event ids waiting for shadow scoring, drained by one worker thread per process"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=_setting('QUEUE_SIZE', 10000))
+        self._worker = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def enqueue(self, event_ids: Iterable[Any]) -> None:
+        for event_id in event_ids:
+            try:
+                self._queue.put_nowait(event_id)
+            except queue.Full:
+                self.dropped += 1
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='shadow-scoring', daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            try:
+                self.drain(batch)
+            except Exception as e:
+                logger.error(f"Shadow scoring failed for {len(batch)} events: {e}", exc_info=True)
+            finally:
+                # Thread-owned connection; reopened by the next batch
+                connection.close()
+
+    def drain(self, batch: Optional[List[Any]] = None) -> int:
+        """Score queued ids (plus ``batch``) in batches; returns the events scored"""
+        batch = list(batch or [])
+        batch_size = _setting('BATCH_SIZE', 500)
+        scored = 0
+        while True:
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return scored
+            scored += score_events(batch)
+            batch = []
+
+    def __len__(self):
+        return self._queue.qsize()
+
+
+shadow_queue = ShadowQueue()
+
+
+def enqueue_on_commit(event_ids: Sequence[Any]) -> None:
+    """Queue ingested events for shadow scoring once they are committed"""
+    if event_ids and shadow_models():
+        transaction.on_commit(lambda: shadow_queue.enqueue(event_ids))
+
+
+def score_events(event_ids: Sequence[Any]) -> int:
+    """Score events with every shadow candidate of their type and store the results"""
+    candidates = shadow_models()
+    if not candidates:
+        return 0
+    events = list(
+        DisasterEvent.objects.filter(pk__in=event_ids, disaster_type__in=list(candidates))
+        .only('id', 'disaster_type', 'risk_score', *FEATURES)
+    )
+    by_type: Dict[str, List[DisasterEvent]] = {}
+    for event in events:
+        by_type.setdefault(event.disaster_type, []).append(event)
+
+    rows = []
+    for disaster_type, group in by_type.items():
+        for model in candidates[disaster_type]:
+            shadow, _ = model.score(group)
+            rows.extend(
+                ShadowScore(risk_model_id=model.id, event=event, live_score=event.risk_score, shadow_score=score)
+                for event, score in zip(group, shadow.tolist())
+            )
+    # An event ingested again is re-scored in place
+    ShadowScore.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['risk_model', 'event'],
+        update_fields=['live_score', 'shadow_score', 'scored_at'],
+    )
+    return len(events)
+
+
+def _bands(risk_model) -> np.ndarray:
+    thresholds = risk_model.thresholds if isinstance(risk_model.thresholds, dict) else {}
+    cuts = [v for v in thresholds.values() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    # A floor at 0 opens the lowest band, which digitize() does without an edge
+    return np.array(sorted(c for c in cuts or DEFAULT_BANDS.values() if c > 0), dtype=float)
+
+
+def population_stability(expected: np.ndarray, actual: np.ndarray) -> float:
+    """PSI between two score samples over HISTOGRAM_BINS (> 0.25 is a large shift)"""
+    e = np.histogram(expected, HISTOGRAM_BINS)[0] / len(expected)
+    a = np.histogram(actual, HISTOGRAM_BINS)[0] / len(actual)
+    e, a = np.clip(e, 1e-4, None), np.clip(a, 1e-4, None)
+    return float(((a - e) * np.log(a / e)).sum())
+
+
+def summarize(risk_model, since=None, tolerance: float = 10.0) -> Dict[str, Any]:
+    """Agreement and distribution shift of a candidate against the live scores"""
+    scores = ShadowScore.objects.filter(risk_model=risk_model)
+    if since is not None:
+        scores = scores.filter(scored_at__gte=since)
+    pairs = np.array(list(scores.values_list('live_score', 'shadow_score')), dtype=float).reshape(-1, 2)
+    summary: Dict[str, Any] = {'risk_model': str(risk_model.pk), 'events': len(pairs)}
+    if not len(pairs):
+        return summary
+
+    live, shadow = pairs[:, 0], pairs[:, 1]
+    delta = shadow - live
+    bands = _bands(risk_model)
+    summary.update({
+        'agreement': {
+            'within_tolerance': round(float((np.abs(delta) <= tolerance).mean()), 4),
+            'tolerance': tolerance,
+            'same_band': round(float((np.digitize(live, bands) == np.digitize(shadow, bands)).mean()), 4),
+        },
+        'delta': {
+            'mean': round(float(delta.mean()), 2),
+            'mean_abs': round(float(np.abs(delta).mean()), 2),
+            'p50': round(float(np.percentile(delta, 50)), 2),
+            'p95_abs': round(float(np.percentile(np.abs(delta), 95)), 2),
+        },
+        'distribution': {
+            'live': {'mean': round(float(live.mean()), 2), 'std': round(float(live.std()), 2),
+                     'histogram': np.histogram(live, HISTOGRAM_BINS)[0].tolist()},
+            'shadow': {'mean': round(float(shadow.mean()), 2), 'std': round(float(shadow.std()), 2),
+                       'histogram': np.histogram(shadow, HISTOGRAM_BINS)[0].tolist()},
+            'bins': HISTOGRAM_BINS.tolist(),
+            'psi': round(population_stability(live, shadow), 4),
+        },
+    })
+    return summary
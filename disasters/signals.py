@@ -0,0 +1,50 @@
+"""
+Model signal handlers for the disasters app
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core import push
+from core.change_feed import record_deletions
+from core.response_cache import bump_version
+
+from .analogues import analogue_indexes
+from .history_index import history_indexes
+from .models import DisasterEvent, HistoricalDisaster
+from . import tiles
+
+# Response cache namespace of the event list actions
+EVENTS_CACHE = 'disasters:events'
+
+record_deletions(DisasterEvent, HistoricalDisaster)
+
+
+@receiver(post_init, sender=DisasterEvent)
+def remember_position(sender, instance, **kwargs):
+    # __dict__ lookups so deferred coordinates are not fetched
+    instance._loaded_position = (instance.__dict__.get('latitude'), instance.__dict__.get('longitude'))
+
+
+@receiver(post_save, sender=DisasterEvent)
+def invalidate_on_save(sender, instance, created, **kwargs):
+    position = (instance.latitude, instance.longitude)
+    previous = getattr(instance, '_loaded_position', (None, None))
+    tiles.invalidate_points({position, previous})
+    instance._loaded_position = position
+    bump_version(EVENTS_CACHE)
+    push.publish_on_commit(push.disaster_message(instance, 'created' if created else 'updated'))
+
+
+@receiver(post_delete, sender=DisasterEvent)
+def invalidate_on_delete(sender, instance, **kwargs):
+    tiles.invalidate_points([(instance.latitude, instance.longitude)])
+    bump_version(EVENTS_CACHE)
+    push.publish_on_commit(push.disaster_message(instance, 'deleted'))
+
+
+@receiver(post_save, sender=HistoricalDisaster)
+@receiver(post_delete, sender=HistoricalDisaster)
+def invalidate_history(sender, **kwargs):
+    # Other workers notice through the stamp within STAMP_TTL
+    history_indexes.invalidate()
+    analogue_indexes.invalidate()
@@ -1,3 +1,891 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import random
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import (
+    DisasterEvent, DisasterData, DisasterDataChunk, DisasterDataRollup, HistoricalDisaster, RiskModel, RescoreJob,
+    ShadowScore,
+)
+from . import geo, tiles
+from .packed import pack_readings, iter_series, PackedReadingSequence
+from .rollups import (
+    apply_readings, select_resolution, query_series, summarize_event, percentiles, prune_expired, uncovered_days,
+)
+from .analogues import analogue_indexes, find_analogues, parse_weights
+from .backtest import backtest, roc_auc
+from .history_index import STAMP_TTL, KDTree, history_indexes, nearest_history, unit_vectors
+from .rescore import run_job, resumable_jobs
+from .scoring import active_models, score_events
+from .shadow import shadow_queue
+from .write_buffer import SpoolWriter, SpoolFlusher
 
-# Create your tests here.
+
+class WriteBufferTestCase(TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.event = DisasterEvent.objects.create(
+            disaster_type='flood',
+            location_name='Test River',
+            risk_score=60,
+            confidence_level=70,
+            predicted_time=timezone.now(),
+        )
+
+    def _reading(self, value):
+        return {
+            'id': None,
+            'event': str(self.event.id),
+            'data_type': 'water_level',
+            'value': value,
+            'unit': 'm',
+            'source': 'gauge',
+            'timestamp': (timezone.now() - timedelta(minutes=value)).isoformat(),
+            'metadata': {},
+        }
+
+    def test_replays_unsealed_segment(self):
+        writer = SpoolWriter(self.spool_dir)
+        readings = [dict(self._reading(i), id=f'00000000-0000-0000-0000-{i:012d}') for i in range(1, 4)]
+        writer.append(readings)
+        # Simulate a crash: the writer never seals, its lock is released on close
+        writer._file.close()
+
+        segments, written = SpoolFlusher(self.spool_dir).flush()
+        self.assertEqual((segments, written), (1, 3))
+        self.assertEqual(DisasterData.objects.filter(event=self.event).count(), 3)
+        self.assertEqual(sum(DisasterDataRollup.objects.filter(resolution='1h').values_list('count', flat=True)), 3)
+
+    def test_flush_is_idempotent(self):
+        writer = SpoolWriter(self.spool_dir)
+        reading = dict(self._reading(1), id='00000000-0000-0000-0000-000000000001')
+        writer.append([reading])
+        writer.append([reading])
+        writer.close()
+
+        SpoolFlusher(self.spool_dir).flush()
+        self.assertEqual(DisasterData.objects.count(), 1)
+
+    def test_conflicting_ids_are_rejected(self):
+        reading = dict(self._reading(1), id='00000000-0000-0000-0000-000000000001')
+        writer = SpoolWriter(self.spool_dir)
+        writer.append([reading])
+        writer.close()
+        SpoolFlusher(self.spool_dir).flush()
+
+        # The same id for a different reading, next to a plain retry
+        writer = SpoolWriter(self.spool_dir)
+        writer.append([dict(reading, value=99.0), reading])
+        writer.close()
+        flusher = SpoolFlusher(self.spool_dir)
+        self.assertEqual(flusher.flush(), (1, 0))
+        self.assertEqual(flusher.rejected, 1)
+        self.assertEqual(DisasterData.objects.get().value, 1.0)
+
+        user = get_user_model().objects.create_user(username='gauge', password='testpass123', role='responder')
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch('disasters.write_buffer.get_writer', return_value=SpoolWriter(self.spool_dir)):
+            data = client.post('/api/disaster-data/ingest/', [dict(reading, value=99.0), reading], format='json').json()
+        self.assertEqual((data['accepted'], data['rejected']), (1, [reading['id']]))
+
+    def test_retry_without_timestamp_is_not_a_conflict(self):
+        user = get_user_model().objects.create_user(username='gauge', password='testpass123', role='responder')
+        client = APIClient()
+        client.force_authenticate(user)
+        reading = {'id': '00000000-0000-0000-0000-000000000001', 'event': str(self.event.id),
+                   'data_type': 'water_level', 'value': 1.0, 'unit': 'm'}
+        for _ in range(2):
+            with mock.patch('disasters.write_buffer.get_writer', return_value=SpoolWriter(self.spool_dir)) as writer:
+                data = client.post('/api/disaster-data/ingest/', [reading], format='json').json()
+                writer.return_value.close()
+            self.assertEqual((data['accepted'], data['rejected']), (1, []))
+            flusher = SpoolFlusher(self.spool_dir)
+            flusher.flush()
+            self.assertEqual(flusher.rejected, 0)
+        self.assertEqual(DisasterData.objects.count(), 1)
+
+        # Reusing an id within one batch for a different reading is a conflict
+        other = dict(reading, id='00000000-0000-0000-0000-000000000002')
+        with mock.patch('disasters.write_buffer.get_writer', return_value=SpoolWriter(self.spool_dir)) as writer:
+            data = client.post('/api/disaster-data/ingest/', [other, dict(other, value=2.0)], format='json').json()
+            writer.return_value.close()
+        self.assertEqual((data['accepted'], data['rejected']), (1, [other['id']]))
+
+        # ... and the flusher counts it when it reaches the spool directly
+        third = '00000000-0000-0000-0000-000000000003'
+        writer = SpoolWriter(self.spool_dir)
+        writer.append([dict(self._reading(3), id=third), dict(self._reading(4), id=third)])
+        writer.close()
+        flusher = SpoolFlusher(self.spool_dir)
+        flusher.flush()
+        self.assertEqual(flusher.rejected, 1)
+        self.assertEqual(DisasterData.objects.get(id=third).value, 3.0)
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.event = DisasterEvent.objects.create(
+            disaster_type='cyclone',
+            location_name='Test Coast',
+            risk_score=60,
+            confidence_level=70,
+            predicted_time=timezone.now(),
+        )
+
+    def test_incremental_merge(self):
+        base = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+        first = [DisasterData(event=self.event, data_type='wind', value=v, unit='kmh', source='s',
+                              timestamp=base + timedelta(seconds=10 * i)) for i, v in enumerate([10, 30])]
+        second = [DisasterData(event=self.event, data_type='wind', value=20, unit='kmh', source='s',
+                               timestamp=base + timedelta(minutes=5))]
+        apply_readings(first)
+        apply_readings(second)
+
+        hourly = DisasterDataRollup.objects.get(event=self.event, resolution='1h')
+        self.assertEqual(hourly.count, 3)
+        self.assertEqual((hourly.min_value, hourly.max_value, hourly.mean), (10, 30, 20))
+        self.assertEqual(hourly.last_value, 20)
+        self.assertEqual(DisasterDataRollup.objects.filter(event=self.event, resolution='1m').count(), 2)
+
+        result = query_series(self.event.id, base, base + timedelta(hours=1), max_points=10)
+        self.assertEqual(result['resolution'], '1h')
+        self.assertEqual(result['series']['wind'][0]['count'], 3)
+
+    def test_event_analytics(self):
+        base = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        readings = [DisasterData(event=self.event, data_type='wind', value=v, unit='kmh', source='s',
+                                 timestamp=base + timedelta(minutes=30 * i)) for i, v in enumerate([1, 2, 3, 4, 10])]
+        # Legacy rows without rollups are counted from the raw rows
+        DisasterData.objects.bulk_create(readings)
+        self.assertEqual(summarize_event(self.event.id)['wind']['count'], 5)
+        apply_readings(readings)
+
+        # Older readings on a day without rollups are merged with the rolled-up days
+        old = DisasterData.objects.create(event=self.event, data_type='wind', value=100, unit='kmh', source='s',
+                                          timestamp=base - timedelta(days=3))
+        stats = summarize_event(self.event.id)['wind']
+        self.assertEqual((stats['count'], stats['max']), (6, 100))
+        old.delete()
+
+        stats = summarize_event(self.event.id)['wind']
+        self.assertEqual((stats['count'], stats['min'], stats['max'], stats['avg']), (5, 1, 10, 4))
+        self.assertAlmostEqual(stats['stddev'], 3.1623, places=4)
+        result = percentiles(self.event.id, 'wind', [0, 50, 90, 100])
+        self.assertEqual((result['p0'], result['p50'], result['p100']), (1, 3, 10))
+        self.assertAlmostEqual(result['p90'], 7.6)
+
+        user = get_user_model().objects.create_user(username='analyst', password='testpass123', role='analyst')
+        client = APIClient()
+        client.force_authenticate(user)
+        data = client.get(f'/api/disasters/{self.event.id}/analytics/?bucket=hour&percentiles=50').json()
+        self.assertEqual((data['total_data_points'], data['avg_value'], data['data_types']), (5, 4, ['wind']))
+        self.assertEqual(data['by_type']['wind']['percentiles'], {'p50': 3})
+        self.assertEqual(data['by_type']['wind']['percentile_readings'], 5)
+        self.assertEqual(data['series']['resolution'], '1h')
+        self.assertEqual(sum(point['count'] for point in data['series']['series']['wind']), 5)
+
+    def test_select_resolution(self):
+        end = timezone.now()
+        self.assertEqual(select_resolution(end - timedelta(hours=2), end, 500), '1m')
+        self.assertEqual(select_resolution(end - timedelta(days=3), end, 500), '1h')
+        self.assertEqual(select_resolution(end - timedelta(days=400), end, 500), '1d')
+
+    def test_prune_backfills_readings_without_rollups(self):
+        day = (timezone.now() - timedelta(days=40)).replace(hour=6, minute=0, second=0, microsecond=0)
+        readings = [DisasterData(event=self.event, data_type='wind', value=v, unit='kmh', source='s',
+                                 timestamp=day + timedelta(minutes=i)) for i, v in enumerate([5, 7, 9])]
+        DisasterData.objects.bulk_create(readings)
+        # Only one of them went through apply_readings
+        apply_readings(readings[:1])
+        self.assertEqual(len(uncovered_days()), 1)
+
+        deleted = prune_expired()
+        self.assertEqual(deleted['raw'], 3)
+        daily = DisasterDataRollup.objects.get(event=self.event, resolution='1d')
+        self.assertEqual((daily.count, daily.sum, daily.max_value), (3, 21, 9))
+        # Minute buckets are past their own retention and are not rebuilt
+        self.assertFalse(DisasterDataRollup.objects.filter(event=self.event, resolution='1m').exists())
+        self.assertEqual(summarize_event(self.event.id)['wind']['count'], 3)
+
+    def test_backfill_command(self):
+        from django.core.management import call_command
+
+        base = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        DisasterData.objects.bulk_create([
+            DisasterData(event=self.event, data_type='wind', value=v, unit='kmh', source='s',
+                         timestamp=base + timedelta(minutes=i)) for i, v in enumerate([1, 2])
+        ])
+        call_command('backfill_rollups', stdout=io.StringIO())
+        self.assertEqual(uncovered_days(), [])
+        self.assertEqual(DisasterDataRollup.objects.filter(event=self.event, resolution='1m').count(), 2)
+
+
+@override_settings(DISASTER_DATA_STORAGE='packed', DISASTER_DATA_CHUNK_SIZE=4)
+class PackedStorageTestCase(TestCase):
+    def setUp(self):
+        self.event = DisasterEvent.objects.create(
+            disaster_type='flood',
+            location_name='Test Delta',
+            risk_score=40,
+            confidence_level=60,
+            predicted_time=timezone.now(),
+        )
+        base = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        self.readings = [
+            DisasterData(event=self.event, data_type='rain', value=float(i), unit='mm', source='s',
+                         timestamp=base + timedelta(seconds=i))
+            for i in range(10)
+        ]
+
+    def test_pack_round_trip_and_replay(self):
+        self.assertEqual(len(pack_readings(self.readings)), 10)
+        self.assertEqual(pack_readings(self.readings[:5]), [])
+        self.assertEqual(DisasterDataChunk.objects.count(), 3)
+
+        decoded = list(iter_series(self.event.id, 'rain'))
+        self.assertEqual([reading.value for reading in decoded], [float(i) for i in range(10)])
+        self.assertEqual(decoded[3].timestamp, self.readings[3].timestamp)
+
+    def test_sequence_pages_newest_first(self):
+        pack_readings(self.readings)
+        sequence = PackedReadingSequence(DisasterData.objects.none(), DisasterDataChunk.objects.all())
+        self.assertEqual(sequence.count(), 10)
+        self.assertEqual([reading.value for reading in sequence[2:6]], [7.0, 6.0, 5.0, 4.0])
+
+    def test_list_rejects_ordering(self):
+        pack_readings(self.readings)
+        user = get_user_model().objects.create_user(username='analyst', password='testpass123', role='analyst')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/disaster-data/').json()['count'], 10)
+        self.assertEqual(client.get('/api/disaster-data/', {'ordering': 'timestamp'}).status_code, 400)
+
+
+class MapFeedTestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='viewer', password='testpass123', role='public')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        for i, disaster_type in enumerate(['flood', 'earthquake', 'flood']):
+            DisasterEvent.objects.create(
+                disaster_type=disaster_type,
+                location_name=f'Site {i}',
+                latitude=10.123456789 + i,
+                longitude=20.5,
+                risk_score=30 + 20 * i,
+                confidence_level=50,
+                predicted_time=timezone.now(),
+            )
+
+    def test_columnar_feed_respects_filters(self):
+        feed = self.client.get('/api/disasters/map_feed/?disaster_type=flood').json()
+        self.assertEqual(feed['count'], 2)
+        self.assertEqual(feed['risk'], [70.0, 30.0])
+        self.assertEqual(feed['lats'], [12.12346, 10.12346])
+        self.assertEqual({feed['types'][code] for code in feed['type']}, {'flood'})
+        self.assertEqual(len(feed['ids']), len(feed['status']))
+
+    def test_gzip_and_etag(self):
+        response = self.client.get('/api/disasters/map_feed/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 3)
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/disasters/map_feed/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        DisasterEvent.objects.filter(disaster_type='earthquake').delete()
+        response = self.client.get('/api/disasters/map_feed/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+
+class GeoFilterTestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='geo', password='testpass123', role='analyst')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        rng = random.Random(7)
+        self.points = {}
+        for i in range(200):
+            lat, lon = rng.uniform(5, 25), rng.choice([rng.uniform(70, 90), rng.uniform(175, 180), rng.uniform(-180, -175)])
+            event = DisasterEvent.objects.create(
+                disaster_type='flood', location_name=f'P{i}', latitude=lat, longitude=lon,
+                risk_score=10, confidence_level=10, predicted_time=timezone.now(),
+            )
+            self.points[str(event.id)] = (lat, lon)
+
+    def _ids(self, query):
+        response = self.client.get(f'/api/disasters/map_feed/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return set(response.json()['ids'])
+
+    def test_geohash_maintained(self):
+        event = DisasterEvent.objects.first()
+        self.assertEqual(event.geohash, geo.encode(event.latitude, event.longitude))
+        event.latitude = None
+        event.save(update_fields=['latitude'])
+        event.refresh_from_db()
+        self.assertEqual(event.geohash, '')
+
+    def test_bbox_matches_brute_force(self):
+        expected = {pk for pk, (lat, lon) in self.points.items() if 10 <= lat <= 15 and 75 <= lon <= 80}
+        self.assertEqual(self._ids('bbox=75,10,80,15'), expected)
+
+        across = {pk for pk, (lat, lon) in self.points.items() if 10 <= lat <= 20 and (lon >= 178 or lon <= -178)}
+        self.assertEqual(self._ids('bbox=178,10,-178,20'), across)
+
+    def test_near_matches_haversine(self):
+        for center, radius in [((15.0, 80.0), 300), ((12.0, 179.5), 250)]:
+            expected = {pk for pk, point in self.points.items() if geo.haversine_km(*center, *point) <= radius}
+            self.assertEqual(self._ids(f'near={center[0]},{center[1]}&radius_km={radius}'), expected)
+        self.assertEqual(self.client.get('/api/disasters/?near=abc').status_code, 400)
+
+
+class TileTestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='tiler', password='testpass123', role='public')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        for i, (disaster_type, risk) in enumerate([('flood', 40), ('flood', 90), ('cyclone', 60)]):
+            DisasterEvent.objects.create(
+                disaster_type=disaster_type, location_name=f'Coast {i}', latitude=13.0 + i * 0.01,
+                longitude=80.2, risk_score=risk, confidence_level=50, predicted_time=timezone.now(),
+            )
+
+    def _tile(self, z):
+        x, y = tiles.tile_for(13.0, 80.2, z)
+        response = self.client.get(f'/api/disasters/tiles/{z}/{x}/{y}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_clusters_at_low_zoom(self):
+        tile = self._tile(3)
+        self.assertEqual(tile['kind'], 'clusters')
+        self.assertEqual(len(tile['clusters']), 1)
+        cluster = tile['clusters'][0]
+        self.assertEqual((cluster['count'], cluster['max_risk'], cluster['dominant_type']), (3, 90, 'flood'))
+        self.assertEqual(self.client.get('/api/disasters/tiles/2/4/0/').status_code, 400)
+
+    def test_events_at_high_zoom_and_invalidation(self):
+        tile = self._tile(14)
+        self.assertEqual(tile['kind'], 'events')
+        self.assertEqual(len(tile['events']), 1)
+
+        # Served from cache until an event in the tile changes
+        DisasterEvent.objects.filter(location_name='Coast 0').update(risk_score=1)
+        self.assertEqual(self._tile(14)['events'][0]['risk_score'], 40)
+
+        event = DisasterEvent.objects.get(location_name='Coast 0')
+        event.latitude = -33.9
+        event.save()
+        self.assertEqual(self._tile(14)['events'], [])
+        self.assertEqual(self._tile(3)['clusters'][0]['count'], 2)
+
+
+
+class DashboardListCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username='watcher', password='testpass123', role='public')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        for i in range(3):
+            DisasterEvent.objects.create(
+                disaster_type='flood', status='active', location_name=f'Town {i}', latitude=10.0, longitude=20.0,
+                risk_score=50 + 20 * i, confidence_level=50, predicted_time=timezone.now() - timedelta(hours=i),
+            )
+
+    def test_paginated_and_filtered(self):
+        page = self.client.get('/api/disasters/active_events/?count=exact&page_size=2').json()
+        self.assertEqual(page['count'], 3)
+        self.assertEqual(len(page['results']), 2)
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([e['location_name'] for e in rest['results']], ['Town 2'])
+
+        high = self.client.get('/api/disasters/high_risk/?threshold=60&count=exact').json()
+        self.assertEqual(high['count'], 2)
+        self.assertEqual(self.client.get('/api/disasters/high_risk/?threshold=x').status_code, 400)
+
+    def test_cached_until_an_event_changes(self):
+        url = '/api/disasters/active_events/?count=exact'
+        self.assertEqual(self.client.get(url).json()['count'], 3)
+
+        # Queryset updates send no signals, so the cached page is served
+        DisasterEvent.objects.filter(location_name='Town 0').update(status='resolved')
+        self.assertEqual(self.client.get(url).json()['count'], 3)
+
+        event = DisasterEvent.objects.get(location_name='Town 1')
+        event.status = 'resolved'
+        event.save()
+        self.assertEqual(self.client.get(url).json()['count'], 1)
+
+
+class BulkStatusTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username='closer', password='testpass123', role='responder')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.events = [
+            DisasterEvent.objects.create(
+                disaster_type='cyclone' if i < 3 else 'flood', status='active' if i else 'resolved',
+                location_name=f'Harbour {i}', latitude=20.0, longitude=86.0 + i,
+                risk_score=60, confidence_level=50, predicted_time=timezone.now(),
+            ) for i in range(4)
+        ]
+
+    def test_by_ids_with_outcomes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import AuditLog
+
+        missing = '00000000-0000-0000-0000-000000000000'
+        ids = [str(e.id) for e in self.events[:3]] + [missing, 'nope']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/disasters/bulk_update_status/',
+                                        {'status': 'resolved', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[ids[0]], 'unchanged')
+        self.assertEqual([results[i] for i in ids[1:3]], ['updated', 'updated'])
+        self.assertEqual((results[missing], results['nope']), ('not_found', 'not_found'))
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(AuditLog.objects.filter(resource_type='DisasterEvent').count(), 2)
+        self.assertEqual(DisasterEvent.objects.filter(status='resolved').count(), 3)
+
+    def test_by_filter_and_validation(self):
+        response = self.client.post('/api/disasters/bulk_update_status/',
+                                    {'status': 'contained', 'filter': {'disaster_type': 'cyclone', 'status': 'active'}},
+                                    format='json')
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(set(DisasterEvent.objects.filter(status='contained').values_list('location_name', flat=True)),
+                         {'Harbour 1', 'Harbour 2'})
+
+        post = lambda body: self.client.post('/api/disasters/bulk_update_status/', body, format='json').status_code
+        self.assertEqual(post({'status': 'bogus', 'ids': []}), 400)
+        self.assertEqual(post({'status': 'resolved'}), 400)
+        self.assertEqual(post({'status': 'resolved', 'filter': {'bbox': '1,2'}}), 400)
+        # A typo or empty values would otherwise select every event
+        self.assertEqual(post({'status': 'resolved', 'filter': {'disastertype': 'cyclone'}}), 400)
+        self.assertEqual(post({'status': 'resolved', 'filter': {'disaster_type': '', 'radius_km': 10}}), 400)
+        self.assertEqual(DisasterEvent.objects.filter(status='resolved').count(), 1)
+
+    def test_public_users_cannot_bulk_update(self):
+        viewer = get_user_model().objects.create_user(username='viewer', password='testpass123', role='public')
+        self.client.force_authenticate(viewer)
+        response = self.client.post('/api/disasters/bulk_update_status/',
+                                    {'status': 'resolved', 'ids': [str(self.events[1].id)]}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(DisasterEvent.objects.get(pk=self.events[1].pk).status, 'active')
+
+
+class RiskScoringTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.model = RiskModel.objects.create(
+            name='Flood v2', disaster_type='flood', version='2', is_active=True, thresholds={},
+            weights={'rainfall_mm': 3, 'wind_speed_kmh': 1},
+            parameters={'ranges': {'rainfall_mm': [0, 200], 'wind_speed_kmh': [0, 100]}},
+        )
+
+    def test_batch_scores_follow_the_active_model(self):
+        rows = [
+            {'disaster_type': 'flood', 'rainfall_mm': 100.0, 'wind_speed_kmh': 100.0},
+            {'disaster_type': 'flood', 'rainfall_mm': 400.0},
+            {'disaster_type': 'flood'},
+            {'disaster_type': 'earthquake', 'magnitude': 7.0, 'risk_score': 50.0},
+        ]
+        self.assertEqual(score_events(rows), 3)
+        # (3 * 0.5 + 1 * 1.0) / 4, full coverage
+        self.assertEqual((rows[0]['risk_score'], rows[0]['confidence_level']), (62.5, 100.0))
+        # Out-of-range values clip; the missing feature lowers confidence only
+        self.assertEqual((rows[1]['risk_score'], rows[1]['confidence_level']), (100.0, 75.0))
+        self.assertEqual((rows[2]['risk_score'], rows[2]['confidence_level']), (0.0, 0.0))
+        self.assertEqual(rows[3]['risk_score'], 50.0)
+
+        # Saving a model recompiles; accuracy_score scales confidence
+        self.model.accuracy_score = 0.8
+        self.model.save()
+        score_events(rows[:1])
+        self.assertEqual(rows[0]['confidence_level'], 80.0)
+        self.model.delete()
+        self.assertEqual(active_models(), {})
+
+    def test_models_recompile_after_changes_from_other_workers(self):
+        self.assertEqual(active_models()['flood'].version, self.model.version)
+        # Another worker's writes reach this process only through the database
+        cache.clear()
+        RiskModel.objects.filter(pk=self.model.pk).update(version='3', updated_at=timezone.now())
+        self.assertEqual(active_models()['flood'].version, '3')
+        RiskModel.objects.filter(pk=self.model.pk).delete()
+        self.assertEqual(active_models(), {})
+
+    def test_ingest_scores_each_batch(self):
+        from core.data_sync import DataSyncManager
+        from core.models import DataSource
+
+        source = DataSource.objects.create(name='Gauges', source_type='csv', file_path='gauges.csv')
+        records = [
+            {'type': 'flood', 'location': 'Riverside', 'rainfall': '200', 'wind_speed': '50', 'risk': '10'},
+            {'type': 'cyclone', 'location': 'Coast', 'wind_speed': '150', 'risk': 'high'},
+        ]
+        processed, errors = DataSyncManager._process_disaster_records(records, source)
+        self.assertEqual((processed, errors), (2, []))
+        flood = DisasterEvent.objects.get(location_name='Riverside')
+        self.assertEqual((flood.risk_score, flood.confidence_level), (87.5, 100.0))
+        # No active cyclone model: the file's value is kept
+        self.assertEqual(DisasterEvent.objects.get(location_name='Coast').risk_score, 75.0)
+
+    def test_invalid_definitions_are_rejected(self):
+        user = get_user_model().objects.create_user(username='modeller', password='testpass123', role='admin')
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {'name': 'Bad', 'disaster_type': 'flood', 'version': '3', 'parameters': {}, 'thresholds': {},
+                   'weights': {'soil_moisture': 1}}
+        response = client.post('/api/risk-models/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('soil_moisture', response.json()['weights'][0])
+
+        payload['weights'] = {'rainfall_mm': 1}
+        payload['parameters'] = {'ranges': {'rainfall_mm': [100, 0]}}
+        self.assertEqual(client.post('/api/risk-models/', payload, format='json').status_code, 400)
+
+
+class RescoreJobTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='modeller', password='testpass123', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        DisasterEvent.objects.bulk_create([
+            DisasterEvent(disaster_type='flood', location_name=f'Gauge {i}', risk_score=50, confidence_level=50,
+                          rainfall_mm=i * 20, status='resolved' if i == 9 else 'active', predicted_time=now)
+            for i in range(10)
+        ])
+        self.model = RiskModel.objects.create(
+            name='Rain only', disaster_type='flood', version='2', parameters={'ranges': {'rainfall_mm': [0, 200]}},
+            weights={'rainfall_mm': 1}, thresholds={},
+        )
+
+    def test_activation_rescores_open_events_in_chunks(self):
+        response = self.client.post(f'/api/risk-models/{self.model.id}/activate/')
+        job = response.json()['rescore_job']
+        self.assertEqual((job['status'], job['total'], job['progress']), ('pending', 9, 0.0))
+
+        # The first run dies after two chunks; a resumed run picks up at the cursor
+        from . import rescore
+        real_run_chunk = rescore._run_chunk
+        calls = []
+
+        def crash_on_third(*args):
+            calls.append(1)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return real_run_chunk(*args)
+
+        with mock.patch.object(rescore, '_run_chunk', crash_on_third):
+            with self.assertRaises(KeyboardInterrupt):
+                run_job(job['id'], chunk_size=4)
+        partial = RescoreJob.objects.get(pk=job['id'])
+        self.assertEqual((partial.status, partial.processed), ('running', 8))
+
+        self.assertNotIn(partial, resumable_jobs())
+        RescoreJob.objects.filter(pk=partial.pk).update(updated_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(run_job(job['id'], chunk_size=4).status, 'completed')
+
+        scores = dict(DisasterEvent.objects.values_list('location_name', 'risk_score'))
+        self.assertEqual(scores['Gauge 5'], 50.0)
+        self.assertEqual(scores['Gauge 8'], 80.0)
+        # Resolved events keep their score
+        self.assertEqual(scores['Gauge 9'], 50)
+        progress = self.client.get(f'/api/risk-models/{self.model.id}/rescore/').json()
+        self.assertEqual((progress['processed'], progress['progress']), (9, 100.0))
+
+    def test_newer_activation_supersedes_running_job(self):
+        first = self.client.post(f'/api/risk-models/{self.model.id}/activate/').json()['rescore_job']
+        newer = RiskModel.objects.create(name='Rain v3', disaster_type='flood', version='3', parameters={},
+                                         weights={'rainfall_mm': 2}, thresholds={})
+        self.client.post(f'/api/risk-models/{newer.id}/activate/')
+        self.assertEqual(RescoreJob.objects.get(pk=first['id']).status, 'superseded')
+        self.assertIsNone(run_job(first['id']))
+
+
+class ShadowScoringTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        RiskModel.objects.create(name='Live', disaster_type='flood', version='1', is_active=True, parameters={},
+                                 weights={'rainfall_mm': 1}, thresholds={})
+        self.candidate = RiskModel.objects.create(
+            name='Candidate', disaster_type='flood', version='2', is_shadow=True, thresholds={},
+            weights={'rainfall_mm': 1}, parameters={'ranges': {'rainfall_mm': [0, 250]}},
+        )
+
+    def test_candidates_are_scored_off_the_ingest_path(self):
+        from core.data_sync import DataSyncManager
+        from core.models import DataSource
+
+        source = DataSource.objects.create(name='Gauges', source_type='csv', file_path='gauges.csv')
+        records = [{'type': 'flood', 'location': f'Gauge {i}', 'rainfall': str(i * 100)} for i in range(6)]
+        with mock.patch.object(shadow_queue, '_ensure_worker'):
+            with self.captureOnCommitCallbacks(execute=True):
+                DataSyncManager._process_disaster_records(records, source)
+            # Ingest only queued the ids
+            self.assertEqual((len(shadow_queue), ShadowScore.objects.count()), (6, 0))
+            self.assertEqual(shadow_queue.drain(), 6)
+
+        scores = dict(ShadowScore.objects.values_list('event__location_name', 'shadow_score'))
+        self.assertEqual((scores['Gauge 1'], scores['Gauge 2'], scores['Gauge 5']), (40.0, 80.0, 100.0))
+        live = DisasterEvent.objects.get(location_name='Gauge 1').risk_score
+        self.assertEqual(live, 20.0)
+
+        user = get_user_model().objects.create_user(username='analyst', password='testpass123', role='analyst')
+        client = APIClient()
+        client.force_authenticate(user)
+        summary = client.get(f'/api/risk-models/{self.candidate.id}/shadow/').json()
+        self.assertEqual(summary['events'], 6)
+        # Live 0/20/40/60/80/100 vs candidate 0/40/80/100/100/100
+        self.assertEqual(summary['delta']['mean'], 20.0)
+        self.assertEqual(summary['agreement']['within_tolerance'], round(2 / 6, 4))
+        self.assertGreater(summary['distribution']['psi'], 0.25)
+        self.assertEqual(client.get(f'/api/risk-models/{self.candidate.id}/shadow/', {'days': 'x'}).status_code, 400)
+
+    def test_same_band_with_thresholds_without_a_zero_floor(self):
+        from .shadow import summarize
+
+        for i, (live, shadow) in enumerate([(10, 30), (30, 50), (65, 75), (90, 95)]):
+            event = DisasterEvent.objects.create(disaster_type='flood', location_name=f'Gauge {i}', risk_score=live,
+                                                 confidence_level=50, predicted_time=timezone.now())
+            ShadowScore.objects.create(risk_model=self.candidate, event=event, live_score=live, shadow_score=shadow)
+
+        for thresholds, same in [({'high': 70}, 3), ({'medium': 40, 'high': 70}, 2),
+                                 ({'low': 0, 'medium': 40, 'high': 70}, 2)]:
+            self.candidate.thresholds = thresholds
+            self.assertEqual(summarize(self.candidate)['agreement']['same_band'], round(same / 4, 4))
+
+
+class BacktestTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Magnitude 4..8.5: from 7 up the quakes were deadly, below that one was costly
+        history = [(4.0, 0, 0), (5.0, 0, 0), (5.5, 0, 20_000_000), (6.0, 2, 0),
+                   (7.0, 40, 0), (7.5, 120, 0), (8.5, 900, 0), (None, 500, 0)]
+        HistoricalDisaster.objects.bulk_create([
+            HistoricalDisaster(disaster_type='earthquake', location_name=f'Site {i}', latitude=0, longitude=0,
+                               occurrence_date='2000-01-01', magnitude=magnitude, casualties=casualties,
+                               damage_usd=damage)
+            for i, (magnitude, casualties, damage) in enumerate(history)
+        ])
+        self.good = RiskModel.objects.create(name='Magnitude', disaster_type='earthquake', version='1',
+                                             weights={'magnitude': 1}, parameters={}, thresholds={'high': 65})
+        self.blind = RiskModel.objects.create(name='Rain', disaster_type='earthquake', version='2',
+                                              weights={'rainfall_mm': 1}, parameters={}, thresholds={})
+
+    def test_roc_auc(self):
+        self.assertEqual(roc_auc(np.array([1, 2, 3, 4.0]), np.array([False, False, True, True])), 1.0)
+        self.assertEqual(roc_auc(np.array([1, 1, 1, 1.0]), np.array([False, True, False, True])), 0.5)
+        self.assertIsNone(roc_auc(np.array([1, 2.0]), np.array([True, True])))
+
+    def test_backtest_in_parallel_writes_accuracy(self):
+        good, blind = backtest(RiskModel.objects.order_by('version'), workers=2)
+        # The record without a magnitude is not scored; 4 severe of 7
+        self.assertEqual((good['scored'], good['severe']), (7, 4))
+        # Only the costly 5.5 is outscored by a mild record (6.0): 11 of 12 pairs ordered
+        self.assertEqual(good['auc'], round(11 / 12, 4))
+        self.assertEqual((good['accuracy'], good['precision'], good['recall']), (round(6 / 7, 4), 1.0, 0.75))
+        self.assertEqual((blind['scored'], blind['auc']), (0, None))
+
+        self.good.refresh_from_db()
+        self.blind.refresh_from_db()
+        self.assertEqual((self.good.accuracy_score, self.blind.accuracy_score), (round(11 / 12, 4), None))
+
+    def test_overlapping_inline_backtests(self):
+        from . import backtest as module
+
+        evaluate = module.evaluate
+        overlapped = []
+
+        def evaluate_with_another_run(*args):
+            # Another request's backtest starts and finishes in the middle of this one
+            if not overlapped:
+                overlapped.append(None)
+                overlapped[0] = backtest([self.blind], save=False)
+            return evaluate(*args)
+
+        with mock.patch.object(module, 'evaluate', side_effect=evaluate_with_another_run):
+            good, blind = backtest(RiskModel.objects.order_by('version'), save=False)
+        self.assertEqual((good['auc'], blind['auc']), (round(11 / 12, 4), None))
+        self.assertEqual(overlapped[0][0]['scored'], 0)
+
+    def test_backtest_action(self):
+        user = get_user_model().objects.create_user(username='modeller', password='testpass123', role='admin')
+        client = APIClient()
+        client.force_authenticate(user)
+        metrics = client.post(f'/api/risk-models/{self.good.id}/backtest/?dry_run=true').json()
+        self.assertEqual(metrics['auc'], round(11 / 12, 4))
+        self.good.refresh_from_db()
+        self.assertIsNone(self.good.accuracy_score)
+
+
+class HistoryIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        history_indexes.clear()
+        # Along the equator, roughly 111 km per degree; one quake across the antimeridian
+        sites = [('flood', 0, 1), ('flood', 0, 2), ('earthquake', 0, 3), ('flood', 0, 10), ('earthquake', 0, -179.5)]
+        HistoricalDisaster.objects.bulk_create([
+            HistoricalDisaster(disaster_type=disaster_type, location_name=f'Site {lon}', latitude=lat, longitude=lon,
+                               occurrence_date='2000-01-01', casualties=0, damage_usd=0)
+            for disaster_type, lat, lon in sites
+        ])
+
+    def test_nearest_with_type_and_radius(self):
+        names = lambda nearest: [HistoricalDisaster.objects.get(pk=pk).location_name for pk, _ in nearest]
+        self.assertEqual(names(nearest_history(0, 0, k=3)), ['Site 1', 'Site 2', 'Site 3'])
+        self.assertEqual(names(nearest_history(0, 0, k=3, disaster_type='flood')), ['Site 1', 'Site 2', 'Site 10'])
+        self.assertEqual(names(nearest_history(0, 0, k=10, radius_km=250)), ['Site 1', 'Site 2'])
+        self.assertEqual(names(nearest_history(0, 179.5, k=1)), ['Site -179.5'])
+        (_, km), = nearest_history(0, 0, k=1)
+        self.assertAlmostEqual(km, geo.haversine_km(0, 0, 0, 1), places=6)
+
+    def test_kd_tree_matches_brute_force(self):
+        rng = np.random.default_rng(3)
+        lat, lon = rng.uniform(-90, 90, 2000), rng.uniform(-180, 180, 2000)
+        points = unit_vectors(lat, lon)
+        tree = KDTree(points, leaf_size=8)
+        for x in unit_vectors(rng.uniform(-90, 90, 20), rng.uniform(-180, 180, 20)):
+            distances, indices = tree.query(x, 7)
+            brute = np.sqrt(((points - x) ** 2).sum(axis=1))
+            np.testing.assert_allclose(distances, np.sort(brute)[:7])
+            np.testing.assert_allclose(brute[indices], distances)
+
+    def test_rebuilds_after_change(self):
+        nearest_history(0, 0, k=1)
+        HistoricalDisaster.objects.create(disaster_type='flood', location_name='Site 0.5', latitude=0, longitude=0.5,
+                                          occurrence_date='2000-01-01', casualties=0, damage_usd=0)
+        # Rebuild inline instead of in a thread, which would not see this test's transaction
+        with mock.patch.object(history_indexes, '_refresh', side_effect=history_indexes._rebuild) as refresh:
+            # The query that notices the change is still answered from the old index
+            stale = nearest_history(0, 0, k=1)[0][0]
+            fresh = nearest_history(0, 0, k=1)[0][0]
+        refresh.assert_called_once()
+        self.assertEqual(HistoricalDisaster.objects.get(pk=stale).location_name, 'Site 1')
+        self.assertEqual(HistoricalDisaster.objects.get(pk=fresh).location_name, 'Site 0.5')
+
+    def test_rebuilds_after_changes_from_other_workers(self):
+        nearest = lambda: HistoricalDisaster.objects.get(pk=nearest_history(0, 0, k=1)[0][0]).location_name
+        self.assertEqual(nearest(), 'Site 1')
+        # Within STAMP_TTL lookups stay in memory
+        with self.assertNumQueries(0):
+            nearest_history(0, 0, k=1)
+
+        # No local signal: the stamp is read from the database once it expires
+        later = time.monotonic() + STAMP_TTL
+        with mock.patch.object(history_indexes, '_refresh', side_effect=history_indexes._rebuild), \
+                mock.patch('disasters.history_index.time.monotonic', return_value=later):
+            HistoricalDisaster.objects.filter(location_name='Site 2').update(longitude=0.2, updated_at=timezone.now())
+            nearest()
+            self.assertEqual(nearest(), 'Site 2')
+        with mock.patch.object(history_indexes, '_refresh', side_effect=history_indexes._rebuild):
+            # This process's own delete is noticed right away
+            HistoricalDisaster.objects.filter(location_name='Site 2').delete()
+            nearest_history(0, 0, k=1)
+            self.assertEqual(nearest(), 'Site 1')
+
+    def test_nearby_history_action(self):
+        user = get_user_model().objects.create_user(username='viewer', password='testpass123', role='public')
+        client = APIClient()
+        client.force_authenticate(user)
+        event = DisasterEvent.objects.create(disaster_type='flood', location_name='Test Plain', latitude=0,
+                                             longitude=0, risk_score=40, confidence_level=60,
+                                             predicted_time=timezone.now())
+
+        data = client.get(f'/api/disasters/{event.id}/nearby_history/?k=2&type=earthquake').json()
+        self.assertEqual([row['location_name'] for row in data['results']], ['Site 3', 'Site -179.5'])
+        self.assertAlmostEqual(data['results'][0]['distance_km'], geo.haversine_km(0, 0, 0, 3), places=2)
+        self.assertEqual(client.get(f'/api/disasters/{event.id}/nearby_history/?radius_km=-1').status_code, 400)
+        self.assertEqual(client.get(f'/api/disasters/{event.id}/nearby_history/?k=x').status_code, 400)
+
+
+class AnalogueTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        analogue_indexes.clear()
+        sites = [
+            # name, magnitude, date, lat, lon, casualties
+            ('Big winter quake', 8.0, '1990-12-30', 35, 139, 500),
+            ('Small winter quake', 4.0, '1995-01-05', 35, 139, 0),
+            ('Big summer quake', 8.0, '2000-06-30', 35, 139, 300),
+            ('Big distant quake', 8.0, '2005-01-02', -35, -70, 100),
+            ('Unknown quake', None, '2010-01-01', 35, 139, 0),
+        ]
+        HistoricalDisaster.objects.bulk_create([
+            HistoricalDisaster(disaster_type='earthquake', location_name=name, latitude=lat, longitude=lon,
+                               occurrence_date=occurred, magnitude=magnitude, casualties=casualties,
+                               damage_usd=casualties * 1000)
+            for name, magnitude, occurred, lat, lon, casualties in sites
+        ])
+        HistoricalDisaster.objects.create(disaster_type='flood', location_name='Flood', latitude=35, longitude=139,
+                                          occurrence_date='2000-01-01', casualties=0, damage_usd=0)
+
+    def names(self, analogues):
+        return [HistoricalDisaster.objects.get(pk=a['id']).location_name for a in analogues]
+
+    def test_ranks_by_weighted_features(self):
+        january = timezone.datetime(2024, 1, 3)
+        analogues = find_analogues('earthquake', magnitude=8.0, when=january, latitude=35, longitude=139, k=6)
+        self.assertEqual(self.names(analogues)[0], 'Big winter quake')
+        self.assertEqual(len(analogues), 5)
+        self.assertLess(analogues[0]['distance'], 0.1)
+        self.assertEqual(analogues[0]['casualties'], 500)
+
+        # Only season: late December is next to early January, June is opposite
+        season_only = find_analogues('earthquake', when=january, k=5,
+                                     weights={'magnitude': 0, 'location': 0, 'season': 1})
+        self.assertEqual(self.names(season_only)[-1], 'Big summer quake')
+        # Only magnitude, and the query's unknown location is left out
+        magnitude_only = find_analogues('earthquake', magnitude=4.2, k=1, weights={'season': 0})
+        self.assertEqual(self.names(magnitude_only), ['Small winter quake'])
+
+    def test_rebuilds_after_changes_from_other_workers(self):
+        self.assertEqual(self.names(find_analogues('earthquake', magnitude=4.0, k=1)), ['Small winter quake'])
+        later = time.monotonic() + STAMP_TTL
+        with mock.patch.object(analogue_indexes, '_refresh', side_effect=analogue_indexes._rebuild), \
+                mock.patch('disasters.history_index.time.monotonic', return_value=later):
+            HistoricalDisaster.objects.filter(location_name='Big summer quake').update(
+                magnitude=4.0, updated_at=timezone.now()
+            )
+            find_analogues('earthquake', magnitude=4.0, k=1)
+            best = find_analogues('earthquake', magnitude=4.0, k=2, weights={'season': 0, 'location': 0})
+        self.assertEqual(set(self.names(best)), {'Small winter quake', 'Big summer quake'})
+
+    def test_parse_weights(self):
+        self.assertEqual(parse_weights('magnitude:2, season:0'), {'magnitude': 2.0, 'season': 0.0, 'location': 1.0})
+        for value in ('depth:1', 'magnitude', 'location:-1', 'season:nan'):
+            with self.assertRaises(ValueError):
+                parse_weights(value)
+
+    def test_analogues_action(self):
+        user = get_user_model().objects.create_user(username='viewer', password='testpass123', role='public')
+        client = APIClient()
+        client.force_authenticate(user)
+        event = DisasterEvent.objects.create(disaster_type='earthquake', location_name='Test Fault', latitude=35,
+                                             longitude=139, magnitude=8.0, risk_score=80, confidence_level=60,
+                                             predicted_time=timezone.make_aware(timezone.datetime(2024, 1, 3)))
+
+        data = client.get(f'/api/disasters/{event.id}/analogues/?k=2').json()
+        # The unknown magnitude counts as the average one, closer than a quake across the globe
+        self.assertEqual([row['location_name'] for row in data['results']], ['Big winter quake', 'Unknown quake'])
+        self.assertEqual(data['estimate']['casualties']['median'], 250.0)
+        self.assertEqual(data['results'][0]['casualties'], 500)
+        self.assertEqual(client.get(f'/api/disasters/{event.id}/analogues/?weights=depth:1').status_code, 400)
@@ -0,0 +1,160 @@
+"""
+Zoom-aware map tiles for disaster events
+
+Tiles use the slippy-map z/x/y scheme. Below CLUSTER_MAX_ZOOM a tile holds
+clusters made by grouping events on a geohash prefix in SQL, with cells about
+1/8 of the tile wide; from CLUSTER_MAX_ZOOM on it holds individual events.
+
+Tile bodies are cached per tile under a version counter. Saving or deleting
+an event bumps the counters of the tiles containing its old and new position
+at every zoom level (see disasters.signals), so only those tiles are rebuilt.
+"""
+import hashlib
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Substr
+
+from core.response_cache import bump_version, get_version
+
+from . import geo
+
+MAX_ZOOM = 18
+CLUSTER_MAX_ZOOM = 12
+CELLS_PER_TILE = 8
+MAX_TILE_EVENTS = 5000
+CACHE_TTL = 3600
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a Web Mercator tile"""
+    n = 1 << z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def tile_for(lat: float, lon: float, z: int) -> Tuple[int, int]:
+    """(x, y) of the tile containing a point at zoom ``z``"""
+    n = 1 << z
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    x = min(int((lon + 180.0) / 360.0 * n), n - 1)
+    lat_rad = math.radians(lat)
+    y = min(int((1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * n), n - 1)
+    return x, y
+
+
+def cluster_precision(z: int) -> int:
+    """Finest geohash precision whose cells are at most 1/CELLS_PER_TILE of a tile"""
+    target = 360.0 / (1 << z) / CELLS_PER_TILE
+    for precision in range(1, geo.PRECISION + 1):
+        if geo.cell_size(precision)[1] <= target:
+            return precision
+    return geo.PRECISION
+
+
+def _namespace(z: int, x: int, y: int) -> str:
+    return f'disasters:tile:{z}:{x}:{y}'
+
+
+def invalidate_points(points: Iterable[Tuple[Optional[float], Optional[float]]]) -> None:
+    """Bump the version of every tile, at every zoom, containing one of the points"""
+    namespaces = set()
+    for lat, lon in points:
+        if lat is None or lon is None:
+            continue
+        for z in range(MAX_ZOOM + 1):
+            namespaces.add(_namespace(z, *tile_for(lat, lon, z)))
+    bump_version(*namespaces)
+
+
+def _clusters(queryset, z: int) -> List[Dict[str, Any]]:
+    precision = cluster_precision(z)
+    rows = (
+        queryset.order_by()
+        .annotate(cell=Substr('geohash', 1, precision))
+        .values('cell', 'disaster_type')
+        .annotate(count=Count('id'), max_risk=Max('risk_score'),
+                  lat_sum=Sum('latitude'), lon_sum=Sum('longitude'))
+    )
+
+    cells: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        cell = cells.setdefault(row['cell'], {
+            'count': 0, 'max_risk': row['max_risk'], 'lat_sum': 0.0, 'lon_sum': 0.0, 'types': {},
+        })
+        cell['count'] += row['count']
+        cell['max_risk'] = max(cell['max_risk'], row['max_risk'])
+        cell['lat_sum'] += row['lat_sum']
+        cell['lon_sum'] += row['lon_sum']
+        cell['types'][row['disaster_type']] = row['count']
+
+    clusters = []
+    for key, cell in sorted(cells.items()):
+        # Ties go to the alphabetically first type so tiles are deterministic
+        dominant = min(cell['types'], key=lambda t: (-cell['types'][t], t))
+        clusters.append({
+            'cell': key,
+            'lat': round(cell['lat_sum'] / cell['count'], 5),
+            'lon': round(cell['lon_sum'] / cell['count'], 5),
+            'count': cell['count'],
+            'max_risk': cell['max_risk'],
+            'dominant_type': dominant,
+        })
+    return clusters
+
+
+def _events(queryset) -> Tuple[List[Dict[str, Any]], bool]:
+    rows = list(
+        queryset.order_by('-risk_score', 'id')
+        .values('id', 'latitude', 'longitude', 'risk_score', 'disaster_type', 'status', 'location_name')
+        [:MAX_TILE_EVENTS + 1]
+    )
+    truncated = len(rows) > MAX_TILE_EVENTS
+    events = [{
+        'id': str(row['id']),
+        'lat': row['latitude'],
+        'lon': row['longitude'],
+        'risk_score': row['risk_score'],
+        'disaster_type': row['disaster_type'],
+        'status': row['status'],
+        'location_name': row['location_name'],
+    } for row in rows[:MAX_TILE_EVENTS]]
+    return events, truncated
+
+
+def build_tile(queryset, z: int, x: int, y: int) -> Dict[str, Any]:
+    south, west, north, east = tile_bounds(z, x, y)
+    tile = {'z': z, 'x': x, 'y': y, 'bounds': [west, south, east, north]}
+
+    # Edge tiles also take the polar caps Mercator cannot show, as tile_for does
+    last = (1 << z) - 1
+    queryset = geo.within_bbox(queryset, -90.0 if y == last else south, west, 90.0 if y == 0 else north, east)
+    # Tiles are half-open on their east and south edges so no point is in two
+    if x < last:
+        queryset = queryset.exclude(longitude=east)
+    if y < last:
+        queryset = queryset.exclude(latitude=south)
+
+    if z < CLUSTER_MAX_ZOOM:
+        tile['kind'] = 'clusters'
+        tile['clusters'] = _clusters(queryset, z)
+    else:
+        tile['kind'] = 'events'
+        tile['events'], tile['truncated'] = _events(queryset)
+    return tile
+
+
+def get_tile(queryset, z: int, x: int, y: int, query_string: str = '') -> Dict[str, Any]:
+    """Cached tile body; ``query_string`` (filters) is part of the cache key"""
+    digest = hashlib.sha1(query_string.encode('utf-8')).hexdigest()[:16]
+    key = f'disasters:tile:{z}:{x}:{y}:v{get_version(_namespace(z, x, y))}:{digest}'
+    tile = cache.get(key)
+    if tile is None:
+        tile = build_tile(queryset, z, x, y)
+        cache.set(key, tile, CACHE_TTL)
+    return tile
@@ -1,20 +1,57 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import FilterSet, CharFilter, NumberFilter
-from .models import DisasterEvent, DisasterData, RiskModel, HistoricalDisaster
-from .serializers import DisasterEventSerializer, DisasterDataSerializer, RiskModelSerializer, HistoricalDisasterSerializer
+from .models import DisasterEvent, DisasterData, DisasterDataChunk, RiskModel, HistoricalDisaster
+from .serializers import DisasterEventSerializer, DisasterDataSerializer, DisasterDataIngestSerializer, RiskModelSerializer, RescoreJobSerializer, HistoricalDisasterSerializer
+from .rollups import apply_readings, rebuild_buckets, query_series, summarize_event, percentiles, stored_count
+from .packed import is_packed_mode, PackedReadingSequence
+from .analogues import find_analogues, impact_estimate, parse_weights
+from .backtest import backtest as run_backtest
+from .history_index import nearest_history
+from .rescore import start_rescore
+from .shadow import shadow_queue, summarize as summarize_shadow
+from . import geo
+from . import bulk, map_feed, tiles
+from .signals import EVENTS_CACHE
 from core.models import AuditLog
+from core.permissions import IsAdminOrResponder
+from core.lean import LeanListMixin
+from core.pagination import KeysetPagination
+from core.fieldsets import SparseFieldsMixin
+from core.change_feed import ChangeFeedMixin
+from core.conditional import ConditionalGetMixin, not_modified, queryset_etag
+from core.response_cache import cached_response
+from core.search import FullTextSearchFilter
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
 
+def _query_datetime(request, name):
+    """Parse an ISO datetime query parameter, assuming UTC when naive"""
+    try:
+        value = parse_datetime(request.query_params.get(name, ''))
+    except ValueError:
+        value = None
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
 class DisasterEventFilterSet(FilterSet):
     """
     Custom FilterSet for DisasterEvent to support range filtering
@@ -23,10 +60,42 @@ class DisasterEventFilterSet(FilterSet):
     status = CharFilter(field_name='status', lookup_expr='iexact')
     risk_score_min = NumberFilter(field_name='risk_score', lookup_expr='gte')
     risk_score_max = NumberFilter(field_name='risk_score', lookup_expr='lte')
+    # bbox=west,south,east,north (Leaflet's toBBoxString order)
+    bbox = CharFilter(method='filter_bbox')
+    # near=lat,lon with radius_km (default 50)
+    near = CharFilter(method='filter_near')
+    radius_km = NumberFilter(method='filter_radius')
     
     class Meta:
         model = DisasterEvent
-        fields = ['disaster_type', 'status', 'risk_score_min', 'risk_score_max']
+        fields = ['disaster_type', 'status', 'risk_score_min', 'risk_score_max', 'bbox', 'near', 'radius_km']
+    
+    @staticmethod
+    def _floats(value, count, name):
+        try:
+            numbers = [float(part) for part in value.split(',')]
+        except ValueError:
+            numbers = []
+        if len(numbers) != count:
+            raise ValidationError({name: f'Expected {count} comma-separated numbers'})
+        return numbers
+    
+    def filter_bbox(self, queryset, name, value):
+        west, south, east, north = self._floats(value, 4, name)
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise ValidationError({name: 'Invalid bounding box'})
+        return geo.within_bbox(queryset, south, west, north, east)
+    
+    def filter_near(self, queryset, name, value):
+        lat, lon = self._floats(value, 2, name)
+        radius_km = self.form.cleaned_data.get('radius_km') or 50
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius_km <= 0:
+            raise ValidationError({name: 'Invalid point or radius'})
+        return geo.within_radius(queryset, lat, lon, float(radius_km))
+    
+    def filter_radius(self, queryset, name, value):
+        # Consumed by filter_near
+        return queryset
 
 @login_required
 def disasters_map_view(request):
@@ -49,28 +118,66 @@ def disaster_details_view(request, disaster_id):
         return render(request, 'errors/404.html', status=404)
 
 
-class DisasterEventViewSet(viewsets.ModelViewSet):
+class DisasterEventViewSet(SparseFieldsMixin, ChangeFeedMixin, ConditionalGetMixin, LeanListMixin, viewsets.ModelViewSet):
     queryset = DisasterEvent.objects.all()
     serializer_class = DisasterEventSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_class = DisasterEventFilterSet
+    pagination_class = KeysetPagination
     search_fields = ['location_name']
     ordering_fields = ['predicted_time', 'risk_score']
     ordering = ['-predicted_time']
     
+    def _paginated(self, queryset):
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def active_events(self, request):
-        events = DisasterEvent.objects.filter(status__in=['predicted', 'active'])
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        return cached_response(request, EVENTS_CACHE, lambda: self._paginated(
+            DisasterEvent.objects.filter(status__in=['predicted', 'active'])
+        ))
     
     @action(detail=False, methods=['get'])
     def high_risk(self, request):
-        threshold = float(request.query_params.get('threshold', 70))
-        events = DisasterEvent.objects.filter(risk_score__gte=threshold)
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        try:
+            threshold = float(request.query_params.get('threshold', 70))
+        except ValueError:
+            return Response({'error': 'threshold must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return cached_response(request, EVENTS_CACHE, lambda: self._paginated(
+            DisasterEvent.objects.filter(risk_score__gte=threshold)
+        ))
+    
+    @action(detail=False, methods=['get'])
+    def map_feed(self, request):
+        """All filtered events as parallel arrays for map markers"""
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = map_feed.feed_etag(queryset, request.GET.urlencode())
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            raw, compressed = map_feed.get_feed(queryset, etag)
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(compressed, content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(raw, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+    
+    @action(detail=False, methods=['get'], url_path=r'tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)')
+    def tiles(self, request, z=None, x=None, y=None):
+        """Clusters (low zoom) or events (high zoom) within one map tile"""
+        z, x, y = int(z), int(x), int(y)
+        if z > tiles.MAX_ZOOM or x >= 1 << z or y >= 1 << z:
+            return Response({'error': 'Tile out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(tiles.get_tile(queryset, z, x, y, request.GET.urlencode()))
     
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
@@ -96,30 +203,289 @@ class DisasterEventViewSet(viewsets.ModelViewSet):
         
         return Response({'status': 'updated'})
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrResponder])
+    def bulk_update_status(self, request):
+        """
+        Set the status of many events at once (admins and responders)
+        
+        Body: {"status": "resolved", "ids": [...]} or {"status": ..., "filter":
+        {...}} with the list endpoint's filter parameters. Returns an outcome
+        per id: updated, unchanged or not_found.
+        """
+        new_status = request.data.get('status')
+        if new_status not in dict(DisasterEvent.STATUS_CHOICES):
+            return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ids = request.data.get('ids')
+        filters = request.data.get('filter')
+        if (ids is None) == (filters is None):
+            return Response({'error': 'Provide either ids or filter'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        outcomes = {}
+        if ids is not None:
+            if not isinstance(ids, list):
+                return Response({'error': 'ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            valid_ids = []
+            for value in ids:
+                try:
+                    valid_ids.append(uuid.UUID(str(value)))
+                except ValueError:
+                    outcomes[str(value)] = 'not_found'
+            queryset = DisasterEvent.objects.filter(id__in=valid_ids)
+            outcomes.update((str(event_id), 'not_found') for event_id in valid_ids)
+        else:
+            if not isinstance(filters, dict) or not filters:
+                return Response({'error': 'filter must be a non-empty object'}, status=status.HTTP_400_BAD_REQUEST)
+            # django-filter ignores unknown keys, so a typo would select every event
+            unknown = sorted(set(filters) - set(DisasterEventFilterSet.base_filters))
+            if unknown:
+                return Response({'error': f'Unknown filter keys: {", ".join(unknown)}'}, status=status.HTTP_400_BAD_REQUEST)
+            filterset = DisasterEventFilterSet(data=filters, queryset=DisasterEvent.objects.all(), request=request)
+            if not filterset.is_valid():
+                return Response({'error': filterset.errors}, status=status.HTTP_400_BAD_REQUEST)
+            # radius_km only narrows near=, and empty values filter nothing
+            applied = [name for name, value in filterset.form.cleaned_data.items()
+                       if name != 'radius_km' and value not in (None, '')]
+            if not applied:
+                return Response({'error': 'filter must restrict the events selected'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = filterset.qs
+        
+        if queryset.count() > bulk.MAX_EVENTS:
+            return Response(
+                {'error': f'At most {bulk.MAX_EVENTS} events can be changed per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        outcomes.update(bulk.apply_status(queryset, new_status, request.user))
+        updated = sum(1 for outcome in outcomes.values() if outcome == 'updated')
+        logger.info(f"Bulk status update to {new_status}: {updated} of {len(outcomes)} events changed")
+        return Response({'status': new_status, 'updated': updated, 'results': outcomes})
+    
     @action(detail=True, methods=['get'])
     def analytics(self, request, pk=None):
+        """
+        Reading statistics per data_type, with optional time buckets
+        
+        ?percentiles=50,90,99 adds exact percentiles (index walks over the raw
+        readings, so opt-in); ?bucket=hour|day adds a series from the rollups
+        over ?start=/?end= (default: last 7 days hourly, 90 days daily).
+        """
         disaster = self.get_object()
-        data_points = DisasterData.objects.filter(event=disaster).order_by('timestamp')
         
+        try:
+            points = [float(p) for p in request.query_params.get('percentiles', '').split(',') if p]
+        except ValueError:
+            points = None
+        if points is None or any(not 0 <= p <= 100 for p in points):
+            return Response({'error': 'percentiles must be numbers between 0 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+        bucket = request.query_params.get('bucket')
+        if bucket not in (None, 'hour', 'day'):
+            return Response({'error': 'bucket must be hour or day'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Every reading write is counted (signals or bump_changes); a default
+        # window slides with the clock, so its current bucket is part of the tag
+        window = None
+        if bucket and not request.query_params.get('end'):
+            window = timezone.now().replace(minute=0, second=0, microsecond=0)
+            if bucket == 'day':
+                window = window.replace(hour=0)
+        etag = queryset_etag(request, DisasterData.objects.filter(event=disaster), ('timestamp',), window)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        
+        by_type = summarize_event(disaster.id)
+        if points:
+            for data_type, stats in by_type.items():
+                stats['percentiles'] = percentiles(disaster.id, data_type, points)
+                # Fewer than count once older readings were pruned to the rollups
+                stats['percentile_readings'] = stored_count(disaster.id, data_type)
+        
+        total = sum(stats['count'] for stats in by_type.values())
         analytics = {
-            'total_data_points': data_points.count(),
-            'avg_value': sum(d.value for d in data_points) / max(data_points.count(), 1),
-            'data_types': list(set(d.data_type for d in data_points)),
+            'total_data_points': total,
+            'avg_value': sum(stats['sum'] or 0 for stats in by_type.values()) / max(total, 1),
+            'data_types': list(by_type),
+            'by_type': by_type,
         }
         
-        return Response(analytics)
-
+        if bucket:
+            end = _query_datetime(request, 'end') or timezone.now()
+            start = _query_datetime(request, 'start') or end - timedelta(days=7 if bucket == 'hour' else 90)
+            analytics['series'] = query_series(
+                disaster.id, start, end,
+                data_type=request.query_params.get('data_type'),
+                resolution='1h' if bucket == 'hour' else '1d',
+            )
+        
+        response = Response(analytics)
+        response['ETag'] = etag
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def series(self, request, pk=None):
+        """Bucketed readings from the rollup tables, sized to a point budget"""
+        disaster = self.get_object()
+        
+        end = _query_datetime(request, 'end') or timezone.now()
+        start = _query_datetime(request, 'start') or end - timedelta(hours=24)
+        try:
+            max_points = max(1, min(int(request.query_params.get('points', 500)), 10000))
+        except ValueError:
+            return Response({'error': 'points must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(query_series(
+            disaster.id, start, end, max_points=max_points,
+            data_type=request.query_params.get('data_type'),
+        ))
+    
+    @action(detail=True, methods=['get'])
+    def nearby_history(self, request, pk=None):
+        """
+        Nearest historical disasters to the event, closest first
+        
+        ?k= (default 10, at most 100), optional ?radius_km= limit and
+        ?type= of the historical disasters (any type by default).
+        """
+        disaster = self.get_object()
+        
+        if disaster.latitude is None or disaster.longitude is None:
+            return Response({'error': 'Event has no location'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = max(1, min(int(request.query_params.get('k', 10)), 100))
+            radius_km = request.query_params.get('radius_km')
+            radius_km = float(radius_km) if radius_km else None
+        except ValueError:
+            return Response({'error': 'k must be an integer and radius_km a number'}, status=status.HTTP_400_BAD_REQUEST)
+        if radius_km is not None and not radius_km > 0:
+            return Response({'error': 'radius_km must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        nearest = nearest_history(
+            disaster.latitude, disaster.longitude, k=k, radius_km=radius_km,
+            disaster_type=request.query_params.get('type'),
+        )
+        # Rows deleted since the index was built are skipped
+        rows = HistoricalDisaster.objects.in_bulk([pk for pk, _ in nearest])
+        results = [
+            {**HistoricalDisasterSerializer(rows[pk]).data, 'distance_km': round(km, 3)}
+            for pk, km in nearest if pk in rows
+        ]
+        return Response({'count': len(results), 'results': results})
+        
+    
+    @action(detail=True, methods=['get'])
+    def analogues(self, request, pk=None):
+        """
+        Most similar historical disasters of the event's type, with an impact estimate
+        
+        Similarity weighs magnitude, season and location; ?weights= overrides
+        some of them (e.g. magnitude:2,season:0), ?k= defaults to 10 (at most 100).
+        """
+        disaster = self.get_object()
+        
+        try:
+            k = max(1, min(int(request.query_params.get('k', 10)), 100))
+            weights = parse_weights(request.query_params.get('weights', ''))
+        except ValueError as e:
+            return Response({'error': f'Invalid k or weights: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        analogues = find_analogues(
+            disaster.disaster_type, magnitude=disaster.magnitude, when=disaster.predicted_time,
+            latitude=disaster.latitude, longitude=disaster.longitude, k=k, weights=weights,
+        )
+        rows = HistoricalDisaster.objects.in_bulk([analogue['id'] for analogue in analogues])
+        analogues = [analogue for analogue in analogues if analogue['id'] in rows]
+        results = [
+            {**HistoricalDisasterSerializer(rows[analogue['id']]).data, 'distance': round(analogue['distance'], 4)}
+            for analogue in analogues
+        ]
+        return Response({
+            'count': len(results),
+            'weights': weights,
+            'estimate': impact_estimate(analogues),
+            'results': results,
+        })
 
-class DisasterDataViewSet(viewsets.ModelViewSet):
+class DisasterDataViewSet(SparseFieldsMixin, ConditionalGetMixin, LeanListMixin, viewsets.ModelViewSet):
     queryset = DisasterData.objects.all()
     serializer_class = DisasterDataSerializer
     permission_classes = [IsAuthenticated]
     filterset_fields = ['event', 'data_type', 'source']
+    pagination_class = KeysetPagination
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    conditional_fields = ('timestamp',)
+    last_modified_field = None
+    
+    def list(self, request, *args, **kwargs):
+        if not is_packed_mode():
+            return super().list(request, *args, **kwargs)
+        
+        # Packed mode: un-packed rows first, then readings decoded from chunks
+        if request.query_params.get('ordering'):
+            return Response(
+                {'error': 'ordering is not supported while readings are stored in packed chunks'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = self.filter_queryset(self.get_queryset())
+        chunks = DisasterDataChunk.objects.all()
+        for param in ['event', 'data_type', 'source']:
+            if request.query_params.get(param):
+                chunks = chunks.filter(**{param: request.query_params[param]})
+        
+        # Chunked readings have no row to key a cursor on, so page by offset
+        readings = PackedReadingSequence(rows, chunks)
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(readings, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    def perform_create(self, serializer):
+        reading = serializer.save()
+        apply_readings([reading])
+    
+    def perform_update(self, serializer):
+        old_timestamp = serializer.instance.timestamp
+        old_data_type = serializer.instance.data_type
+        reading = serializer.save()
+        rebuild_buckets(reading.event_id, old_data_type, [old_timestamp])
+        rebuild_buckets(reading.event_id, reading.data_type, [reading.timestamp])
+    
+    def perform_destroy(self, instance):
+        event_id, data_type, timestamp = instance.event_id, instance.data_type, instance.timestamp
+        instance.delete()
+        rebuild_buckets(event_id, data_type, [timestamp])
+    
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        """Accept a batch of readings into the write-behind spool"""
+        from .write_buffer import reject_conflicts, spool_readings
+        
+        items = request.data if isinstance(request.data, list) else [request.data]
+        serializer = DisasterDataIngestSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        readings = serializer.validated_data
+        
+        event_ids = {reading['event'] for reading in readings}
+        known_ids = set(DisasterEvent.objects.filter(id__in=event_ids).values_list('id', flat=True))
+        unknown_ids = event_ids - known_ids
+        if unknown_ids:
+            return Response(
+                {'error': 'Unknown events', 'events': sorted(str(event_id) for event_id in unknown_ids)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # An id already stored for another reading would be dropped at flush time
+        readings, rejected = reject_conflicts(readings)
+        
+        ids = spool_readings(readings) if readings else []
+        return Response(
+            {'accepted': len(ids), 'ids': ids, 'rejected': rejected},
+            status=status.HTTP_202_ACCEPTED
+        )
 
 
-class RiskModelViewSet(viewsets.ModelViewSet):
+class RiskModelViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = RiskModel.objects.all()
     serializer_class = RiskModelSerializer
     permission_classes = [IsAuthenticated]
@@ -129,22 +495,78 @@ class RiskModelViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def activate(self, request, pk=None):
         model = self.get_object()
-        RiskModel.objects.filter(disaster_type=model.disaster_type).update(is_active=False)
-        model.is_active = True
-        model.save()
+        with transaction.atomic():
+            RiskModel.objects.filter(disaster_type=model.disaster_type).update(is_active=False, updated_at=timezone.now())
+            model.is_active = True
+            model.save()
+            # Open events still carry the previous model's scores
+            job = start_rescore(model)
+            
+            AuditLog.objects.create(
+                user=request.user,
+                action='model_change',
+                resource_type='RiskModel',
+                resource_id=str(model.id),
+                description=f"Activated risk model: {model.name}",
+                new_values={'rescore_job': str(job.id), 'events': job.total},
+            )
         
-        AuditLog.objects.create(
-            user=request.user,
-            action='model_change',
-            resource_type='RiskModel',
-            resource_id=str(model.id),
-            description=f"Activated risk model: {model.name}",
-        )
+        return Response({'status': 'activated', 'rescore_job': RescoreJobSerializer(job).data})
+    
+    @action(detail=True, methods=['post'])
+    def backtest(self, request, pk=None):
+        """
+        Score the model against its type's HistoricalDisaster records
+        
+        Stores the ROC AUC as accuracy_score unless ?dry_run=true.
+        """
+        model = self.get_object()
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        metrics = run_backtest([model], save=not dry_run)[0]
+        
+        if not dry_run and metrics['auc'] is not None:
+            AuditLog.objects.create(
+                user=request.user,
+                action='model_change',
+                resource_type='RiskModel',
+                resource_id=str(model.id),
+                description=f"Backtested risk model: {model.name}",
+                new_values=metrics,
+            )
+        return Response(metrics)
+    
+    @action(detail=True, methods=['get'])
+    def rescore(self, request, pk=None):
+        """Progress of the model's latest re-score job"""
+        job = self.get_object().rescore_jobs.first()
+        if job is None:
+            return Response({'error': 'No re-score job for this model'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(RescoreJobSerializer(job).data)
+    
+    @action(detail=True, methods=['get'])
+    def shadow(self, request, pk=None):
+        """
+        Shadow evaluation of this model against the live scores
+        
+        ?days= limits the window (default: all), ?tolerance= is the score
+        difference counted as agreement (default: 10).
+        """
+        model = self.get_object()
+        try:
+            days = request.query_params.get('days')
+            since = timezone.now() - timedelta(days=float(days)) if days else None
+            tolerance = float(request.query_params.get('tolerance', 10))
+        except ValueError:
+            return Response({'error': 'days and tolerance must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response({'status': 'activated'})
+        summary = summarize_shadow(model, since=since, tolerance=tolerance)
+        summary['is_shadow'] = model.is_shadow
+        # This worker's queue only; other workers keep their own
+        summary['queue'] = {'pending': len(shadow_queue), 'dropped': shadow_queue.dropped}
+        return Response(summary)
 
 
-class HistoricalDisasterViewSet(viewsets.ReadOnlyModelViewSet):
+class HistoricalDisasterViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = HistoricalDisaster.objects.all()
     serializer_class = HistoricalDisasterSerializer
     permission_classes = [IsAuthenticated]
@@ -152,3 +574,5 @@ class HistoricalDisasterViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['location_name']
     ordering_fields = ['occurrence_date']
     ordering = ['-occurrence_date']
+    conditional_fields = ('created_at',)
+    last_modified_field = None
@@ -0,0 +1,388 @@
+"""
+Write-behind buffer for DisasterData readings
+
+Accepted readings are appended to a local spool of JSON-lines segment files and
+acknowledged once the segment has been fsync'd. Concurrent writers share a
+single fsync (group commit). A flusher drains sealed or orphaned segments into
+the database in large transactions and deletes them afterwards, so segments
+left behind by a crash are replayed on the next flush.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.conditional import bump_changes
+
+from .models import DisasterEvent, DisasterData
+from .packed import is_packed_mode, pack_readings
+from .rollups import apply_readings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = '.open'
+SEALED_SUFFIX = '.log'
+
+
+def _setting(name: str, default):
+    return getattr(settings, 'DISASTER_DATA_SPOOL', {}).get(name, default)
+
+
+def get_spool_dir() -> Path:
+    spool_dir = Path(_setting('DIR', Path(settings.BASE_DIR) / 'spool' / 'disaster_data'))
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    return spool_dir
+
+
+class SpoolWriter:
+    """Appends readings to the active spool segment with group-committed fsyncs"""
+
+    def __init__(self, spool_dir: Optional[Path] = None):
+        self.spool_dir = Path(spool_dir) if spool_dir else get_spool_dir()
+        self.segment_max_bytes = _setting('SEGMENT_MAX_BYTES', 16 * 1024 * 1024)
+        self.group_commit_seconds = _setting('GROUP_COMMIT_MS', 5) / 1000.0
+        self.segment_max_age = _setting('SEGMENT_MAX_AGE_SECONDS', 10)
+
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._file = None
+        self._path = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._sealer = None
+        self._written_seq = 0
+        self._durable_seq = 0
+        self._syncing = False
+
+    def append(self, readings: List[Dict[str, Any]]) -> int:
+        """
+        Append readings to the spool and return once they are durable
+
+        Returns:
+            Number of readings appended
+        """
+        if not readings:
+            return 0
+
+        payload = ''.join(
+            json.dumps(reading, separators=(',', ':'), default=str) + '\n'
+            for reading in readings
+        ).encode('utf-8')
+
+        with self._lock:
+            if (self._file is None
+                    or self._size + len(payload) > self.segment_max_bytes
+                    or time.monotonic() - self._opened_at > self.segment_max_age):
+                self._rotate()
+            self._file.write(payload)
+            self._file.flush()
+            self._size += len(payload)
+            self._written_seq += 1
+            seq = self._written_seq
+            self._wait_durable(seq)
+
+        return len(readings)
+
+    def _wait_durable(self, seq: int) -> None:
+        """Block until ``seq`` is fsync'd, issuing the fsync if nobody else is"""
+        while self._durable_seq < seq:
+            if self._syncing:
+                self._synced.wait()
+                continue
+
+            # Become the leader for this group: give concurrent writers a short
+            # window to join, then fsync everything written so far in one call.
+            self._syncing = True
+            handle = self._file
+            try:
+                if self.group_commit_seconds:
+                    self._lock.release()
+                    try:
+                        time.sleep(self.group_commit_seconds)
+                    finally:
+                        self._lock.acquire()
+                # A rotation while we slept already fsync'd the old segment
+                if handle is not None and handle is self._file:
+                    target = self._written_seq
+                    os.fsync(handle.fileno())
+                    self._durable_seq = max(self._durable_seq, target)
+            finally:
+                self._syncing = False
+                self._synced.notify_all()
+
+    def _rotate(self) -> None:
+        """Seal the active segment (if any) and open a new one"""
+        if self._file is not None:
+            self._seal()
+
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._path = self.spool_dir / f"{name}{OPEN_SUFFIX}"
+        self._file = open(self._path, 'ab')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._size = 0
+        self._opened_at = time.monotonic()
+
+        if self._sealer is None:
+            self._sealer = threading.Thread(target=self._seal_idle_segments, name='spool-sealer', daemon=True)
+            self._sealer.start()
+
+    def _seal_idle_segments(self) -> None:
+        """Seal a quiet active segment so the flusher can pick it up"""
+        while True:
+            time.sleep(self.segment_max_age)
+            with self._lock:
+                if self._file is not None and time.monotonic() - self._opened_at > self.segment_max_age:
+                    self._seal()
+
+    def _seal(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._durable_seq = self._written_seq
+        sealed_path = self._path.with_suffix(SEALED_SUFFIX)
+        os.rename(self._path, sealed_path)
+        self._file.close()
+        self._file = None
+        self._path = None
+        logger.debug(f"Sealed spool segment {sealed_path.name}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._seal()
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> SpoolWriter:
+    """Return the spool writer for this process (re-created after fork)"""
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = SpoolWriter()
+                _writer_pid = os.getpid()
+    return _writer
+
+
+def _identity(event_id, data_type, value, timestamp) -> Tuple[str, str, float, Any]:
+    """What makes a resent reading the same reading, whatever its id"""
+    return str(event_id), data_type, float(value), timestamp
+
+
+def _same_reading(stored: Tuple, resent: Tuple) -> bool:
+    """Whether ``resent`` repeats ``stored``; a reading sent without a timestamp matches any time"""
+    if stored[3] is None or resent[3] is None:
+        return stored[:3] == resent[:3]
+    return stored == resent
+
+
+def reject_conflicts(readings: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Split off readings whose client-supplied id is stored for a different reading
+
+    A reading resent with the same id and content is a retry, not a
+    conflict; without a timestamp the server picked the time, so it is left
+    out of the comparison. A second, different reading under an id already
+    used in the same batch is rejected too. Packed storage keeps no
+    per-reading ids, so nothing conflicts.
+
+    Returns:
+        (readings to spool, rejected ids)
+    """
+    client_ids = [reading['id'] for reading in readings if reading.get('id')]
+    if not client_ids or is_packed_mode():
+        return readings, []
+    stored = {
+        pk: _identity(*row) for pk, *row in DisasterData.objects.filter(id__in=client_ids).values_list(
+            'id', 'event_id', 'data_type', 'value', 'timestamp'
+        )
+    }
+    accepted, rejected = [], []
+    for reading in readings:
+        identity = _identity(reading['event'], reading['data_type'], reading['value'], reading.get('timestamp'))
+        if reading.get('id') in stored and not _same_reading(stored[reading['id']], identity):
+            rejected.append(str(reading['id']))
+            continue
+        if reading.get('id') and reading['id'] not in stored:
+            stored[reading['id']] = identity
+        accepted.append(reading)
+    return accepted, rejected
+
+
+def spool_readings(readings: List[Dict[str, Any]]) -> List[str]:
+    """
+    Assign ids to validated readings and append them to the spool
+
+    Returns:
+        List of reading ids, in input order
+    """
+    records = []
+    for reading in readings:
+        record = {
+            'id': str(reading.get('id') or uuid.uuid4()),
+            'event': str(reading['event']),
+            'data_type': reading['data_type'],
+            'value': float(reading['value']),
+            'unit': reading.get('unit', ''),
+            'source': reading.get('source', ''),
+            # Kept apart so a retry without a timestamp still matches the stored reading
+            'timestamp': reading['timestamp'].isoformat() if reading.get('timestamp') else None,
+            'received_at': timezone.now().isoformat(),
+            'metadata': reading.get('metadata') or {},
+        }
+        records.append(record)
+
+    get_writer().append(records)
+    return [record['id'] for record in records]
+
+
+class SpoolFlusher:
+    """Drains spool segments into DisasterData in large transactions"""
+
+    def __init__(self, spool_dir: Optional[Path] = None, batch_size: Optional[int] = None):
+        self.spool_dir = Path(spool_dir) if spool_dir else get_spool_dir()
+        self.batch_size = batch_size or _setting('FLUSH_BATCH_SIZE', 5000)
+        # Readings dropped since creation: unknown event, or id taken by another reading
+        self.rejected = 0
+
+    def pending_segments(self) -> List[Path]:
+        """Sealed segments plus open segments no longer held by a live writer"""
+        segments = []
+        for path in sorted(self.spool_dir.iterdir()):
+            if path.suffix == SEALED_SUFFIX:
+                segments.append(path)
+            elif path.suffix == OPEN_SUFFIX and self._is_orphaned(path):
+                segments.append(path)
+        return segments
+
+    @staticmethod
+    def _is_orphaned(path: Path) -> bool:
+        if fcntl is None:
+            # Without advisory locks only replay segments that are clearly stale
+            return time.time() - path.stat().st_mtime > 300
+        try:
+            with open(path, 'rb') as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            return True
+        except BlockingIOError:
+            return False
+        except FileNotFoundError:
+            return False
+
+    def flush(self) -> Tuple[int, int]:
+        """
+        Flush all pending segments
+
+        Returns:
+            Tuple of (segments_flushed, readings_written)
+        """
+        segments_flushed = 0
+        readings_written = 0
+        for segment in self.pending_segments():
+            readings_written += self.flush_segment(segment)
+            segments_flushed += 1
+        return segments_flushed, readings_written
+
+    def flush_segment(self, segment: Path) -> int:
+        """Write one segment to the database and remove it once committed"""
+        readings = self._read_segment(segment)
+        written = 0
+
+        for start in range(0, len(readings), self.batch_size):
+            written += self._write_batch(readings[start:start + self.batch_size])
+
+        segment.unlink()
+        logger.info(f"Flushed spool segment {segment.name}: {written} readings")
+        return written
+
+    @staticmethod
+    def _read_segment(segment: Path) -> List[Dict[str, Any]]:
+        readings = []
+        with open(segment, 'rb') as handle:
+            for line_num, line in enumerate(handle, 1):
+                if not line.endswith(b'\n'):
+                    # Torn write at the tail of a crashed segment was never acknowledged
+                    logger.warning(f"Discarding partial record at {segment.name}:{line_num}")
+                    break
+                try:
+                    readings.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Discarding corrupt record at {segment.name}:{line_num}")
+        return readings
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        event_ids = {reading['event'] for reading in batch}
+        existing_events = {
+            str(event_id) for event_id in
+            DisasterEvent.objects.filter(id__in=event_ids).values_list('id', flat=True)
+        }
+
+        objects, timestamped = [], []
+        for reading in batch:
+            if reading['event'] not in existing_events:
+                logger.warning(f"Dropping spooled reading {reading['id']}: event {reading['event']} no longer exists")
+                self.rejected += 1
+                continue
+            objects.append(DisasterData(
+                id=uuid.UUID(reading['id']),
+                event_id=uuid.UUID(reading['event']),
+                data_type=reading['data_type'],
+                value=reading['value'],
+                unit=reading['unit'],
+                source=reading['source'],
+                timestamp=parse_datetime(reading['timestamp'] or reading['received_at']),
+                metadata=reading['metadata'],
+            ))
+            timestamped.append(reading['timestamp'] is not None)
+
+        if is_packed_mode():
+            # pack_readings skips readings already in their series, so replays are no-ops
+            with transaction.atomic():
+                apply_readings(pack_readings(objects))
+            bump_changes(DisasterData)
+            return len(objects)
+
+        # Replaying a partially flushed segment re-sends ids that are already
+        # stored; skip them so the rollups only count each reading once. An id
+        # stored for, or earlier in the batch used by, a different reading is
+        # a client conflict, not a replay.
+        with transaction.atomic():
+            stored = {
+                pk: _identity(*row) for pk, *row in DisasterData.objects.filter(
+                    id__in=[obj.id for obj in objects]
+                ).values_list('id', 'event_id', 'data_type', 'value', 'timestamp')
+            }
+            fresh = []
+            for obj, has_timestamp in zip(objects, timestamped):
+                identity = _identity(obj.event_id, obj.data_type, obj.value, obj.timestamp if has_timestamp else None)
+                if obj.id not in stored:
+                    stored[obj.id] = _identity(obj.event_id, obj.data_type, obj.value, obj.timestamp)
+                    fresh.append(obj)
+                elif not _same_reading(stored[obj.id], identity):
+                    logger.warning(f"Rejecting spooled reading {obj.id}: the id belongs to a different reading")
+                    self.rejected += 1
+            objects = fresh
+            DisasterData.objects.bulk_create(objects, batch_size=self.batch_size)
+            apply_readings(objects)
+        # bulk_create skips the signals that count changes
+        bump_changes(DisasterData)
+        return len(objects)
@@ -8,6 +8,7 @@ from .models import RolePermission, PolicyConfiguration, ComplianceLog, DataRete
 from .serializers import RolePermissionSerializer, PolicyConfigurationSerializer, ComplianceLogSerializer, DataRetentionPolicySerializer
 from core.models import AuditLog
 from core.permissions import require_role, IsAdmin, ADMIN
+from core.fieldsets import SparseFieldsMixin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,7 +22,7 @@ def governance_dashboard_view(request):
     return render(request, 'governance/governance_dashboard.html', context)
 
 
-class RolePermissionViewSet(viewsets.ModelViewSet):
+class RolePermissionViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = RolePermission.objects.all()
     serializer_class = RolePermissionSerializer
     permission_classes = [IsAdmin]
@@ -40,7 +41,7 @@ class RolePermissionViewSet(viewsets.ModelViewSet):
         )
 
 
-class PolicyConfigurationViewSet(viewsets.ModelViewSet):
+class PolicyConfigurationViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = PolicyConfiguration.objects.all()
     serializer_class = PolicyConfigurationSerializer
     permission_classes = [IsAdmin]
@@ -72,7 +73,7 @@ class PolicyConfigurationViewSet(viewsets.ModelViewSet):
         )
 
 
-class ComplianceLogViewSet(viewsets.ReadOnlyModelViewSet):
+class ComplianceLogViewSet(SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ComplianceLog.objects.all()
     serializer_class = ComplianceLogSerializer
     permission_classes = [IsAuthenticated]
@@ -86,7 +87,7 @@ class ComplianceLogViewSet(viewsets.ReadOnlyModelViewSet):
         return ComplianceLog.objects.filter(user=self.request.user)
 
 
-class DataRetentionPolicyViewSet(viewsets.ModelViewSet):
+class DataRetentionPolicyViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = DataRetentionPolicy.objects.all()
     serializer_class = DataRetentionPolicySerializer
     permission_classes = [IsAdmin]
@@ -240,6 +240,31 @@ const RealTime = {
 
     stopPolling: (intervalId) => {
         clearInterval(intervalId);
+    },
+
+    // Server-sent change notifications from /api/stream/; bursts of changes
+    // are coalesced into one onChange call per debounce window. Streams need
+    // the ASGI server; under WSGI pages only poll if they pass pollInterval
+    subscribe: (kinds, onChange, options = {}) => {
+        if (!window.PUSH_STREAMS || !window.EventSource) {
+            return options.pollInterval ? setInterval(() => onChange({kind: 'resync'}), options.pollInterval) : null;
+        }
+        const query = options.types ? '?types=' + options.types.join(',') : '';
+        const source = new EventSource('/api/stream/' + query);
+        let timer = null;
+        const schedule = (message) => {
+            clearTimeout(timer);
+            timer = setTimeout(() => onChange(message), options.debounce || 1000);
+        };
+        kinds.concat(['resync']).forEach(kind => {
+            source.addEventListener(kind, e => schedule(JSON.parse(e.data)));
+        });
+        return source;
+    },
+
+    unsubscribe: (source) => {
+        if (typeof source === 'number') clearInterval(source);
+        else if (source) source.close();
     }
 };
 